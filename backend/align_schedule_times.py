@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+
+from app.config import settings
+from app.conflicts import conflict_query
+from app.db import create_client
+from app.models.schedule import from_minutes
+
+
+async def align_schedule_times(dry_run: bool):
+    """
+    Move schedule times onto SCHEDULE_SLOT_MINUTES boundaries.
+
+    Run after migrate_schedule_times.py. Starts are rounded down and ends up,
+    which is exactly the range of slots the schedule already claims, so the
+    widened class does not take time from a schedule holding its own slots.
+    A schedule that would then overlap another one is left alone and
+    reported so it can be fixed by hand. Safe to re-run.
+    """
+    client = create_client()
+    collection = client[settings.MONGODB_DB_NAME]["schedules"]
+    size = settings.SCHEDULE_SLOT_MINUTES
+
+    cursor = collection.find(
+        {
+            "$or": [
+                {"start_min": {"$not": {"$mod": [size, 0]}}},
+                {"end_min": {"$not": {"$mod": [size, 0]}}},
+            ]
+        }
+    )
+    aligned = 0
+    async for doc in cursor:
+        start = doc["start_min"] // size * size
+        end = -(-doc["end_min"] // size) * size
+        widened = {**doc, "start_min": start, "end_min": end}
+        if await collection.count_documents(
+            conflict_query(widened, doc["_id"]), limit=1
+        ):
+            print(
+                f"Overlap: schedule {doc['_id']} ({doc['subject_code']}, "
+                f"{doc['day']} {from_minutes(doc['start_min'])}-"
+                f"{from_minutes(doc['end_min'])}) would overlap another "
+                f"schedule as {from_minutes(start)}-{from_minutes(end)}; "
+                "left unchanged."
+            )
+            continue
+        if not dry_run:
+            await collection.update_one(
+                {"_id": doc["_id"]}, {"$set": {"start_min": start, "end_min": end}}
+            )
+        aligned += 1
+
+    client.close()
+    action = "would be" if dry_run else "were"
+    print(f"Done. {aligned} schedules {action} aligned to {size}-minute slots.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=align_schedule_times.__doc__)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(align_schedule_times(args.dry_run))
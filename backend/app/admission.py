@@ -0,0 +1,141 @@
+"""
+Admission control.
+
+Every request is assigned to a route group (auth, reads, writes, bulk). Each
+group admits a fixed number of requests at a time and lets a bounded number
+wait for a turn; a request that finds the queue full, or waits longer than
+``ADMISSION_MAX_WAIT_SECONDS``, is answered at once with 503 and
+``Retry-After``. Under a spike the work in flight stays at what the server
+can finish, so admitted requests keep normal latency instead of everyone
+timing out together.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+
+AUTH_PATHS = {"/token", "/token/refresh", "/logout"}
+# Health checks, docs, metrics and the admin endpoints used to diagnose overload
+EXEMPT_PATHS = {"/", "/docs", "/redoc", "/openapi.json", "/metrics"}
+EXEMPT_PREFIXES = ("/admin/",)
+BULK_SUFFIXES = ("/bulk", "/generate", "/export")
+
+
+def route_group(method: str, path: str) -> Optional[str]:
+    """Admission group of a request, or None when it is never limited."""
+    if method == "OPTIONS" or path in EXEMPT_PATHS:
+        return None
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    if path in AUTH_PATHS:
+        return "auth"
+    if path.rstrip("/").endswith(BULK_SUFFIXES):
+        return "bulk"
+    if method in ("GET", "HEAD"):
+        return "reads"
+    return "writes"
+
+
+class Gate:
+    """Concurrency limit with a bounded queue in front of it."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    async def acquire(self) -> bool:
+        if self._semaphore.locked():
+            if self.waiting >= self.queue_size:
+                self.shed_queue_full += 1
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+            except TimeoutError:
+                self.shed_timeout += 1
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+        }
+
+
+def build_gates() -> Dict[str, Gate]:
+    return {
+        group: Gate(
+            group,
+            limit,
+            settings.ADMISSION_QUEUE_LIMITS.get(group, 0),
+            settings.ADMISSION_MAX_WAIT_SECONDS,
+        )
+        for group, limit in settings.ADMISSION_LIMITS.items()
+    }
+
+
+gates = build_gates()
+
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: gate.stats() for name, gate in gates.items()}
+
+
+class AdmissionMiddleware:
+    """Run each request through the gate of its route group."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.ADMISSION_CONTROL_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        group = route_group(scope["method"], scope["path"])
+        if group is None or group not in gates:
+            await self.app(scope, receive, send)
+            return
+
+        gate = gates[group]
+        if not await gate.acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "The server is busy, please retry shortly."},
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            # Held until the whole body is sent, streaming exports included
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
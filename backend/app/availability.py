@@ -0,0 +1,79 @@
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+from app.models.schedule import DayOfWeek
+
+DAYS = [day.value for day in DayOfWeek]
+MINUTES_PER_DAY = 24 * 60
+
+
+def busy_bitmap(docs: Iterable[Mapping[str, Any]], slot_minutes: int) -> np.ndarray:
+    """
+    Boolean (day, slot) array that is True wherever one of ``docs`` is in class.
+
+    Built without a Python loop over slots: each class adds +1 at its first
+    slot and -1 after its last one, and a cumulative sum along the day turns
+    those marks into coverage counts. Partial slots count as busy.
+    """
+    slots = MINUTES_PER_DAY // slot_minutes
+    marks = np.zeros((len(DAYS), slots + 1), dtype=np.int32)
+    docs = list(docs)
+    if docs:
+        rows = np.fromiter(
+            (DAYS.index(DayOfWeek(doc["day"]).value) for doc in docs), dtype=np.intp
+        )
+        starts = np.fromiter((doc["start_min"] for doc in docs), dtype=np.intp)
+        ends = np.fromiter((doc["end_min"] for doc in docs), dtype=np.intp)
+        np.add.at(marks, (rows, starts // slot_minutes), 1)
+        np.add.at(marks, (rows, -(-ends // slot_minutes)), -1)
+    return np.cumsum(marks, axis=1)[:, :slots] > 0
+
+
+def common_free(bitmaps: List[np.ndarray]) -> np.ndarray:
+    """AND the free time of several resources together."""
+    return np.logical_and.reduce([~busy for busy in bitmaps])
+
+
+def free_windows(
+    free: np.ndarray, first: int, last: int, min_slots: int
+) -> List[Tuple[int, int]]:
+    """
+    Runs of free slots within ``[first, last)`` that are at least ``min_slots``
+    long, as (start_slot, end_slot) pairs.
+    """
+    row = np.concatenate(([False], free[first:last], [False])).astype(np.int8)
+    edges = np.diff(row)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = ends - starts >= min_slots
+    return [
+        (int(start) + first, int(end) + first)
+        for start, end in zip(starts[keep], ends[keep])
+    ]
+
+
+def find_free_slots(
+    docs_by_resource: Dict[Tuple[str, str], List[Mapping[str, Any]]],
+    days: List[str],
+    day_start: int,
+    day_end: int,
+    duration: int,
+    slot_minutes: int,
+) -> Dict[str, List[Tuple[int, int]]]:
+    """Day -> free (start_min, end_min) windows shared by every resource."""
+    free = common_free(
+        [busy_bitmap(docs, slot_minutes) for docs in docs_by_resource.values()]
+    )
+    first = -(-day_start // slot_minutes)
+    last = day_end // slot_minutes
+    min_slots = -(-duration // slot_minutes)
+    return {
+        day: [
+            (start * slot_minutes, end * slot_minutes)
+            for start, end in free_windows(
+                free[DAYS.index(day)], first, last, min_slots
+            )
+        ]
+        for day in days
+    }
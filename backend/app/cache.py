@@ -0,0 +1,187 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple, Type, TypeVar
+
+from beanie import Document
+
+from app.config import settings
+from app.models import Subject, User
+from app.revocation import denylist
+
+MISSING = object()
+
+DocumentType = TypeVar("DocumentType", bound=Document)
+
+
+class TTLCache:
+    """
+    Bounded LRU mapping whose entries expire ``ttl`` seconds after they were
+    stored. Not thread-safe; it is only used from the event loop.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self._data.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class CatalogCache:
+    """
+    Documents of ``model`` looked up by one unique field, misses included.
+
+    Callers get a copy, so changing a returned document never changes the
+    cache. The routers that write the collection invalidate the keys they
+    touch; other worker processes only see such writes once their entry
+    expires, so keep the TTL short.
+    """
+
+    def __init__(self, model: Type[DocumentType], field: str, cache: TTLCache):
+        self.model = model
+        self.field = field
+        self.cache = cache
+        # Bumped by every invalidation, so a lookup that raced with a write
+        # does not store what it read before the write.
+        self._version = 0
+
+    async def get(self, key: str) -> Optional[DocumentType]:
+        doc = self.cache.get(key)
+        if doc is MISSING:
+            version = self._version
+            doc = await self.model.find_one({self.field: key})
+            if version == self._version:
+                self.cache.set(key, doc)
+        return doc.model_copy(deep=True) if doc is not None else None
+
+    def invalidate(self, *keys: str):
+        self._version += 1
+        for key in keys:
+            self.cache.invalidate(key)
+
+    def clear(self):
+        self._version += 1
+        self.cache.clear()
+
+
+class PrincipalCache:
+    """
+    Verified bearer tokens -> the user they authenticate.
+
+    A hit skips both the signature check and the user lookup. Entries end at
+    the token's own expiry at the latest or once its ``jti`` is revoked, and
+    ``invalidate_user`` drops every token of a user at once by bumping that
+    user's epoch. Epochs are per worker, so on other workers a role or
+    ``is_active`` change shows once the entry expires, after at most
+    ``AUTH_CACHE_TTL_SECONDS``; misses load the user from Mongo for that
+    reason.
+    """
+
+    def __init__(self, cache: TTLCache):
+        self.cache = cache
+        self._epochs: Dict[str, int] = {}
+
+    def epoch(self, user_id: str) -> int:
+        """Take this before loading the user and pass it to ``set``."""
+        return self._epochs.get(user_id, 0)
+
+    def get(self, token: str) -> Optional[User]:
+        entry = self.cache.get(token)
+        if entry is MISSING:
+            return None
+        expires_at, epoch, jti, user = entry
+        if (
+            time.time() >= expires_at
+            or epoch != self.epoch(user.user_id)
+            or denylist.is_revoked(jti)
+        ):
+            self.cache.invalidate(token)
+            # Count it as the miss it is
+            self.cache.hits -= 1
+            self.cache.misses += 1
+            return None
+        return user.model_copy(deep=True)
+
+    def set(
+        self,
+        token: str,
+        expires_at: float,
+        epoch: int,
+        user: User,
+        jti: Optional[str] = None,
+    ):
+        self.cache.set(token, (expires_at, epoch, jti, user))
+
+    def invalidate_user(self, user_id: str):
+        self._epochs[user_id] = self.epoch(user_id) + 1
+
+    def clear(self):
+        self.cache.clear()
+
+
+subject_cache = CatalogCache(
+    Subject,
+    "subject_code",
+    TTLCache(
+        settings.REFERENCE_CACHE_MAX_ENTRIES, settings.REFERENCE_CACHE_TTL_SECONDS
+    ),
+)
+user_cache = CatalogCache(
+    User,
+    "user_id",
+    TTLCache(
+        settings.REFERENCE_CACHE_MAX_ENTRIES, settings.REFERENCE_CACHE_TTL_SECONDS
+    ),
+)
+
+principal_cache = PrincipalCache(
+    TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS)
+)
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        "subjects": subject_cache.cache.stats(),
+        "users": user_cache.cache.stats(),
+        "principals": principal_cache.cache.stats(),
+    }
@@ -1,4 +1,5 @@
 import os
+from typing import Dict, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -8,16 +9,117 @@ class Settings(BaseSettings):
 
     MONGODB_URL: str
     MONGODB_DB_NAME: str = "classgrid_db"
+    # Connection pool, wire compression, timeouts and read preference of the
+    # Mongo client; MONGODB_MIN_POOL_SIZE connections are opened at startup
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 5
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000
+    MONGODB_COMPRESSORS: str = "zstd,snappy,zlib"
+    MONGODB_CONNECT_TIMEOUT_MS: int = 10000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 10000
+    # None waits as long as an operation takes, e.g. a large export
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGODB_READ_PREFERENCE: str = "primary"
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # How often each worker picks up tokens revoked by the others
+    TOKEN_DENYLIST_SYNC_SECONDS: int = 15
 
     PROJECT_NAME: str = "ClassGrid"
+    # Scale-to-zero hosting: create indexes, warm the Mongo pool and load the
+    # schedule index in the background instead of before the first request
+    FAST_STARTUP: bool = False
     # Use Render's environment variable if available, otherwise default to localhost
     SELF_PING_URL: str = os.getenv("RENDER_EXTERNAL_URL", "http://localhost:10000")
 
+    # Serve /metrics and collect request and Mongo command timings
+    METRICS_ENABLED: bool = True
+
+    # Server-Timing header with each request's auth/db/validation/serialization
+    # split, and optionally a JSON log line per request at least this slow
+    SERVER_TIMING_ENABLED: bool = True
+    SERVER_TIMING_LOG: bool = False
+    SERVER_TIMING_LOG_THRESHOLD_MS: float = 0.0
+
+    # Log queries slower than this, with a sampled query plan per filter shape
+    SLOW_QUERY_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: int = 300
+    SLOW_QUERY_LOG_MAX_BYTES: int = 16 * 1024 * 1024
+    SLOW_QUERY_LOG_MAX_ENTRIES: int = 10000
+
+    # Periodic maintenance jobs (seconds between runs, 0 disables a job)
+    JOB_KEEP_ALIVE_SECONDS: int = 600
+    # Below SCHEDULE_INDEX_MAX_AGE_SECONDS, so the index stays fresh
+    JOB_REFRESH_VIEWS_SECONDS: int = 50
+    JOB_RELEASE_ORPHANED_SLOTS_SECONDS: int = 600
+    JOB_INDEX_STATS_SECONDS: int = 3600
+
     FIRST_SUPERUSER: str
     FIRST_SUPERUSER_PASSWORD: str
 
+    # In-memory interval index used by schedule conflict checks
+    SCHEDULE_INDEX_ENABLED: bool = True
+    SCHEDULE_INDEX_MAX_AGE_SECONDS: int = 60
+
+    # Slot reservations that make concurrent schedule writes race-free
+    SCHEDULE_SLOT_MINUTES: int = 5
+    SCHEDULE_SLOT_ORPHAN_GRACE_SECONDS: int = 300
+
+    # List endpoints: largest page, and how long filtered totals are cached
+    PAGINATION_MAX_LIMIT: int = 500
+    PAGINATION_COUNT_CACHE_SECONDS: int = 30
+
+    # Serve schedule and subject lists from raw rows encoded with orjson,
+    # skipping Document and response model validation
+    FAST_READS: bool = False
+
+    # Rows encoded per chunk of a streaming export
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Upper bound on rows accepted by POST /schedules/bulk
+    BULK_IMPORT_MAX_ROWS: int = 5000
+
+    # Weekly grid rows, and the hours shown even when no class is earlier/later
+    SCHEDULE_GRID_SLOT_MINUTES: int = 30
+    SCHEDULE_GRID_DAY_START: str = "07:00"
+    SCHEDULE_GRID_DAY_END: str = "19:00"
+
+    # Timetable generator: worker processes and the longest search allowed
+    TIMETABLE_WORKERS: int = 1
+    TIMETABLE_TIME_BUDGET_SECONDS: float = 10.0
+
+    # In-process cache of subjects by code and users by user_id
+    REFERENCE_CACHE_MAX_ENTRIES: int = 5000
+    REFERENCE_CACHE_TTL_SECONDS: float = 60.0
+
+    # Verified access tokens -> their user, so most requests skip JWT checks
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_CACHE_TTL_SECONDS: float = 30.0
+
+    # bcrypt cost factor (log2 rounds) and threads that may hash at once
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # Admission control: requests served at once and allowed to queue, per
+    # route group; what queues longer than the wait is answered with 503
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_LIMITS: Dict[str, int] = {
+        "auth": 8,
+        "reads": 64,
+        "writes": 16,
+        "bulk": 2,
+    }
+    ADMISSION_QUEUE_LIMITS: Dict[str, int] = {
+        "auth": 32,
+        "reads": 256,
+        "writes": 64,
+        "bulk": 4,
+    }
+    ADMISSION_MAX_WAIT_SECONDS: float = 2.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 5
+
 
 settings = Settings()
@@ -0,0 +1,439 @@
+import asyncio
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.etags import current_generation
+from app.models.schedule import DayOfWeek, Schedule, from_minutes
+
+# Schedule fields that name a resource which can only be in one class at a time
+RESOURCES = ("instructor_id", "room", "section")
+RESOURCE_LABELS = {"instructor_id": "Instructor", "room": "Room", "section": "Section"}
+
+DAY_NAMES = {
+    DayOfWeek.Monday: "Monday",
+    DayOfWeek.Tuesday: "Tuesday",
+    DayOfWeek.Wednesday: "Wednesday",
+    DayOfWeek.Thursday: "Thursday",
+    DayOfWeek.Friday: "Friday",
+    DayOfWeek.Saturday: "Saturday",
+    DayOfWeek.Sunday: "Sunday",
+}
+
+_PROJECTION = {
+    "subject_code": 1,
+    "instructor_id": 1,
+    "room": 1,
+    "section": 1,
+    "day": 1,
+    "start_min": 1,
+    "end_min": 1,
+}
+
+
+@dataclass(frozen=True)
+class Interval:
+    start: int
+    end: int
+    schedule_id: str
+
+
+@dataclass(frozen=True)
+class Conflict:
+    resource: str
+    value: str
+    schedule_id: str
+    subject_code: str
+    day: str
+    start_time: str
+    end_time: str
+
+    def describe(self) -> str:
+        day_name = DAY_NAMES.get(DayOfWeek(self.day), self.day)
+        return (
+            f"{RESOURCE_LABELS[self.resource]} {self.value} is already booked for "
+            f"{self.subject_code} on {day_name}, {self.start_time}-{self.end_time}."
+        )
+
+
+class ScheduleConflictError(HTTPException):
+    """400 carrying every conflicting resource, rendered by the app's handler."""
+
+    def __init__(self, conflicts: List[Conflict], reason: Optional[str] = None):
+        self.conflicts = conflicts
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Schedule conflict detected. "
+            + (reason or " ".join(conflict.describe() for conflict in conflicts)),
+        )
+
+
+class _Bucket:
+    """Intervals of a single key kept sorted by start time.
+
+    ``max_end[i]`` is the largest end among ``intervals[: i + 1]``, which lets an
+    overlap query stop scanning as soon as nothing further left can reach the
+    requested start, even when legacy data already contains overlaps.
+
+    An overlap query bisects to the first interval starting at or after the
+    requested end and walks left from there, so it costs O(log n + k) for k
+    hits while the intervals do not overlap each other. One long legacy
+    interval that overlaps many others can stretch that walk across the
+    whole bucket. Insert and remove shift the lists and rebuild ``max_end``
+    from the changed position, so both are linear in the bucket size; a
+    bucket holds one resource's classes on one day, which stays small.
+    """
+
+    __slots__ = ("starts", "intervals", "max_end")
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.intervals: List[Interval] = []
+        self.max_end: List[int] = []
+
+    def _rebuild_from(self, position: int):
+        del self.max_end[position:]
+        running = self.max_end[-1] if self.max_end else -1
+        for interval in self.intervals[position:]:
+            running = max(running, interval.end)
+            self.max_end.append(running)
+
+    def insert(self, interval: Interval):
+        position = bisect_left(self.starts, interval.start)
+        self.starts.insert(position, interval.start)
+        self.intervals.insert(position, interval)
+        self._rebuild_from(position)
+
+    def remove(self, schedule_id: str) -> bool:
+        for position, interval in enumerate(self.intervals):
+            if interval.schedule_id == schedule_id:
+                del self.starts[position]
+                del self.intervals[position]
+                self._rebuild_from(position)
+                return True
+        return False
+
+    def overlaps(
+        self, start: int, end: int, exclude_id: Optional[str] = None
+    ) -> List[Interval]:
+        # Every interval left of ``position`` starts before ``end``; walk back
+        # while some interval on the left can still end after ``start``.
+        found = []
+        position = bisect_left(self.starts, end)
+        for i in range(position - 1, -1, -1):
+            if self.max_end[i] <= start:
+                break
+            interval = self.intervals[i]
+            if interval.end > start and interval.schedule_id != exclude_id:
+                found.append(interval)
+        return found
+
+
+class IntervalIndex:
+    """Per-key sorted interval lists; see ``_Bucket`` for the cost of each call.
+
+    One schedule id may be stored under several keys (one per resource).
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Hashable, _Bucket] = {}
+        self._keys: Dict[str, Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Hashable, interval: Interval):
+        self._buckets.setdefault(key, _Bucket()).insert(interval)
+        self._keys.setdefault(interval.schedule_id, set()).add(key)
+
+    def remove(self, schedule_id: str):
+        for key in self._keys.pop(schedule_id, ()):
+            bucket = self._buckets[key]
+            bucket.remove(schedule_id)
+            if not bucket.intervals:
+                del self._buckets[key]
+
+    def overlaps(
+        self, key: Hashable, start: int, end: int, exclude_id: Optional[str] = None
+    ) -> List[Interval]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return []
+        return bucket.overlaps(start, end, exclude_id)
+
+    def overlap(
+        self, key: Hashable, start: int, end: int, exclude_id: Optional[str] = None
+    ) -> Optional[Interval]:
+        found = self.overlaps(key, start, end, exclude_id)
+        return found[0] if found else None
+
+
+def schedule_field(schedule: Any, name: str) -> Any:
+    if isinstance(schedule, Mapping):
+        return schedule[name]
+    return getattr(schedule, name)
+
+
+def schedule_intervals(
+    schedule: Any, schedule_id: Any = None
+) -> Tuple[List[Hashable], Interval]:
+    """Build the keys and the interval a schedule (document or dict) occupies."""
+    # DayOfWeek hashes by member name, so always key on the plain value.
+    day = DayOfWeek(schedule_field(schedule, "day")).value
+    keys = [
+        (resource, schedule_field(schedule, resource), day) for resource in RESOURCES
+    ]
+    if schedule_id is None:
+        schedule_id = schedule["_id"] if isinstance(schedule, Mapping) else schedule.id
+    return keys, Interval(
+        schedule_field(schedule, "start_min"),
+        schedule_field(schedule, "end_min"),
+        str(schedule_id),
+    )
+
+
+def conflicts_with(schedule: Any, doc: Mapping[str, Any]) -> List[Conflict]:
+    """List the resources a stored schedule document shares with ``schedule``."""
+    if DayOfWeek(doc["day"]) != DayOfWeek(schedule_field(schedule, "day")):
+        return []
+    if not (
+        doc["start_min"] < schedule_field(schedule, "end_min")
+        and doc["end_min"] > schedule_field(schedule, "start_min")
+    ):
+        return []
+    return [
+        Conflict(
+            resource=resource,
+            value=doc[resource],
+            schedule_id=str(doc["_id"]),
+            subject_code=doc["subject_code"],
+            day=DayOfWeek(doc["day"]).value,
+            start_time=from_minutes(doc["start_min"]),
+            end_time=from_minutes(doc["end_min"]),
+        )
+        for resource in RESOURCES
+        if doc[resource] == schedule_field(schedule, resource)
+    ]
+
+
+def conflict_query(schedule: Any, exclude_schedule_id: Any = None) -> Dict[str, Any]:
+    """Mongo filter matching every schedule that overlaps on any resource.
+
+    Each ``$or`` branch carries the full predicate so it is answered by its
+    own ``(resource, day, start_min, end_min)`` index as an integer range scan.
+    """
+    day = DayOfWeek(schedule_field(schedule, "day")).value
+    time_overlap = {
+        "day": day,
+        "start_min": {"$lt": schedule_field(schedule, "end_min")},
+        "end_min": {"$gt": schedule_field(schedule, "start_min")},
+    }
+    query: Dict[str, Any] = {
+        "$or": [
+            {resource: schedule_field(schedule, resource), **time_overlap}
+            for resource in RESOURCES
+        ]
+    }
+    if exclude_schedule_id:
+        query["_id"] = {"$ne": ObjectId(str(exclude_schedule_id))}
+    return query
+
+
+def find_batch_conflicts(
+    existing: Iterable[Tuple[List[Hashable], Interval]],
+    candidates: Iterable[Tuple[List[Hashable], Interval]],
+) -> Dict[str, List[Interval]]:
+    """Check a batch of intervals against existing ones and against itself.
+
+    Candidates are swept in start order; each one that overlaps an existing
+    interval or an already accepted candidate on any of its keys is
+    rejected, the rest are accepted. Returns rejected candidate id -> the
+    intervals it hit.
+    """
+    index = IntervalIndex()
+    for keys, interval in existing:
+        for key in keys:
+            index.add(key, interval)
+
+    rejected: Dict[str, List[Interval]] = {}
+    # Stable sort: candidates starting together are decided in input order.
+    for keys, interval in sorted(candidates, key=lambda item: item[1].start):
+        hits = [
+            hit
+            for key in keys
+            for hit in index.overlaps(key, interval.start, interval.end)
+        ]
+        if hits:
+            rejected[interval.schedule_id] = hits
+        else:
+            for key in keys:
+                index.add(key, interval)
+    return rejected
+
+
+# A schedule's keys and interval, or None once it is removed
+_Entry = Optional[Tuple[List[Hashable], Interval]]
+
+
+class ScheduleIndex:
+    """In-memory mirror of the schedules collection keyed by resource and day.
+
+    Each schedule is stored once per resource (instructor, room, section).
+    The index is loaded at startup and kept in sync by the schedule router. It
+    only answers while it is fresh; callers fall back to the Mongo query when
+    it is not loaded or older than ``SCHEDULE_INDEX_MAX_AGE_SECONDS``, and a
+    background reload is started so the next check can use it again.
+
+    The index only mirrors this worker's writes between reloads, so a miss
+    does not prove the time is free: a schedule another worker wrote since
+    the last load is invisible until the next one. Misses are not confirmed
+    against Mongo; the slot claims in ``app.reservations``, taken before
+    every write, are what keep two workers from booking the same time.
+
+    A load builds a new index from a scan and swaps it in. Changes this
+    worker makes while the scan runs are recorded and replayed onto the new
+    index before the swap, since the scan may have read the document before
+    or after the change. ``refresh`` skips the scan while the schedules'
+    write generation has not moved since the last one and only marks the
+    index fresh again.
+    """
+
+    def __init__(self, max_age_seconds: float):
+        self.max_age_seconds = max_age_seconds
+        self.loaded_at: Optional[float] = None
+        self._index = IntervalIndex()
+        self._reload_task: Optional[asyncio.Task] = None
+        # Schedule write generation read before the last refresh's scan
+        self.generation: Optional[int] = None
+        # One change log per running load
+        self._pending: List[List[Tuple[str, _Entry]]] = []
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def is_fresh(self) -> bool:
+        if self.loaded_at is None:
+            return False
+        return time.monotonic() - self.loaded_at < self.max_age_seconds
+
+    async def load(self):
+        pending: List[Tuple[str, _Entry]] = []
+        self._pending.append(pending)
+        try:
+            index = IntervalIndex()
+            async for doc in Schedule.get_motor_collection().find({}, _PROJECTION):
+                keys, interval = schedule_intervals(doc)
+                for key in keys:
+                    index.add(key, interval)
+        finally:
+            self._pending.remove(pending)
+        # No await from here on, so nothing can change between replay and swap
+        for schedule_id, entry in pending:
+            _apply(index, schedule_id, entry)
+        self._index = index
+        self.loaded_at = time.monotonic()
+
+    async def refresh(self) -> bool:
+        """Load unless no schedule was written since the last refresh.
+
+        Returns whether the collection was scanned.
+        """
+        # Read before the scan: a write the scan misses bumps it afterwards
+        generation = await current_generation(Schedule)
+        if self.loaded_at is not None and generation == self.generation:
+            self.loaded_at = time.monotonic()
+            return False
+        await self.load()
+        self.generation = generation
+        return True
+
+    def reload_in_background(self):
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self.refresh())
+
+    def add(self, schedule: Schedule):
+        entry = schedule_intervals(schedule)
+        self._record(str(schedule.id), entry)
+        if self.loaded_at is not None:
+            _apply(self._index, str(schedule.id), entry)
+
+    def remove(self, schedule_id: Any):
+        self._record(str(schedule_id), None)
+        self._index.remove(str(schedule_id))
+
+    def _record(self, schedule_id: str, entry: _Entry):
+        for pending in self._pending:
+            pending.append((schedule_id, entry))
+
+    def find_overlapping_ids(
+        self, schedule: Any, exclude_schedule_id: Any = None
+    ) -> Set[str]:
+        exclude_id = str(exclude_schedule_id) if exclude_schedule_id else None
+        keys, interval = schedule_intervals(schedule, exclude_id or "")
+        return {
+            hit.schedule_id
+            for key in keys
+            for hit in self._index.overlaps(
+                key, interval.start, interval.end, exclude_id
+            )
+        }
+
+
+def _apply(index: IntervalIndex, schedule_id: str, entry: _Entry):
+    index.remove(schedule_id)
+    if entry is not None:
+        keys, interval = entry
+        for key in keys:
+            index.add(key, interval)
+
+
+schedule_index = ScheduleIndex(max_age_seconds=settings.SCHEDULE_INDEX_MAX_AGE_SECONDS)
+
+
+async def find_conflicts(
+    schedule: Any, exclude_schedule_id: Any = None
+) -> List[Conflict]:
+    """
+    Return every (resource, schedule) pair that collides with ``schedule``.
+
+    The in-memory index answers while it is fresh; its hits are confirmed with
+    a single ``_id`` lookup so schedules removed by another worker are dropped.
+    A miss is returned without a query, so it can be stale by up to one reload
+    interval; writers rely on the slot claims in ``app.reservations`` to catch
+    schedules other workers wrote in the meantime. Otherwise one ``$or``
+    query covering all resources is sent to Mongo.
+    """
+    collection = Schedule.get_motor_collection()
+    if settings.SCHEDULE_INDEX_ENABLED and schedule_index.is_fresh:
+        ids = schedule_index.find_overlapping_ids(schedule, exclude_schedule_id)
+        if not ids:
+            return []
+        docs = await collection.find(
+            {"_id": {"$in": [ObjectId(i) for i in ids]}}, _PROJECTION
+        ).to_list(None)
+        for missing in ids - {str(doc["_id"]) for doc in docs}:
+            schedule_index.remove(missing)
+    else:
+        if settings.SCHEDULE_INDEX_ENABLED:
+            schedule_index.reload_in_background()
+        docs = await collection.find(
+            conflict_query(schedule, exclude_schedule_id), _PROJECTION
+        ).to_list(None)
+
+    return [conflict for doc in docs for conflict in conflicts_with(schedule, doc)]
@@ -1,33 +1,160 @@
+import asyncio
+from typing import List, Optional
+
 import certifi
 from beanie import init_beanie
+from beanie.odm.fields import IndexModelField
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, monitoring
 
 from app.config import settings
-from app.models import Item, User, UserRole, Subject, Schedule
-from app.security import get_password_hash
+from app.etags import bump_generation
+from app.metrics import mongo_listener
+from app.models import (
+    Item,
+    User,
+    UserRole,
+    Subject,
+    Schedule,
+    ScheduleSlot,
+    ScheduleGrid,
+    Generation,
+    RevokedToken,
+    SlowQuery,
+)
+from app.security import hash_password
+from app.slow_queries import ensure_collection, slow_query_listener
+from app.timing import db_timing_listener
+
+DOCUMENT_MODELS = [
+    Item,
+    User,
+    Subject,
+    Schedule,
+    ScheduleSlot,
+    ScheduleGrid,
+    Generation,
+    RevokedToken,
+    SlowQuery,
+]
+
+
+def create_client() -> AsyncIOMotorClient:
+    """
+    The Motor client, configured from settings. The API keeps one on
+    ``app.state.mongo_client``; scripts create their own through this too so
+    they connect the same way.
+    """
+    return AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        tlsCAFile=certifi.where(),
+        appname=settings.PROJECT_NAME,
+        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+        # Negotiated with the server; codecs whose module is missing are skipped
+        compressors=settings.MONGODB_COMPRESSORS,
+        connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+        readPreference=settings.MONGODB_READ_PREFERENCE,
+        event_listeners=command_listeners(),
+    )
+
+
+def command_listeners() -> List[monitoring.CommandListener]:
+    listeners = []
+    if settings.METRICS_ENABLED:
+        listeners.append(mongo_listener)
+    if settings.SLOW_QUERY_ENABLED:
+        listeners.append(slow_query_listener)
+    if settings.SERVER_TIMING_ENABLED:
+        listeners.append(db_timing_listener)
+    return listeners
+
+
+async def warm_up(client: AsyncIOMotorClient, connections: int):
+    """
+    Open ``connections`` pooled connections now, so the first requests after
+    startup do not each pay for a TCP and TLS handshake.
+    """
+    if connections > 0:
+        await asyncio.gather(
+            *(client.admin.command("ping") for _ in range(connections))
+        )
 
 
-async def init_db():
-    # Helper for running simplified tests without a real Mongo instance could go here,
-    # but for now we assume a local or configured Mongo URI.
-    # In a real app, use environment variables for the URI.
-    client = AsyncIOMotorClient(settings.MONGODB_URL, tlsCAFile=certifi.where())
+async def init_db(
+    client: Optional[AsyncIOMotorClient] = None, skip_indexes: bool = False
+) -> AsyncIOMotorClient:
+    """
+    Initialize Beanie and make sure the first superuser exists.
+
+    With ``skip_indexes`` only the unique indexes are created, which saves a
+    few round trips per collection at startup; run ``create_indexes``
+    afterwards for the rest. The unique ones cannot wait: slot claims and
+    user and subject codes are only safe against concurrent writes with them.
+    """
+    if client is None:
+        client = create_client()
+    database = client[settings.MONGODB_DB_NAME]
+    if settings.SLOW_QUERY_ENABLED:
+        # Capped, so it has to exist before the first entry is written
+        await ensure_collection(database)
     await init_beanie(
-        database=client[settings.MONGODB_DB_NAME],
-        document_models=[Item, User, Subject, Schedule],
+        database=database,
+        document_models=DOCUMENT_MODELS,
+        skip_indexes=skip_indexes,
     )
+    if skip_indexes:
+        await create_indexes(unique_only=True)
+    await ensure_superuser()
+    return client
+
 
-    # Create initial superuser
-    user = await User.find_one(User.user_id == settings.FIRST_SUPERUSER)
-    if not user:
-        user = User(
-            user_id=settings.FIRST_SUPERUSER,
-            firstname="Admin",
-            lastname="User",
-            password=get_password_hash(settings.FIRST_SUPERUSER_PASSWORD),
-            role=UserRole.admin,
+async def create_indexes(models=DOCUMENT_MODELS, unique_only: bool = False):
+    """Create the indexes declared in each model's Settings (existing ones are kept)."""
+    for model in models:
+        indexes = IndexModelField.list_to_index_model(
+            model.get_settings().indexes or []
+        )
+        if unique_only:
+            indexes = [index for index in indexes if index.document.get("unique")]
+        if indexes:
+            await model.get_motor_collection().create_indexes(indexes)
+
+
+async def ensure_superuser():
+    """
+    Create the first superuser if it is missing. Idempotent: an existing user
+    is left as is, and the common case is a single upsert with no hashing.
+    """
+    user = await User.get_motor_collection().find_one_and_update(
+        {"user_id": settings.FIRST_SUPERUSER},
+        {
+            "$setOnInsert": {
+                "user_id": settings.FIRST_SUPERUSER,
+                "firstname": "Admin",
+                "lastname": "User",
+                "middlename": None,
+                "password": None,
+                "role": UserRole.admin.value,
+                "department": None,
+                "is_active": True,
+            }
+        },
+        projection={"password": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    if not user.get("password"):
+        # Just created, or created earlier without a password
+        await User.get_motor_collection().update_one(
+            {"_id": user["_id"], "password": user.get("password")},
+            {
+                "$set": {
+                    "password": await hash_password(settings.FIRST_SUPERUSER_PASSWORD)
+                }
+            },
         )
-        await user.create()
-    elif not user.password:
-        user.password = get_password_hash(settings.FIRST_SUPERUSER_PASSWORD)
-        await user.save()
+        await bump_generation(User)
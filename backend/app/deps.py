@@ -1,35 +1,49 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError
 from pydantic import ValidationError
 
-from app.config import settings
+from app.cache import principal_cache
+from app.metrics import timed
 from app.models import User, UserRole
 from app.schemas.users import TokenData
+from app.security import decode_token
+from app.timing import span
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
+@timed("get_current_user")
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    with span("auth"):
+        return await _authenticate(token)
+
+
+async def _authenticate(token: str) -> User:
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
+
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise ValidationError("sub claim missing")
-        token_data = TokenData(user_id=user_id)
+        with span("jwt"):
+            payload = decode_token(token)
+        token_data = TokenData(user_id=payload["sub"])
     except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
 
+    epoch = principal_cache.epoch(token_data.user_id)
+    # Straight from Mongo, not user_cache: a role or is_active change made on
+    # another worker must not outlive this worker's principal entry
     user = await User.find_one(User.user_id == token_data.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    # Tokens without an expiry are verified every time
+    principal_cache.set(token, payload.get("exp", 0), epoch, user, payload.get("jti"))
     return user
 
 
@@ -0,0 +1,100 @@
+import hashlib
+from typing import Iterable, Type
+
+from beanie import Document
+from fastapi import HTTPException, Request, status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.models import Generation
+
+
+def _name(model: Type[Document]) -> str:
+    return model.get_collection_name()
+
+
+async def bump_generation(*models: Type[Document]):
+    """Record a write to ``models``' collections. Call after the write lands."""
+    collection = Generation.get_motor_collection()
+    for model in models:
+        await collection.update_one(
+            {"collection": _name(model)}, {"$inc": {"value": 1}}, upsert=True
+        )
+
+
+async def current_generation(model: Type[Document]) -> int:
+    """The write counter of ``model``'s collection; 0 before its first write."""
+    doc = await Generation.get_motor_collection().find_one({"collection": _name(model)})
+    return doc["value"] if doc else 0
+
+
+async def compute_etag(request: Request, models: Iterable[Type[Document]]) -> str:
+    names = sorted(_name(model) for model in models)
+    values = {
+        doc["collection"]: doc["value"]
+        async for doc in Generation.get_motor_collection().find(
+            {"collection": {"$in": names}}
+        )
+    }
+    # The same generations give different bodies for different URLs
+    key = "|".join(
+        [request.url.path, str(request.query_params)]
+        + [f"{name}={values.get(name, 0)}" for name in names]
+    )
+    return 'W/"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    def opaque(tag: str) -> str:
+        return tag.strip().removeprefix("W/")
+
+    return any(
+        candidate.strip() == "*" or opaque(candidate) == opaque(etag)
+        for candidate in if_none_match.split(",")
+    )
+
+
+def conditional(*models: Type[Document]):
+    """
+    Dependency answering ``If-None-Match`` with 304 while none of ``models``'
+    collections has been written since the client's copy.
+
+    Otherwise the ETag is left on ``request.state`` for ETagMiddleware to add
+    to the response, whichever way the endpoint builds it.
+    """
+
+    async def dependency(request: Request):
+        etag = await compute_etag(request, models)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise HTTPException(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+        request.state.etag = etag
+
+    return dependency
+
+
+class ETagMiddleware:
+    """Add the ETag chosen by ``conditional`` to successful responses."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_etag(message: Message):
+            if message["type"] == "http.response.start":
+                etag = scope.get("state", {}).get("etag")
+                if etag and message["status"] == 200:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (b"etag", etag.encode())
+                    ]
+            await send(message)
+
+        # Shared with the Request objects created further down the stack
+        scope.setdefault("state", {})
+        await self.app(scope, receive, send_with_etag)
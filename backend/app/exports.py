@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, Mapping, Sequence
+
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.config import settings
+from app.serializers import projection
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv; charset=utf-8",
+}
+
+
+def _encode(rows: Sequence[Dict[str, Any]], fields, fmt: ExportFormat) -> bytes:
+    if fmt == ExportFormat.ndjson:
+        return "".join(json.dumps(row, default=str) + "\n" for row in rows).encode()
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, lineterminator="\n")
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_rows(
+    collection: AsyncIOMotorCollection,
+    filter_query: Mapping[str, Any],
+    fields: Sequence[str],
+    to_row: Callable[[Mapping[str, Any]], Dict[str, Any]],
+    fmt: ExportFormat,
+) -> AsyncIterator[bytes]:
+    """
+    Yield the matching documents encoded in chunks of ``EXPORT_BATCH_SIZE`` rows.
+
+    Only one batch is held at a time. The ASGI server awaits each chunk being
+    sent before asking for the next, so a slow client slows down the Mongo
+    cursor instead of letting rows pile up in memory.
+    """
+    batch_size = settings.EXPORT_BATCH_SIZE
+    if fmt == ExportFormat.csv:
+        yield _encode([dict(zip(fields, fields))], fields, fmt)
+
+    cursor = collection.find(
+        filter_query, projection(fields), batch_size=batch_size
+    ).sort("_id", 1)
+    try:
+        batch = []
+        async for doc in cursor:
+            batch.append(to_row(doc))
+            if len(batch) >= batch_size:
+                yield _encode(batch, fields, fmt)
+                batch = []
+        if batch:
+            yield _encode(batch, fields, fmt)
+    finally:
+        # Free the server-side cursor when the client disconnects midway
+        await cursor.close()
+
+
+def export_response(
+    name: str,
+    collection: AsyncIOMotorCollection,
+    filter_query: Mapping[str, Any],
+    fields: Sequence[str],
+    to_row: Callable[[Mapping[str, Any]], Dict[str, Any]],
+    fmt: ExportFormat,
+) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(collection, filter_query, fields, to_row, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt.value}"'},
+    )
@@ -0,0 +1,169 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ReturnDocument
+
+from app.config import settings
+from app.conflicts import schedule_field
+from app.models import Schedule, ScheduleGrid, Subject
+from app.models.grid import GridClass
+from app.models.schedule import DayOfWeek, from_minutes, to_minutes
+
+
+class GridKind(str, Enum):
+    instructor = "instructor"
+    room = "room"
+    section = "section"
+
+
+# Schedule field holding the key of each grid kind
+GRID_FIELDS = {
+    GridKind.instructor: "instructor_id",
+    GridKind.room: "room",
+    GridKind.section: "section",
+}
+
+WEEKDAYS = [day for day in DayOfWeek if day != DayOfWeek.Sunday]
+
+
+async def build_grid(kind: GridKind, key: str) -> Dict[str, Any]:
+    """Lay out every class of one instructor, room or section as a week grid."""
+    docs = (
+        await Schedule.get_motor_collection()
+        .find({GRID_FIELDS[kind]: key})
+        .sort([("start_min", 1), ("day", 1)])
+        .to_list(None)
+    )
+    codes = sorted({doc["subject_code"] for doc in docs})
+    descriptions = {
+        doc["subject_code"]: doc["subject_description"]
+        async for doc in Subject.get_motor_collection().find(
+            {"subject_code": {"$in": codes}},
+            {"subject_code": 1, "subject_description": 1},
+        )
+    }
+
+    size = settings.SCHEDULE_GRID_SLOT_MINUTES
+    first = min(
+        [to_minutes(settings.SCHEDULE_GRID_DAY_START)]
+        + [doc["start_min"] for doc in docs]
+    )
+    last = max(
+        [to_minutes(settings.SCHEDULE_GRID_DAY_END)] + [doc["end_min"] for doc in docs]
+    )
+    first = first // size * size
+    rows = -(-(last - first) // size)
+    days = list(WEEKDAYS)
+    if any(DayOfWeek(doc["day"]) == DayOfWeek.Sunday for doc in docs):
+        days.append(DayOfWeek.Sunday)
+
+    cells: List[List[Optional[int]]] = [[None] * len(days) for _ in range(rows)]
+    classes = []
+    for doc in docs:
+        row = (doc["start_min"] - first) // size
+        row_span = max(1, -(-(doc["end_min"] - first) // size) - row)
+        column = days.index(DayOfWeek(doc["day"]))
+        for r in range(row, row + row_span):
+            # Overlapping legacy classes keep the first one in the cell
+            if cells[r][column] is None:
+                cells[r][column] = len(classes)
+        classes.append(
+            GridClass(
+                schedule_id=str(doc["_id"]),
+                subject_code=doc["subject_code"],
+                subject_description=descriptions.get(doc["subject_code"]),
+                instructor_id=doc["instructor_id"],
+                section=doc["section"],
+                room=doc["room"],
+                day=doc["day"],
+                start_time=from_minutes(doc["start_min"]),
+                end_time=from_minutes(doc["end_min"]),
+                row=row,
+                row_span=row_span,
+            ).model_dump()
+        )
+
+    return {
+        "subject_codes": codes,
+        "slot_minutes": size,
+        "days": [day.value for day in days],
+        "times": [from_minutes(first + r * size) for r in range(rows)],
+        "cells": cells,
+        "classes": classes,
+    }
+
+
+async def get_grid(kind: GridKind, key: str) -> Dict[str, Any]:
+    """
+    Return the stored grid, rebuilding it first when it is missing or stale.
+
+    A fresh grid costs a single ``find_one``. A rebuild is only saved if no
+    write bumped the version meanwhile; otherwise it is still returned but the
+    grid stays stale for the next read. A key no schedule uses gets an empty
+    grid that is not stored, so arbitrary keys do not fill the collection.
+    """
+    collection = ScheduleGrid.get_motor_collection()
+    doc = await collection.find_one({"kind": kind.value, "key": key})
+    if doc is not None and not doc["stale"]:
+        return doc
+
+    if doc is None:
+        if not await Schedule.get_motor_collection().find_one(
+            {GRID_FIELDS[kind]: key}, {"_id": 1}
+        ):
+            grid = await build_grid(kind, key)
+            return {
+                "kind": kind.value,
+                "key": key,
+                **grid,
+                "built_at": datetime.utcnow(),
+            }
+        # Create the placeholder first so a concurrent invalidation has a
+        # version to bump while we build.
+        doc = await collection.find_one_and_update(
+            {"kind": kind.value, "key": key},
+            {"$setOnInsert": {"version": 0, "stale": True}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    grid = {**await build_grid(kind, key), "built_at": datetime.utcnow()}
+    await collection.update_one(
+        {"kind": kind.value, "key": key, "version": doc["version"]},
+        {"$set": {**grid, "stale": False}},
+    )
+    return {**doc, **grid, "kind": kind.value, "key": key}
+
+
+async def refresh_stale_grids(limit: int = 100) -> int:
+    """Rebuild up to ``limit`` stale grids now, so readers rarely wait for one."""
+    stale = (
+        await ScheduleGrid.get_motor_collection()
+        .find({"stale": True}, {"kind": 1, "key": 1})
+        .to_list(limit)
+    )
+    for doc in stale:
+        await get_grid(GridKind(doc["kind"]), doc["key"])
+    return len(stale)
+
+
+async def invalidate_grids(schedules: Iterable[Any]):
+    """Mark the grids of every instructor, room and section of ``schedules`` stale."""
+    keys = {
+        (kind.value, schedule_field(schedule, field))
+        for schedule in schedules
+        for kind, field in GRID_FIELDS.items()
+    }
+    if keys:
+        await ScheduleGrid.get_motor_collection().update_many(
+            {"$or": [{"kind": kind, "key": key} for kind, key in keys]},
+            {"$set": {"stale": True}, "$inc": {"version": 1}},
+        )
+
+
+async def invalidate_subject_grids(subject_code: str):
+    """Mark every grid showing ``subject_code`` stale, e.g. after a rename."""
+    await ScheduleGrid.get_motor_collection().update_many(
+        {"subject_codes": subject_code},
+        {"$set": {"stale": True}, "$inc": {"version": 1}},
+    )
@@ -0,0 +1,262 @@
+"""
+Periodic maintenance jobs, started and stopped by the app's lifespan.
+
+Each job runs in its own task. A run never overlaps the previous one: if a
+run takes longer than the interval, the missed ticks are skipped and counted
+instead of piling up. Every wait gets random jitter so workers started
+together do not hit Mongo in lockstep. Runs are bounded by a timeout, and
+``stop`` cancels everything, including a run in progress.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.conflicts import schedule_index
+from app.db import DOCUMENT_MODELS
+from app.grids import refresh_stale_grids
+from app.reservations import release_orphaned_slots
+from app.revocation import denylist
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    interval: float
+    timeout: Optional[float] = None
+    # Fraction of the interval added at random to every wait
+    jitter: float = 0.1
+    initial_delay: float = 0.0
+
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    skipped: int = 0
+    running: bool = False
+    last_started: Optional[float] = None  # epoch seconds
+    last_duration_ms: Optional[float] = None
+    max_duration_ms: float = 0.0
+    total_duration_ms: float = 0.0
+    last_result: Any = None
+    last_error: Optional[str] = None
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "running": self.running,
+            "last_started": self.last_started,
+            "last_duration_ms": self.last_duration_ms,
+            "max_duration_ms": self.max_duration_ms,
+            "avg_duration_ms": (
+                round(self.total_duration_ms / self.runs, 1) if self.runs else None
+            ),
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._cleanups: List[Callable[[], Awaitable[Any]]] = []
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        interval: float,
+        timeout: Optional[float] = None,
+        jitter: float = 0.1,
+        initial_delay: float = 0.0,
+    ):
+        """Register a job; a non-positive interval disables it."""
+        if interval > 0:
+            self.jobs[name] = Job(name, func, interval, timeout, jitter, initial_delay)
+
+    def add_cleanup(self, func: Callable[[], Awaitable[Any]]):
+        """Await ``func`` in ``stop``, after every job has been cancelled."""
+        self._cleanups.append(func)
+
+    def start(self):
+        for job in self.jobs.values():
+            if job._task is None or job._task.done():
+                job._task = asyncio.create_task(self._loop(job), name=f"job:{job.name}")
+
+    async def stop(self):
+        tasks = [job._task for job in self.jobs.values() if job._task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self.jobs.values():
+            job._task = None
+        for cleanup in self._cleanups:
+            await cleanup()
+
+    async def run(self, name: str) -> bool:
+        """Run a job now, unless it is already running. Returns whether it ran."""
+        job = self.jobs[name]
+        if job.running:
+            job.skipped += 1
+            return False
+
+        job.running = True
+        job.last_started = time.time()
+        started = time.perf_counter()
+        try:
+            job.last_result = await asyncio.wait_for(job.func(), job.timeout)
+            job.last_error = None
+        except TimeoutError:
+            job.timeouts += 1
+            job.failures += 1
+            job.last_error = f"timed out after {job.timeout}s"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"
+            print(f"Job {job.name} failed: {job.last_error}")
+        finally:
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            job.runs += 1
+            job.running = False
+            job.last_duration_ms = elapsed_ms
+            job.total_duration_ms += elapsed_ms
+            job.max_duration_ms = max(job.max_duration_ms, elapsed_ms)
+        return True
+
+    async def _loop(self, job: Job):
+        await asyncio.sleep(job.initial_delay + self._jitter(job))
+        while True:
+            started = time.monotonic()
+            await self.run(job.name)
+            elapsed = time.monotonic() - started
+            # Ticks that passed during a long run are dropped, not made up
+            missed = int(elapsed // job.interval)
+            job.skipped += missed
+            wait = job.interval * (missed + 1) - elapsed
+            await asyncio.sleep(wait + self._jitter(job))
+
+    @staticmethod
+    def _jitter(job: Job) -> float:
+        return random.uniform(0, job.interval * job.jitter)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+
+# Latest $indexStats of every collection, from the index_stats job
+index_stats: Dict[str, List[Dict[str, Any]]] = {}
+
+
+class KeepAlive:
+    """
+    Request the service's own URL so a scale-to-zero host keeps it running.
+    One HTTP client is reused for every ping.
+    """
+
+    def __init__(self):
+        self._client = None
+
+    async def __call__(self) -> int:
+        if self._client is None:
+            # Imported on the first ping rather than during startup
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=10)
+        response = await self._client.get(settings.SELF_PING_URL)
+        return response.status_code
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+async def refresh_views() -> Dict[str, int]:
+    """
+    Refresh the schedule conflict index and rebuild stale weekly grids.
+
+    The index is only rescanned when schedules were written since the last
+    refresh; a quiet period costs one read of the generations collection.
+    """
+    scanned = False
+    if settings.SCHEDULE_INDEX_ENABLED:
+        scanned = await schedule_index.refresh()
+    return {
+        "schedules_indexed": len(schedule_index),
+        "schedules_scanned": int(scanned),
+        "grids": await refresh_stale_grids(),
+    }
+
+
+async def collect_index_stats() -> int:
+    """Record how often each index has been used since the server started."""
+    for model in DOCUMENT_MODELS:
+        collection = model.get_motor_collection()
+        index_stats[collection.name] = [
+            {
+                "name": doc["name"],
+                "key": dict(doc["key"]),
+                "ops": doc["accesses"]["ops"],
+                "since": doc["accesses"]["since"],
+            }
+            async for doc in collection.aggregate([{"$indexStats": {}}])
+        ]
+    return len(index_stats)
+
+
+async def sync_denylist() -> int:
+    await denylist.sync()
+    return len(denylist)
+
+
+def build_scheduler() -> Scheduler:
+    """The API's jobs; an interval of 0 in settings disables a job."""
+    scheduler = Scheduler()
+    keep_alive = KeepAlive()
+    scheduler.add(
+        "keep_alive",
+        keep_alive,
+        settings.JOB_KEEP_ALIVE_SECONDS,
+        timeout=30,
+        initial_delay=5,
+    )
+    scheduler.add_cleanup(keep_alive.aclose)
+    scheduler.add(
+        "token_denylist",
+        sync_denylist,
+        settings.TOKEN_DENYLIST_SYNC_SECONDS,
+        timeout=settings.TOKEN_DENYLIST_SYNC_SECONDS,
+        # The lifespan has just synced it
+        initial_delay=settings.TOKEN_DENYLIST_SYNC_SECONDS,
+    )
+    scheduler.add(
+        "refresh_views",
+        refresh_views,
+        settings.JOB_REFRESH_VIEWS_SECONDS,
+        timeout=120,
+        initial_delay=settings.JOB_REFRESH_VIEWS_SECONDS,
+    )
+    scheduler.add(
+        "release_orphaned_slots",
+        release_orphaned_slots,
+        settings.JOB_RELEASE_ORPHANED_SLOTS_SECONDS,
+        timeout=120,
+    )
+    scheduler.add(
+        "index_stats",
+        collect_index_stats,
+        settings.JOB_INDEX_STATS_SECONDS,
+        timeout=60,
+        initial_delay=60,
+    )
+    return scheduler
@@ -1,34 +1,72 @@
-import asyncio
 from contextlib import asynccontextmanager
 
-import httpx
-from fastapi import FastAPI
+from dataclasses import asdict
 
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app import STARTED
+from app.admission import AdmissionMiddleware
 from app.config import settings
-from app.db import init_db
-from app.routers import auth, users, subjects, schedules
+from app.conflicts import ScheduleConflictError, schedule_index
+from app.db import create_client, create_indexes, init_db, warm_up
+from app.etags import ETagMiddleware
+from app.jobs import build_scheduler
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from app.revocation import denylist
+from app.security import shutdown_executor as shutdown_password_executor
+from app.slow_queries import recorder as slow_query_recorder
+from app.startup import StartupTimer
+from app.timing import SERVER_TIMING_HEADER, ServerTimingMiddleware
+from app.timetable import shutdown_executor
+from app.routers import admin, auth, users, subjects, schedules
 from fastapi.middleware.cors import CORSMiddleware
 
-
-async def ping_self():
-    """Pings the service itself every 10 minutes to prevent sleeping."""
-    await asyncio.sleep(5)  # Wait for startup
-    while True:
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(settings.SELF_PING_URL)
-                print(f"Self-ping status: {response.status_code}")
-        except Exception as e:
-            print(f"Self-ping failed: {e}")
-
-        await asyncio.sleep(600)  # Sleep for 10 minutes
+startup_timer = StartupTimer(STARTED)
+startup_timer.mark("imports")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
-    asyncio.create_task(ping_self())
+    timer = startup_timer
+    timer.mark("app_setup")
+    client = create_client()
+    app.state.mongo_client = client
+    app.state.startup_timer = timer
+    # FAST_STARTUP: serve as soon as Beanie and the unique indexes are ready
+    # and do the rest in the background. Until the schedule index is loaded,
+    # conflict checks query Mongo directly, so nothing waits on it.
+    fast = settings.FAST_STARTUP
+    await init_db(client, skip_indexes=fast)
+    timer.mark("init_db")
+    slow_query_recorder.start(client)
+    if fast:
+        timer.run_in_background("create_indexes", create_indexes())
+        timer.run_in_background(
+            "warm_up", warm_up(client, settings.MONGODB_MIN_POOL_SIZE)
+        )
+    else:
+        await warm_up(client, settings.MONGODB_MIN_POOL_SIZE)
+        timer.mark("warm_up")
+    if settings.SCHEDULE_INDEX_ENABLED:
+        if fast:
+            timer.run_in_background("schedule_index", schedule_index.refresh())
+        else:
+            await schedule_index.refresh()
+            timer.mark("schedule_index")
+    await denylist.sync()
+    timer.mark("token_denylist")
+    scheduler = build_scheduler()
+    app.state.scheduler = scheduler
+    scheduler.start()
+    timer.ready()
     yield
+    await scheduler.stop()
+    await slow_query_recorder.stop()
+    shutdown_executor()
+    shutdown_password_executor()
+    client.close()
 
 
 app = FastAPI(
@@ -36,20 +74,56 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Inside CORS, so that 503s still carry the CORS headers
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read the pagination and caching headers
+    expose_headers=[
+        NEXT_CURSOR_HEADER,
+        TOTAL_COUNT_HEADER,
+        "ETag",
+        "Retry-After",
+        SERVER_TIMING_HEADER,
+    ],
 )
+app.add_middleware(ETagMiddleware)
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+if settings.METRICS_ENABLED:
+    # Outermost, so the timings include every other middleware
+    app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(ScheduleConflictError)
+async def schedule_conflict_handler(request: Request, exc: ScheduleConflictError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "detail": exc.detail,
+            "conflicts": [asdict(conflict) for conflict in exc.conflicts],
+        },
+    )
+
 
 app.include_router(auth.router, tags=["auth"])
 app.include_router(users.router, tags=["users"])
 app.include_router(subjects.router, tags=["subjects"], prefix="/subjects")
 app.include_router(schedules.router, tags=["schedules"], prefix="/schedules")
+app.include_router(admin.router, tags=["admin"], prefix="/admin")
 
 
 @app.get("/")
 async def root():
     return {"message": "Hello, World!"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,322 @@
+"""
+Request and Mongo metrics in the Prometheus text format, served at /metrics.
+
+- ``http_request_duration_seconds``: latency histogram per method and route
+  template (``/schedules/{schedule_id}``, not the raw path), so the number of
+  series stays bounded. Requests that match no route share ``unmatched``.
+- ``http_requests_total``: count per method, route and status.
+- ``http_requests_in_flight``: requests being served, per method.
+- ``app_operation_duration_seconds``: latency of hot functions marked with
+  ``timed``, such as ``check_conflict`` and ``get_current_user``.
+- ``mongodb_command_duration_seconds`` and ``mongodb_command_failures_total``:
+  every command the driver sends, per collection and command name, collected
+  by a pymongo command listener on the client built in ``app.db``.
+
+Metrics are kept per process; with several workers each one is scraped, or
+summed, separately.
+"""
+
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; fine below 100ms, where most requests and commands fall
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        # The Mongo listener is called from the driver's threads
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(
+                f"{self.name}{_format_labels(self.labels, labels)} "
+                f"{_format_value(value)}"
+            )
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> [per-bucket counts (not cumulative), sum, count]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            series = sorted(
+                (labels, (list(counts), total, count))
+                for labels, (counts, total, count) in self._series.items()
+            )
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(
+                    self.labels + ("le",), labels + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_str = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency",
+        ["method", "route"],
+    )
+)
+requests_total = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by status",
+        ["method", "route", "status"],
+    )
+)
+requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests being served", ["method"])
+)
+operation_duration = registry.register(
+    Histogram(
+        "app_operation_duration_seconds",
+        "Latency of instrumented application functions",
+        ["operation"],
+    )
+)
+mongo_command_duration = registry.register(
+    Histogram(
+        "mongodb_command_duration_seconds",
+        "MongoDB command latency, as measured by the driver",
+        ["collection", "command"],
+    )
+)
+mongo_command_failures = registry.register(
+    Counter(
+        "mongodb_command_failures_total",
+        "MongoDB commands that returned an error",
+        ["collection", "command"],
+    )
+)
+
+
+def timed(operation: str) -> Callable:
+    """Record the latency of an async function under ``operation``."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                operation_duration.observe(time.perf_counter() - started, operation)
+
+        return wrapper
+
+    return decorator
+
+
+def route_label(scope: Scope) -> str:
+    """Path template of the matched route, router prefix included."""
+    # Recent FastAPI versions keep the included router's own route, without
+    # its prefix, in scope["route"]; the full template is on the context
+    route = scope.get("fastapi", {}).get("effective_route_context")
+    if route is None:
+        route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Time every HTTP request and count it by route and status."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec(method)
+            # The router stores the matched route in the shared scope
+            route = route_label(scope)
+            request_duration.observe(elapsed, method, route)
+            requests_total.inc(method, route, str(status_code))
+
+
+def command_collection(command_name: str, command: Dict[str, Any]) -> str:
+    """The collection a command targets, or "" for database-level commands."""
+    if command_name == "getMore":
+        return str(command.get("collection", ""))
+    target = command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Feed driver command timings into the Mongo metrics. Only the started
+    event carries the command, so its collection is remembered until the
+    matching succeeded or failed event arrives.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        self._pending[(event.connection_id, event.request_id)] = command_collection(
+            event.command_name, event.command
+        )
+
+    def _finish(self, event) -> Tuple[str, str]:
+        collection = self._pending.pop((event.connection_id, event.request_id), "")
+        mongo_command_duration.observe(
+            event.duration_micros / 1_000_000, collection, event.command_name
+        )
+        return collection, event.command_name
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        mongo_command_failures.inc(*self._finish(event))
+
+
+mongo_listener = MongoCommandListener()
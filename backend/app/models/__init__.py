@@ -2,5 +2,22 @@ from .item import Item
 from .subject import Subject
 from .user import User, UserRole, DepartmentType
 from .schedule import Schedule
+from .slot import ScheduleSlot
+from .grid import ScheduleGrid
+from .generation import Generation
+from .revoked_token import RevokedToken
+from .slow_query import SlowQuery
 
-__all__ = ["Item", "User", "UserRole", "DepartmentType", "Subject", "Schedule"]
+__all__ = [
+    "Item",
+    "User",
+    "UserRole",
+    "DepartmentType",
+    "Subject",
+    "Schedule",
+    "ScheduleSlot",
+    "ScheduleGrid",
+    "Generation",
+    "RevokedToken",
+    "SlowQuery",
+]
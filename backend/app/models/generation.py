@@ -0,0 +1,18 @@
+from beanie import Document
+from pymongo import IndexModel
+
+
+class Generation(Document):
+    """
+    Write counter of one collection, bumped after every change to it.
+
+    Conditional GETs compare ETags derived from these counters, so an
+    unchanged poll only reads this tiny collection.
+    """
+
+    collection: str
+    value: int = 0
+
+    class Settings:
+        name = "generations"
+        indexes = [IndexModel("collection", unique=True)]
@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import List, Optional
+
+from beanie import Document
+from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel
+
+from .schedule import DayOfWeek
+
+
+class GridClass(BaseModel):
+    schedule_id: str
+    subject_code: str
+    subject_description: Optional[str] = None
+    instructor_id: str
+    section: str
+    room: str
+    day: DayOfWeek
+    start_time: str
+    end_time: str
+    # First grid row the class covers and how many rows it spans
+    row: int
+    row_span: int
+
+
+class ScheduleGrid(Document):
+    """
+    Materialized weekly grid of one instructor, room or section.
+
+    Schedule and subject writes mark the grids they touch as stale and bump
+    ``version``; the next read rebuilds the grid and stores it only if the
+    version is unchanged, so a concurrent write is never overwritten by an
+    older build.
+    """
+
+    kind: str  # "instructor", "room" or "section"
+    key: str
+    version: int = 0
+    stale: bool = True
+    built_at: Optional[datetime] = None
+    subject_codes: List[str] = []
+
+    slot_minutes: int = 30
+    days: List[DayOfWeek] = []
+    times: List[str] = []  # start of each row, HH:MM
+    # cells[row][column] is an index into ``classes`` or None when free
+    cells: List[List[Optional[int]]] = []
+    classes: List[GridClass] = []
+
+    class Settings:
+        name = "schedule_grids"
+        indexes = [
+            IndexModel([("kind", ASCENDING), ("key", ASCENDING)], unique=True),
+            "subject_codes",
+        ]
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from beanie import Document
+from pymongo import IndexModel
+
+
+class RevokedToken(Document):
+    """
+    A token that was revoked before it expired, identified by its ``jti``.
+
+    Mongo's TTL monitor deletes the row once the token would have expired
+    anyway, so the collection only ever holds revocations that still matter.
+    """
+
+    jti: str
+    expires_at: datetime
+    revoked_at: datetime
+
+    class Settings:
+        name = "revoked_tokens"
+        indexes = [
+            IndexModel("jti", unique=True),
+            IndexModel("expires_at", expireAfterSeconds=0),
+            "revoked_at",
+        ]
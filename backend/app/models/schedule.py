@@ -1,5 +1,9 @@
 from enum import Enum
+from typing import Any
+
 from beanie import Document
+from pydantic import model_validator
+from pymongo import ASCENDING, IndexModel
 
 
 class DayOfWeek(str, Enum):
@@ -12,15 +16,69 @@ class DayOfWeek(str, Enum):
     Sunday = "Sun"
 
 
+def to_minutes(value: str) -> int:
+    """Convert an ``HH:MM`` (or ``H:MM``) string to minutes since midnight."""
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def from_minutes(value: int) -> str:
+    """Convert minutes since midnight back to a zero-padded ``HH:MM`` string."""
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+def time_fields_to_minutes(data: dict) -> dict:
+    """Replace ``start_time``/``end_time`` strings in ``data`` with integer minutes."""
+    for field, target in (("start_time", "start_min"), ("end_time", "end_min")):
+        if isinstance(data.get(field), str):
+            data[target] = to_minutes(data.pop(field))
+    return data
+
+
+def _resource_time_index(resource: str) -> IndexModel:
+    return IndexModel(
+        [
+            (resource, ASCENDING),
+            ("day", ASCENDING),
+            ("start_min", ASCENDING),
+            ("end_min", ASCENDING),
+        ]
+    )
+
+
 class Schedule(Document):
     subject_code: str
     instructor_id: str
     section: str
     day: DayOfWeek
-    start_time: str  # Store as string HH:MM for simplicity in JSON, or time object if Beanie handles it well. Beanie handles datetime.time.
-    end_time: str
+    # Minutes since midnight; the API still speaks HH:MM via start_time/end_time
+    start_min: int
+    end_min: int
     room: str
 
+    @model_validator(mode="before")
+    @classmethod
+    def accept_hhmm_times(cls, data: Any) -> Any:
+        if isinstance(data, dict):
+            data = time_fields_to_minutes(dict(data))
+        return data
+
+    @property
+    def start_time(self) -> str:
+        return from_minutes(self.start_min)
+
+    @property
+    def end_time(self) -> str:
+        return from_minutes(self.end_min)
+
     class Settings:
         name = "schedules"
-        indexes = ["instructor_id", "subject_code", "day"]
\ No newline at end of file
+        indexes = [
+            "instructor_id",
+            "subject_code",
+            "day",
+            # Conflict checks are integer range scans per resource and day
+            _resource_time_index("instructor_id"),
+            _resource_time_index("room"),
+            _resource_time_index("section"),
+        ]
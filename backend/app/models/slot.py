@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, IndexModel
+
+from .schedule import DayOfWeek
+
+
+class ScheduleSlot(Document):
+    """
+    Claim on one SCHEDULE_SLOT_MINUTES block of a resource's day.
+
+    The unique index makes a claim atomic: of two writers racing for the same
+    instructor, room or section slot, exactly one insert succeeds.
+    """
+
+    resource: str  # "instructor_id", "room" or "section"
+    value: str
+    day: DayOfWeek
+    slot: int  # block number since midnight
+    schedule_id: PydanticObjectId
+    claimed_at: datetime
+
+    class Settings:
+        name = "schedule_slots"
+        indexes = [
+            IndexModel(
+                [
+                    ("resource", ASCENDING),
+                    ("value", ASCENDING),
+                    ("day", ASCENDING),
+                    ("slot", ASCENDING),
+                ],
+                unique=True,
+            ),
+            "schedule_id",
+        ]
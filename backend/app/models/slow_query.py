@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from beanie import Document
+
+
+class SlowQuery(Document):
+    """
+    A Mongo command that took longer than ``SLOW_QUERY_THRESHOLD_MS``.
+
+    ``shape`` is the command's filter with every value replaced by its type,
+    so the same query with different arguments has the same shape. The first
+    entry of a shape, and then one per ``SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS``,
+    carries the query plan. Stored in a capped collection, which keeps only
+    the most recent entries.
+    """
+
+    recorded_at: datetime
+    database: str
+    collection: str
+    command: str
+    duration_ms: float
+    shape: Dict[str, Any]
+    shape_key: str
+    failed: bool = False
+    # From explain(): e.g. "COLLSCAN" or "IXSCAN { room: 1, day: 1 }"
+    plan_summary: Optional[str] = None
+    collscan: Optional[bool] = None
+    winning_plan: Optional[Dict[str, Any]] = None
+
+    class Settings:
+        name = "slow_queries"
@@ -1,6 +1,8 @@
 from typing import Optional
 from beanie import Document
 from pydantic import Field
+from pymongo import IndexModel
+
 from .user import DepartmentType
 
 
@@ -13,5 +15,5 @@ class Subject(Document):
     class Settings:
         name = "subjects"
         indexes = [
-            "subject_code",
+            IndexModel("subject_code", unique=True),
         ]
@@ -1,6 +1,7 @@
 from enum import Enum
 
 from beanie import Document
+from pymongo import IndexModel
 
 
 class UserRole(str, Enum):
@@ -30,5 +31,7 @@ class User(Document):
     class Settings:
         name = "users"
         indexes = [
-            "user_id",
-        ]
\ No newline at end of file
+            IndexModel("user_id", unique=True),
+            # Chairpersons list the instructors of their department
+            "department",
+        ]
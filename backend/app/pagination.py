@@ -0,0 +1,115 @@
+import base64
+import binascii
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from beanie.odm.queries.find import FindMany
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+from fastapi import HTTPException, Response
+
+from app.config import settings
+from app.serializers import FastJSONResponse, projection, sparse_row
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# (collection, filter) -> (counted at, count)
+_counts: Dict[Tuple[str, str], Tuple[float, int]] = {}
+_MAX_CACHED_COUNTS = 1000
+
+
+def encode_cursor(last_id: ObjectId) -> str:
+    return base64.urlsafe_b64encode(ObjectId(str(last_id)).binary).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def count_documents(query: FindMany) -> int:
+    """
+    Total for a list query without scanning it on every page.
+
+    Unfiltered lists use the collection's metadata count. Filtered counts are
+    cached for ``PAGINATION_COUNT_CACHE_SECONDS``, so paging through a result
+    set counts it once.
+    """
+    collection = query.document_model.get_motor_collection()
+    filter_query = query.get_filter_query()
+    if not filter_query:
+        return await collection.estimated_document_count()
+
+    key = (collection.name, json_util.dumps(filter_query, sort_keys=True))
+    now = time.monotonic()
+    cached = _counts.get(key)
+    if cached and now - cached[0] < settings.PAGINATION_COUNT_CACHE_SECONDS:
+        return cached[1]
+
+    total = await collection.count_documents(filter_query)
+    if len(_counts) >= _MAX_CACHED_COUNTS:
+        _counts.clear()
+    _counts[key] = (now, total)
+    return total
+
+
+async def paginate(
+    query: FindMany,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    skip: int = 0,
+    include_total: bool = False,
+    fields: Optional[Sequence[str]] = None,
+    to_row: Optional[Callable[[Mapping[str, Any]], Dict[str, Any]]] = None,
+) -> Union[List, FastJSONResponse]:
+    """
+    Return one page of ``query`` in ``_id`` order.
+
+    With a cursor the page starts right after the document it names, which is
+    an index seek on ``_id`` however deep the page is. ``skip`` is still
+    honoured when no cursor is given. When more documents follow, the cursor
+    for the next page is sent in ``X-Next-Cursor``; ``include_total`` adds
+    ``X-Total-Count``. The body stays a plain list.
+
+    With ``fields`` only those fields are projected in Mongo and the raw
+    documents are turned into rows by ``to_row``; the page is encoded with
+    orjson and returned as a ready response, so no Document or response
+    model is built.
+    """
+    headers: Dict[str, str] = {}
+    if include_total:
+        headers[TOTAL_COUNT_HEADER] = str(await count_documents(query))
+
+    if cursor:
+        query = query.find({"_id": {"$gt": decode_cursor(cursor)}})
+    elif skip:
+        query = query.skip(skip)
+
+    if fields is None:
+        items = await query.sort("+_id").limit(limit + 1).to_list()
+        ids = [item.id for item in items]
+    else:
+        items = (
+            await query.document_model.get_motor_collection()
+            .find(query.get_filter_query(), projection(fields))
+            .sort("_id", 1)
+            .skip(skip if not cursor else 0)
+            .limit(limit + 1)
+            .to_list(None)
+        )
+        ids = [item["_id"] for item in items]
+
+    if len(items) > limit:
+        items = items[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(ids[limit - 1])
+
+    if fields is None:
+        response.headers.update(headers)
+        return items
+    return FastJSONResponse(
+        [sparse_row(to_row(doc), fields) for doc in items], headers=headers
+    )
@@ -0,0 +1,201 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.conflicts import (
+    RESOURCES,
+    ScheduleConflictError,
+    conflicts_with,
+    schedule_field,
+)
+from app.models import Schedule, ScheduleSlot
+from app.models.schedule import DayOfWeek
+
+DUPLICATE_KEY = 11000
+
+# (resource, value, day, slot)
+SlotKey = Tuple[str, str, str, int]
+
+
+def slot_keys(schedule: Any) -> Set[SlotKey]:
+    """Every slot a schedule (document or dict) occupies on each of its resources.
+
+    The API only accepts times on slot boundaries, so the blocks match the
+    class exactly. Legacy times inside a block are rounded outward until
+    align_schedule_times.py has moved them onto the boundaries.
+    """
+    size = settings.SCHEDULE_SLOT_MINUTES
+    day = DayOfWeek(schedule_field(schedule, "day")).value
+    first = schedule_field(schedule, "start_min") // size
+    last = -(-schedule_field(schedule, "end_min") // size)
+    return {
+        (resource, schedule_field(schedule, resource), day, slot)
+        for resource in RESOURCES
+        for slot in range(first, last)
+    }
+
+
+def _key_filter(key: SlotKey) -> Dict[str, Any]:
+    resource, value, day, slot = key
+    return {"resource": resource, "value": value, "day": day, "slot": slot}
+
+
+async def claim_many(
+    claims: Dict[ObjectId, Iterable[SlotKey]],
+) -> Dict[ObjectId, Set[SlotKey]]:
+    """
+    Claim slots for several schedules with one unordered insert_many.
+
+    Returns schedule id -> slots already held by someone else, for every
+    schedule that lost at least one slot. All claims of those schedules are
+    released again, so a schedule either holds all of its slots or none.
+    """
+    now = datetime.utcnow()
+    return await _insert_claims(
+        [_claim_doc(key, owner, now) for owner, keys in claims.items() for key in keys]
+    )
+
+
+def _claim_doc(key: SlotKey, owner: ObjectId, now: datetime) -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(),
+        **_key_filter(key),
+        "schedule_id": owner,
+        "claimed_at": now,
+    }
+
+
+async def _insert_claims(docs: List[Dict[str, Any]]) -> Dict[ObjectId, Set[SlotKey]]:
+    if not docs:
+        return {}
+
+    collection = ScheduleSlot.get_motor_collection()
+    lost: Dict[ObjectId, Set[SlotKey]] = {}
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as exc:
+        errors = exc.details.get("writeErrors", [])
+        if any(error["code"] != DUPLICATE_KEY for error in errors):
+            await collection.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+            raise
+        for error in errors:
+            doc = docs[error["index"]]
+            lost.setdefault(doc["schedule_id"], set()).add(
+                (doc["resource"], doc["value"], doc["day"], doc["slot"])
+            )
+        await collection.delete_many(
+            {"_id": {"$in": [d["_id"] for d in docs if d["schedule_id"] in lost]}}
+        )
+    return lost
+
+
+async def conflict_for_taken_slots(
+    schedule: Any, taken: Set[SlotKey]
+) -> ScheduleConflictError:
+    """Describe who holds ``taken`` as the same error a conflict check raises."""
+    holders = await ScheduleSlot.get_motor_collection().distinct(
+        "schedule_id", {"$or": [_key_filter(key) for key in taken]}
+    )
+    docs = (
+        await Schedule.get_motor_collection()
+        .find({"_id": {"$in": holders}})
+        .to_list(None)
+    )
+    conflicts = [c for doc in docs for c in conflicts_with(schedule, doc)]
+    if conflicts:
+        return ScheduleConflictError(conflicts)
+    if len(docs) < len(holders):
+        # A holder claimed its slots but has not written its schedule yet
+        return ScheduleConflictError(
+            [], reason="The requested time is being booked by a concurrent request."
+        )
+    # Every holder is written and none overlaps: a legacy schedule with times
+    # inside a block shares that block with this one
+    return ScheduleConflictError(
+        [],
+        reason=(
+            "The requested time shares a "
+            f"{settings.SCHEDULE_SLOT_MINUTES}-minute slot with a schedule "
+            "whose times are not on a slot boundary."
+        ),
+    )
+
+
+async def reserve(schedule: Any, schedule_id: ObjectId):
+    """Claim all slots of a new schedule, or raise ScheduleConflictError."""
+    lost = await claim_many({schedule_id: slot_keys(schedule)})
+    if lost:
+        raise await conflict_for_taken_slots(schedule, lost[schedule_id])
+
+
+async def reserve_change(
+    schedule: Any, schedule_id: ObjectId
+) -> Tuple[List[ObjectId], List[ObjectId]]:
+    """
+    Claim the slots an updated schedule needs and does not hold yet.
+
+    Returns the ids of the new claims and of the held claims the new state no
+    longer needs. Once the schedule itself has been written, ``release`` the
+    unneeded ones; if writing it fails, ``release`` the new ones instead.
+    """
+    held = {
+        (doc["resource"], doc["value"], doc["day"], doc["slot"]): doc["_id"]
+        for doc in await ScheduleSlot.get_motor_collection()
+        .find({"schedule_id": schedule_id})
+        .to_list(None)
+    }
+    wanted = slot_keys(schedule)
+    now = datetime.utcnow()
+    docs = [_claim_doc(key, schedule_id, now) for key in wanted - held.keys()]
+    lost = await _insert_claims(docs)
+    if lost:
+        raise await conflict_for_taken_slots(schedule, lost[schedule_id])
+    return (
+        [doc["_id"] for doc in docs],
+        [claim_id for key, claim_id in held.items() if key not in wanted],
+    )
+
+
+async def release(
+    schedule_id: ObjectId, claim_ids: Optional[Iterable[ObjectId]] = None
+):
+    """Drop the given claims of a schedule, or all of them when none are given."""
+    query: Dict[str, Any] = {"schedule_id": schedule_id}
+    if claim_ids is not None:
+        query["_id"] = {"$in": list(claim_ids)}
+    await ScheduleSlot.get_motor_collection().delete_many(query)
+
+
+async def release_all(schedule_ids: Iterable[ObjectId]):
+    """Drop every claim of the given schedules."""
+    await ScheduleSlot.get_motor_collection().delete_many(
+        {"schedule_id": {"$in": list(schedule_ids)}}
+    )
+
+
+async def release_orphaned_slots() -> int:
+    """
+    Delete claims whose schedule was never written (e.g. a worker died between
+    claiming and inserting). Claims younger than the grace period are left
+    alone because their writer may still be in flight.
+    """
+    collection = ScheduleSlot.get_motor_collection()
+    cutoff = datetime.utcnow() - timedelta(
+        seconds=settings.SCHEDULE_SLOT_ORPHAN_GRACE_SECONDS
+    )
+    owners = await collection.distinct("schedule_id", {"claimed_at": {"$lt": cutoff}})
+    if not owners:
+        return 0
+    existing = set(
+        await Schedule.get_motor_collection().distinct("_id", {"_id": {"$in": owners}})
+    )
+    orphans = [owner for owner in owners if owner not in existing]
+    if not orphans:
+        return 0
+    result = await collection.delete_many(
+        {"schedule_id": {"$in": orphans}, "claimed_at": {"$lt": cutoff}}
+    )
+    return result.deleted_count
@@ -0,0 +1,82 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from app.models import RevokedToken
+
+# Revocations written this close to a sync may not be visible to it yet
+_SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class Denylist:
+    """
+    ``jti`` -> expiry (epoch seconds) of revoked tokens that are still valid.
+
+    Checks are a dict lookup. Revocations are also stored in the
+    ``revoked_tokens`` TTL collection, and ``sync`` pulls the ones made by
+    other workers (the ``token_denylist`` job), so a revoked token is refused
+    everywhere within ``TOKEN_DENYLIST_SYNC_SECONDS``. Expired entries are
+    dropped as they are met and on every sync, which keeps the set as small
+    as the number of live revoked tokens.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, float] = {}
+        self._synced_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        expires_at = self._entries.get(jti)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self._entries[jti]
+            return False
+        return True
+
+    def add(self, jti: str, expires_at: float):
+        if expires_at > time.time():
+            self._entries[jti] = expires_at
+
+    def prune(self):
+        now = time.time()
+        for jti in [jti for jti, exp in self._entries.items() if exp <= now]:
+            del self._entries[jti]
+
+    async def revoke(self, jti: str, expires_at: float) -> bool:
+        """
+        Revoke ``jti`` everywhere. Returns False when it was already revoked,
+        possibly by another worker that has not synced to this one yet.
+        """
+        self.add(jti, expires_at)
+        result = await RevokedToken.get_motor_collection().update_one(
+            {"jti": jti},
+            {
+                "$setOnInsert": {
+                    "expires_at": datetime.fromtimestamp(expires_at, tz=timezone.utc),
+                    "revoked_at": datetime.utcnow(),
+                }
+            },
+            upsert=True,
+        )
+        return result.upserted_id is not None
+
+    async def sync(self):
+        """Load revocations made since the last sync (all of them the first time)."""
+        started = datetime.utcnow()
+        query = {"expires_at": {"$gt": started}}
+        if self._synced_at is not None:
+            query["revoked_at"] = {"$gte": self._synced_at - _SYNC_OVERLAP}
+        async for doc in RevokedToken.get_motor_collection().find(
+            query, {"jti": 1, "expires_at": 1}
+        ):
+            # Mongo returns naive UTC datetimes
+            expires_at = doc["expires_at"].replace(tzinfo=timezone.utc)
+            self.add(doc["jti"], expires_at.timestamp())
+        self._synced_at = started
+        self.prune()
+
+
+denylist = Denylist()
@@ -0,0 +1,161 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+
+from app.admission import admission_stats
+from app.cache import cache_stats, principal_cache, subject_cache, user_cache
+from app.deps import get_current_admin_user
+from app.jobs import index_stats
+from app.models import SlowQuery, User
+from app.slow_queries import recorder as slow_query_recorder
+from app.timing import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/cache")
+async def read_cache_stats(
+    current_admin: User = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Size and hit/miss counters of the subject, user and token caches of this
+    worker.
+    """
+    return cache_stats()
+
+
+@router.get("/admission")
+async def read_admission_stats(
+    current_admin: User = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Per route group: concurrency limit, queue size, requests running and
+    waiting now, and how many were admitted or shed since this worker started.
+    """
+    return admission_stats()
+
+
+@router.get("/startup")
+async def read_startup_timings(
+    request: Request,
+    current_admin: User = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    How long this worker took to start, per phase, and how long the work
+    deferred by FAST_STARTUP took once serving had begun.
+    """
+    return request.app.state.startup_timer.report()
+
+
+@router.get("/jobs")
+async def read_jobs(
+    request: Request,
+    current_admin: User = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Interval, run and failure counts, skipped ticks and timings of every
+    maintenance job of this worker.
+    """
+    return request.app.state.scheduler.stats()
+
+
+@router.post("/jobs/{name}/run")
+async def run_job(
+    name: str,
+    request: Request,
+    current_admin: User = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Run a maintenance job now, unless a run of it is already in progress.
+    """
+    scheduler = request.app.state.scheduler
+    if name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    await scheduler.run(name)
+    return scheduler.jobs[name].stats()
+
+
+@router.get("/index-stats")
+async def read_index_stats(
+    current_admin: User = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Per collection, how often each index has been used, as last collected by
+    the index_stats job. An index with few ops is a candidate for removal.
+    """
+    return index_stats
+
+
+@router.get("/slow-queries")
+async def read_slow_queries(
+    collection: Optional[str] = None,
+    collscan: Optional[bool] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_admin: User = Depends(get_current_admin_user),
+) -> List[Dict[str, Any]]:
+    """
+    The most recent slow queries, newest first. ``collscan=true`` keeps the
+    entries whose sampled plan is a collection scan.
+    """
+    filter_query: Dict[str, Any] = {}
+    if collection:
+        filter_query["collection"] = collection
+    if collscan is not None:
+        filter_query["collscan"] = collscan
+    entries = (
+        await SlowQuery.get_motor_collection()
+        .find(filter_query, {"_id": 0})
+        .sort("$natural", -1)
+        .to_list(limit)
+    )
+    return entries
+
+
+@router.get("/slow-queries/shapes")
+async def read_slow_query_shapes(
+    current_admin: User = Depends(get_current_admin_user),
+) -> Dict[str, Any]:
+    """
+    Slow queries grouped by filter shape, slowest first, with the plans seen
+    for each shape. A shape whose plans include COLLSCAN needs an index.
+    """
+    shapes = (
+        await SlowQuery.get_motor_collection()
+        .aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": "$shape_key",
+                        "collection": {"$first": "$collection"},
+                        "command": {"$first": "$command"},
+                        "shape": {"$first": "$shape"},
+                        "count": {"$sum": 1},
+                        "avg_duration_ms": {"$avg": "$duration_ms"},
+                        "max_duration_ms": {"$max": "$duration_ms"},
+                        "last_seen": {"$max": "$recorded_at"},
+                        "collscan": {"$max": "$collscan"},
+                        "plans": {"$addToSet": "$plan_summary"},
+                    }
+                },
+                {"$sort": {"max_duration_ms": -1}},
+            ]
+        )
+        .to_list(None)
+    )
+    for shape in shapes:
+        shape["shape_key"] = shape.pop("_id")
+        shape["plans"] = [plan for plan in shape["plans"] if plan is not None]
+    return {"recorder": slow_query_recorder.stats(), "shapes": shapes}
+
+
+@router.delete("/cache", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_caches(
+    current_admin: User = Depends(get_current_admin_user),
+):
+    """
+    Drop every cached subject, user and token of this worker, e.g. after
+    editing the collections directly in the database.
+    """
+    subject_cache.clear()
+    user_cache.clear()
+    principal_cache.clear()
@@ -1,29 +1,124 @@
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError
 
+from app.cache import principal_cache, user_cache
+from app.deps import oauth2_scheme
+from app.etags import bump_generation
 from app.models import User
-from app.schemas.users import Token
-from app.security import (  # Using app.security since utils didn't exist, wait I named it app/security.py. I should import from app.security
+from app.revocation import denylist
+from app.schemas.users import LogoutRequest, RefreshRequest, Token
+from app.timing import TimedRoute, span
+from app.security import (
+    REFRESH_TOKEN,
+    check_password,
     create_access_token,
-    verify_password,
+    create_refresh_token,
+    decode_token,
+    TokenRevoked,
 )
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/token", response_model=Token)
 async def login_access_token(form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
     user = await User.find_one(User.user_id == form_data.username)
 
-    if not user or not verify_password(form_data.password, user.password):
+    with span("password"):
+        valid, new_hash = await check_password(
+            form_data.password, user.password if user else None
+        )
+    if not user or not valid:
         raise HTTPException(status_code=400, detail="Incorrect user_id or password")
 
+    if new_hash:
+        # Plaintext or outdated hash: upgrade it now that we know the password
+        await user.set({User.password: new_hash})
+        user_cache.invalidate(user.user_id)
+        principal_cache.invalidate_user(user.user_id)
+        await bump_generation(User)
+
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
 
+    return issue_tokens(user.user_id)
+
+
+def issue_tokens(user_id: str) -> dict:
     return {
-        "access_token": create_access_token(subject=user.user_id),
+        "access_token": create_access_token(subject=user_id),
+        "refresh_token": create_refresh_token(subject=user_id),
         "token_type": "bearer",
     }
+
+
+def invalid_credentials() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Could not validate credentials",
+    )
+
+
+def refresh_token_used() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token has already been used",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+@router.post("/token/refresh", response_model=Token)
+async def refresh_access_token(refresh_in: RefreshRequest) -> Any:
+    """
+    Trade a refresh token for a new access and refresh token pair without
+    sending the password again. The refresh token is single use: it is
+    revoked as the new pair is issued, and only the request that revokes it
+    gets a new pair, even when two workers race to refresh it.
+    """
+    try:
+        payload = decode_token(refresh_in.refresh_token, REFRESH_TOKEN)
+    except TokenRevoked:
+        raise refresh_token_used()
+    except JWTError:
+        raise invalid_credentials()
+
+    user = await user_cache.get(payload["sub"])
+    if not user or not user.is_active:
+        raise invalid_credentials()
+
+    if not await denylist.revoke(payload["jti"], payload["exp"]):
+        raise refresh_token_used()
+    return issue_tokens(user.user_id)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    logout_in: Optional[LogoutRequest] = None,
+    token: str = Depends(oauth2_scheme),
+):
+    """
+    Revoke the access token of the request and, if given, the session's
+    refresh token.
+    """
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        raise invalid_credentials()
+    revoked = [payload]
+
+    if logout_in and logout_in.refresh_token:
+        try:
+            refresh = decode_token(logout_in.refresh_token, REFRESH_TOKEN)
+        except JWTError:
+            raise invalid_credentials()
+        if refresh["sub"] != payload["sub"]:
+            raise invalid_credentials()
+        revoked.append(refresh)
+
+    for claims in revoked:
+        # Tokens issued before jti claims existed simply run out
+        if "jti" in claims:
+            await denylist.revoke(claims["jti"], claims["exp"])
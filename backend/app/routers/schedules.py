@@ -1,89 +1,413 @@
-from typing import List, Optional
+import csv
+import io
+import json
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from beanie import PydanticObjectId
+from beanie.operators import In
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
 
-from app.models.schedule import Schedule, DayOfWeek
-from app.schemas.schedule import ScheduleCreate, ScheduleOut, ScheduleUpdate
+from app.config import settings
+from app.conflicts import (
+    DAY_NAMES,
+    RESOURCE_LABELS,
+    RESOURCES,
+    ScheduleConflictError,
+    find_batch_conflicts,
+    find_conflicts,
+    schedule_index,
+    schedule_intervals,
+)
+from app.deps import get_current_chairperson_user
+from app.etags import bump_generation, conditional
+from app.exports import ExportFormat, export_response
+from app.grids import GridKind, get_grid, invalidate_grids
+from app.metrics import timed
+from app.models import Subject, User, UserRole
+from app.pagination import paginate
+from app.reservations import (
+    claim_many,
+    conflict_for_taken_slots,
+    release,
+    release_all,
+    reserve,
+    reserve_change,
+    slot_keys,
+)
+from app.models.schedule import (
+    DayOfWeek,
+    Schedule,
+    from_minutes,
+    time_fields_to_minutes,
+    to_minutes,
+)
+from app.schemas.schedule import (
+    BulkImportResult,
+    BulkMode,
+    BulkRowResult,
+    BulkRowStatus,
+    DayFreeSlots,
+    FreeSlotsResult,
+    FreeWindow,
+    TIME_PATTERN,
+    ScheduleCreate,
+    ScheduleGridOut,
+    ScheduleOut,
+    ScheduleUpdate,
+    TimetableRequest,
+    TimetableResult,
+    UnplacedCourse,
+)
+from app.serializers import (
+    FIELDS_DESCRIPTION,
+    SCHEDULE_FIELDS,
+    parse_fields,
+    schedule_row,
+)
+from app.timetable import Course, Problem, busy_mask, run_solver
+from app.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
-async def check_conflict(
-    instructor_id: str,
-    day: DayOfWeek,
-    start_time: str,
-    end_time: str,
-    exclude_schedule_id: Optional[PydanticObjectId] = None,
-):
-    # Overlap logic: (StartA < EndB) and (EndA > StartB)
-    # New schedule: StartA, EndA
-    # Existing schedule: StartB, EndB
-
-    # query = {
-    #     "instructor_id": instructor_id,
-    #     "day": day,
-    #     "$and": [{"start_time": {"$lt": end_time}}, {"end_time": {"$gt": start_time}}],
-    # }
-
-    # If excluding a specific schedule (for updates)
-    if exclude_schedule_id:
-        # Beanie/Mongo filter to exclude this ID
-        # query["_id"] = {"$ne": exclude_schedule_id}
-        # But we are using Beanie's find syntax below usually, but let's see.
-        # It's easier to use the find argument.
-        pass
-
-    # We can use pure Beanie find
-    schedules = Schedule.find(
-        Schedule.instructor_id == instructor_id,
-        Schedule.day == day,
-        Schedule.start_time < end_time,
-        Schedule.end_time > start_time,
-    )
+@timed("check_conflict")
+async def check_conflict(schedule: Any, exclude_schedule_id: Any = None):
+    """Raise a ScheduleConflictError listing every resource that is double-booked."""
+    conflicts = await find_conflicts(schedule, exclude_schedule_id)
+    if conflicts:
+        raise ScheduleConflictError(conflicts)
+
+
+@router.post("/", response_model=ScheduleOut, status_code=status.HTTP_201_CREATED)
+async def create_schedule(schedule_in: ScheduleCreate):
+    schedule = Schedule(id=PydanticObjectId(), **schedule_in.model_dump())
+    # The check gives a detailed answer cheaply; the slot claim is what makes
+    # the write safe against concurrent requests on other workers.
+    await check_conflict(schedule)
+    await reserve(schedule, schedule.id)
+
+    try:
+        await schedule.create()
+    except Exception:
+        await release(schedule.id)
+        raise
+    schedule_index.add(schedule)
+    await invalidate_grids([schedule])
+    await bump_generation(Schedule)
+    return schedule
+
 
-    if exclude_schedule_id:
-        schedules = schedules.find(Schedule.id != exclude_schedule_id)
-
-    conflicting_schedule = await schedules.first_or_none()
-    if conflicting_schedule:
-        day_map = {
-            DayOfWeek.Monday: "Monday",
-            DayOfWeek.Tuesday: "Tuesday",
-            DayOfWeek.Wednesday: "Wednesday",
-            DayOfWeek.Thursday: "Thursday",
-            DayOfWeek.Friday: "Friday",
-            DayOfWeek.Saturday: "Saturday",
-            DayOfWeek.Sunday: "Sunday",
-        }
-        day_name = day_map.get(conflicting_schedule.day, conflicting_schedule.day)
+async def read_bulk_rows(request: Request) -> List[Any]:
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        return list(reader)
+
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload.")
+    if not isinstance(rows, list):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Schedule conflict detected. This time overlaps with another schedule on {day_name}, {conflicting_schedule.start_time}-{conflicting_schedule.end_time}.",
+            status_code=400, detail="Expected a JSON array of schedules."
         )
+    return rows
 
 
-@router.post("/", response_model=ScheduleOut, status_code=status.HTTP_201_CREATED)
-async def create_schedule(schedule_in: ScheduleCreate):
-    await check_conflict(
-        instructor_id=schedule_in.instructor_id,
-        day=schedule_in.day,
-        start_time=schedule_in.start_time,
-        end_time=schedule_in.end_time,
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_create_schedules(request: Request, mode: BulkMode = BulkMode.atomic):
+    """
+    Import many schedules from a JSON array or a CSV body (Content-Type: text/csv).
+
+    Existing schedules of the affected instructors and days are fetched in one
+    query, and the batch is checked against them and against itself in a
+    single sweep. In atomic mode nothing is written unless every row is
+    accepted; in best_effort mode the accepted rows are written and the
+    others are reported.
+    """
+    raw_rows = await read_bulk_rows(request)
+    if len(raw_rows) > settings.BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A bulk import accepts at most {settings.BULK_IMPORT_MAX_ROWS} rows.",
+        )
+    return await import_schedules(raw_rows, mode)
+
+
+async def import_schedules(raw_rows: List[Any], mode: BulkMode) -> BulkImportResult:
+    """Validate, conflict-check, reserve and insert rows; shared by bulk and generate."""
+    results = [
+        BulkRowResult(row=row, status=BulkRowStatus.created)
+        for row in range(len(raw_rows))
+    ]
+    candidates: Dict[int, Schedule] = {}
+    for row, raw in enumerate(raw_rows):
+        try:
+            schedule_in = ScheduleCreate.model_validate(raw)
+        except ValidationError as exc:
+            results[row].status = BulkRowStatus.invalid
+            results[row].errors = [
+                f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+                for error in exc.errors()
+            ]
+            continue
+        candidates[row] = Schedule(id=PydanticObjectId(), **schedule_in.model_dump())
+
+    existing: List[dict] = []
+    if candidates:
+        existing = (
+            await Schedule.get_motor_collection()
+            .find(
+                {
+                    "day": {"$in": list({s.day.value for s in candidates.values()})},
+                    "$or": [
+                        {
+                            resource: {
+                                "$in": list(
+                                    {getattr(s, resource) for s in candidates.values()}
+                                )
+                            }
+                        }
+                        for resource in RESOURCES
+                    ],
+                },
+                {
+                    resource: 1
+                    for resource in (*RESOURCES, "day", "start_min", "end_min")
+                },
+            )
+            .to_list(None)
+        )
+
+    rows_by_id = {str(s.id): row for row, s in candidates.items()}
+    rejected = find_batch_conflicts(
+        (schedule_intervals(doc) for doc in existing),
+        (schedule_intervals(s) for s in candidates.values()),
     )
+    existing_by_id = {str(doc["_id"]): doc for doc in existing}
+    for schedule_id, hits in rejected.items():
+        row = rows_by_id[schedule_id]
+        results[row].status = BulkRowStatus.conflict
+        for hit in hits:
+            other = (
+                existing_by_id.get(hit.schedule_id)
+                or candidates[rows_by_id[hit.schedule_id]].model_dump()
+            )
+            shared = [
+                f"{RESOURCE_LABELS[resource]} {other[resource]}"
+                for resource in RESOURCES
+                if other[resource] == getattr(candidates[row], resource)
+            ]
+            if hit.schedule_id in existing_by_id:
+                day_name = DAY_NAMES.get(DayOfWeek(other["day"]), other["day"])
+                start, end = (
+                    from_minutes(other["start_min"]),
+                    from_minutes(other["end_min"]),
+                )
+                where = f"another schedule on {day_name}, {start}-{end}"
+            else:
+                where = f"row {rows_by_id[hit.schedule_id]} of this batch"
+            results[row].errors.append(f"{', '.join(shared)} overlaps with {where}.")
 
-    schedule = Schedule(**schedule_in.model_dump())
-    await schedule.create()
-    return schedule
+    accepted = [
+        row for row in candidates if results[row].status == BulkRowStatus.created
+    ]
+    # Claim slots for the whole batch in one write; rows losing a slot to a
+    # concurrent writer are rejected like any other conflict.
+    if accepted and (mode == BulkMode.best_effort or len(accepted) == len(raw_rows)):
+        lost = await claim_many(
+            {candidates[row].id: slot_keys(candidates[row]) for row in accepted}
+        )
+        for row in accepted:
+            if candidates[row].id in lost:
+                error = await conflict_for_taken_slots(
+                    candidates[row], lost[candidates[row].id]
+                )
+                results[row].status = BulkRowStatus.conflict
+                results[row].errors = [error.detail]
+        if lost and mode == BulkMode.atomic:
+            await release_all(candidates[row].id for row in accepted)
+
+    accepted = [
+        row for row in candidates if results[row].status == BulkRowStatus.created
+    ]
+    if mode == BulkMode.atomic and len(accepted) != len(raw_rows):
+        for row in accepted:
+            results[row].status = BulkRowStatus.skipped
+        accepted = []
+
+    if accepted:
+        documents = [candidates[row] for row in accepted]
+        failed = set()
+        try:
+            await Schedule.insert_many(documents, ordered=mode == BulkMode.atomic)
+        except BulkWriteError as exc:
+            if mode == BulkMode.atomic:
+                await Schedule.find(In(Schedule.id, [s.id for s in documents])).delete()
+                await release_all(s.id for s in documents)
+                # Other workers' index reloads may have seen the removed rows
+                await bump_generation(Schedule)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Bulk insert failed; no schedules were created.",
+                )
+            for error in exc.details.get("writeErrors", []):
+                failed.add(error["index"])
+                results[accepted[error["index"]]].status = BulkRowStatus.error
+                results[accepted[error["index"]]].errors = [error["errmsg"]]
+            await release_all(documents[position].id for position in failed)
+        except Exception:
+            # Network errors and the like: which rows landed is unknown, so
+            # undo them all and free the slots for a retry
+            await Schedule.find(In(Schedule.id, [s.id for s in documents])).delete()
+            await release_all(s.id for s in documents)
+            await bump_generation(Schedule)
+            raise
+
+        for position, row in enumerate(accepted):
+            if position not in failed:
+                results[row].id = str(candidates[row].id)
+                schedule_index.add(candidates[row])
+        await invalidate_grids(
+            document
+            for position, document in enumerate(documents)
+            if position not in failed
+        )
+        await bump_generation(Schedule)
+
+    created = sum(1 for r in results if r.status == BulkRowStatus.created)
+    return BulkImportResult(
+        mode=mode,
+        created=created,
+        rejected=len(results) - created,
+        results=results,
+    )
+
+
+@router.post("/generate", response_model=TimetableResult)
+async def generate_timetable(
+    request_in: TimetableRequest,
+    current_user: User = Depends(get_current_chairperson_user),
+):
+    """
+    Generate a conflict-free timetable for a department's subjects.
+
+    Each subject meets ``units`` hours a week per section, split into sessions
+    of at most ``max_session_minutes`` on different days. Instructors are the
+    department's active instructors; existing schedules of those instructors,
+    the rooms and the sections are treated as busy. The search runs in a
+    worker process and returns whatever it placed when the time budget runs
+    out. With ``commit`` the result is written like an atomic bulk import.
+    """
+    subject_query = Subject.find(Subject.department == request_in.department)
+    if request_in.subject_codes:
+        subject_query = subject_query.find(
+            In(Subject.subject_code, request_in.subject_codes)
+        )
+    subjects = await subject_query.to_list()
+    instructors = [
+        user.user_id
+        for user in await User.find(
+            User.role == UserRole.instructor,
+            User.department == request_in.department,
+            User.is_active == True,
+        ).to_list()
+    ]
+
+    days = [day.value for day in request_in.days]
+    day_start = to_minutes(request_in.day_start)
+    day_end = to_minutes(request_in.day_end)
+    problem = Problem(
+        courses=[
+            Course(subject.subject_code, section, subject.units * 60, instructors)
+            for subject in subjects
+            if subject.units > 0
+            for section in request_in.sections
+        ],
+        rooms=request_in.rooms,
+        days=days,
+        day_start=day_start,
+        day_end=day_end,
+        slot_minutes=request_in.slot_minutes,
+        max_session_minutes=request_in.max_session_minutes,
+        time_budget_seconds=min(
+            request_in.time_budget_seconds or settings.TIMETABLE_TIME_BUDGET_SECONDS,
+            settings.TIMETABLE_TIME_BUDGET_SECONDS,
+        ),
+    )
+
+    values = {
+        "instructor_id": instructors,
+        "room": request_in.rooms,
+        "section": request_in.sections,
+    }
+    async for doc in Schedule.get_motor_collection().find(
+        {
+            "day": {"$in": days},
+            "$or": [{resource: {"$in": values[resource]}} for resource in RESOURCES],
+        },
+        {resource: 1 for resource in (*RESOURCES, "day", "start_min", "end_min")},
+    ):
+        mask = busy_mask(
+            days,
+            day_start,
+            problem.slot_minutes,
+            problem.slots_per_day,
+            doc["day"],
+            doc["start_min"],
+            doc["end_min"],
+        )
+        for resource in RESOURCES:
+            if doc[resource] in values[resource]:
+                key = (resource, doc[resource])
+                problem.busy[key] = problem.busy.get(key, 0) | mask
 
+    solution = await run_solver(problem, settings.TIMETABLE_WORKERS)
+    generated = [
+        ScheduleCreate(
+            subject_code=p.subject_code,
+            instructor_id=p.instructor_id,
+            section=p.section,
+            day=p.day,
+            start_time=from_minutes(p.start_min),
+            end_time=from_minutes(p.end_min),
+            room=p.room,
+        )
+        for p in solution.placements
+    ]
+    result = TimetableResult(
+        complete=solution.complete,
+        timed_out=solution.timed_out,
+        attempts=solution.attempts,
+        elapsed_seconds=solution.elapsed_seconds,
+        schedules=generated,
+        unplaced=[UnplacedCourse(**asdict(u)) for u in solution.unplaced],
+    )
+    if request_in.commit and generated:
+        result.import_result = await import_schedules(
+            [schedule.model_dump() for schedule in generated], BulkMode.atomic
+        )
+    return result
 
-@router.get("/", response_model=List[ScheduleOut])
+
+@router.get(
+    "/",
+    response_model=List[ScheduleOut],
+    dependencies=[Depends(conditional(Schedule))],
+)
 async def read_schedules(
+    response: Response,
     instructor_id: Optional[str] = None,
     room: Optional[str] = None,
     day: Optional[DayOfWeek] = None,
+    cursor: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+    include_total: bool = False,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
 ):
     query = Schedule.find_all()
     if instructor_id:
@@ -93,10 +417,135 @@ async def read_schedules(
     if day:
         query = query.find(Schedule.day == day)
 
-    return await query.skip(skip).limit(limit).to_list()
+    return await paginate(
+        query,
+        response,
+        cursor,
+        limit,
+        skip,
+        include_total,
+        fields=parse_fields(fields, SCHEDULE_FIELDS, fast=settings.FAST_READS),
+        to_row=schedule_row,
+    )
+
+
+@router.get("/export")
+async def export_schedules(
+    format: ExportFormat = ExportFormat.ndjson,
+    instructor_id: Optional[str] = None,
+    room: Optional[str] = None,
+    day: Optional[DayOfWeek] = None,
+):
+    """Stream every matching schedule as NDJSON or CSV, without paging."""
+    filter_query: Dict[str, Any] = {}
+    if instructor_id:
+        filter_query["instructor_id"] = instructor_id
+    if room:
+        filter_query["room"] = room
+    if day:
+        filter_query["day"] = day.value
+    return export_response(
+        "schedules",
+        Schedule.get_motor_collection(),
+        filter_query,
+        SCHEDULE_FIELDS,
+        schedule_row,
+        format,
+    )
+
 
+@router.get(
+    "/free-slots",
+    response_model=FreeSlotsResult,
+    dependencies=[Depends(conditional(Schedule))],
+)
+async def read_free_slots(
+    duration: int = Query(..., ge=5, le=24 * 60, description="Minutes needed"),
+    instructor_id: List[str] = Query([]),
+    room: List[str] = Query([]),
+    section: List[str] = Query([]),
+    day: List[DayOfWeek] = Query([]),
+    day_start: str = Query("07:00", pattern=TIME_PATTERN),
+    day_end: str = Query("21:00", pattern=TIME_PATTERN),
+):
+    """
+    Windows of at least ``duration`` minutes in which every given instructor,
+    room and section is free, per day. Repeat a parameter to combine several
+    resources, e.g. ``?instructor_id=inst001&room=Room 101&section=A``.
+    """
+    values = {"instructor_id": instructor_id, "room": room, "section": section}
+    if not any(values.values()):
+        raise HTTPException(
+            status_code=400,
+            detail="Give at least one instructor_id, room or section.",
+        )
+    start, end = to_minutes(day_start), to_minutes(day_end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="day_end must be after day_start")
+    days = [d.value for d in day] or [d.value for d in DayOfWeek]
+
+    docs_by_resource = {
+        (resource, value): [] for resource in RESOURCES for value in values[resource]
+    }
+    async for doc in Schedule.get_motor_collection().find(
+        {
+            "day": {"$in": days},
+            "$or": [
+                {resource: {"$in": values[resource]}}
+                for resource in RESOURCES
+                if values[resource]
+            ],
+        },
+        {resource: 1 for resource in (*RESOURCES, "day", "start_min", "end_min")},
+    ):
+        for resource in RESOURCES:
+            key = (resource, doc[resource])
+            if key in docs_by_resource:
+                docs_by_resource[key].append(doc)
+
+    # Imported here so numpy is only loaded once free slots are first asked for
+    from app.availability import find_free_slots
+
+    windows = find_free_slots(
+        docs_by_resource, days, start, end, duration, settings.SCHEDULE_SLOT_MINUTES
+    )
+    return FreeSlotsResult(
+        duration_minutes=duration,
+        days=[
+            DayFreeSlots(
+                day=day_value,
+                windows=[
+                    FreeWindow(
+                        start_time=from_minutes(window_start),
+                        end_time=from_minutes(window_end),
+                    )
+                    for window_start, window_end in day_windows
+                ],
+            )
+            for day_value, day_windows in windows.items()
+        ],
+    )
 
-@router.get("/{schedule_id}", response_model=ScheduleOut)
+
+@router.get(
+    "/grid/{kind}/{key}",
+    response_model=ScheduleGridOut,
+    dependencies=[Depends(conditional(Schedule, Subject))],
+)
+async def read_schedule_grid(kind: GridKind, key: str):
+    """
+    Weekly day x time grid of one instructor, room or section, with subject
+    descriptions. Served from a stored grid that is rebuilt only after a
+    schedule or subject it shows has changed.
+    """
+    return await get_grid(kind, key)
+
+
+@router.get(
+    "/{schedule_id}",
+    response_model=ScheduleOut,
+    dependencies=[Depends(conditional(Schedule))],
+)
 async def read_schedule(schedule_id: PydanticObjectId):
     schedule = await Schedule.get(schedule_id)
     if not schedule:
@@ -110,32 +559,33 @@ async def update_schedule(schedule_id: PydanticObjectId, schedule_in: ScheduleUp
     if not schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
 
-    # If updating time/day/instructor, check for conflicts
-    # We need to construct the potential new state to check conflicts
-    new_instructor_id = schedule_in.instructor_id or schedule.instructor_id
-    new_day = schedule_in.day or schedule.day
-    new_start_time = schedule_in.start_time or schedule.start_time
-    new_end_time = schedule_in.end_time or schedule.end_time
-
-    # Only check if any of these fields are changing
-    if (
-        schedule_in.instructor_id is not None
-        or schedule_in.day is not None
-        or schedule_in.start_time is not None
-        or schedule_in.end_time is not None
-    ):
-        await check_conflict(
-            instructor_id=new_instructor_id,
-            day=new_day,
-            start_time=new_start_time,
-            end_time=new_end_time,
-            exclude_schedule_id=schedule.id,
-        )
-
-    # Update fields
     # schedule_in.dict(exclude_unset=True) is deprecated in v2, use model_dump
-    update_data = schedule_in.model_dump(exclude_unset=True)
-    await schedule.set(update_data)
+    update_data = time_fields_to_minutes(
+        schedule_in.model_dump(exclude_unset=True, exclude_none=True)
+    )
+    new_state = {**schedule.model_dump(), **update_data}
+    if new_state["end_min"] <= new_state["start_min"]:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+
+    # Only check for conflicts if a resource or the time slot is changing,
+    # against the potential new state of the schedule
+    claimed, released = [], []
+    if update_data.keys() & {*RESOURCES, "day", "start_min", "end_min"}:
+        await check_conflict(new_state, exclude_schedule_id=schedule.id)
+        claimed, released = await reserve_change(new_state, schedule.id)
+
+    previous = schedule.model_dump()
+    try:
+        await schedule.set(update_data)
+    except Exception:
+        if claimed:
+            await release(schedule.id, claimed)
+        raise
+    if released:
+        await release(schedule.id, released)
+    schedule_index.add(schedule)
+    await invalidate_grids([previous, schedule])
+    await bump_generation(Schedule)
 
     return schedule
 
@@ -145,4 +595,8 @@ async def delete_schedule(schedule_id: PydanticObjectId):
     schedule = await Schedule.get(schedule_id)
     if not schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
-    await schedule.delete()
\ No newline at end of file
+    await schedule.delete()
+    await release(schedule.id)
+    schedule_index.remove(schedule_id)
+    await invalidate_grids([schedule])
+    await bump_generation(Schedule)
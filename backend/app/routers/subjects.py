@@ -1,16 +1,31 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pymongo.errors import DuplicateKeyError
+
+from app.cache import subject_cache
+from app.config import settings
 
 from app.deps import (
     get_current_admin_user,
     get_current_user,
     get_current_chairperson_user,
 )
-from app.models import Subject, User
+from app.etags import bump_generation, conditional
+from app.exports import ExportFormat, export_response
+from app.grids import invalidate_subject_grids
+from app.models import DepartmentType, Subject, User
+from app.pagination import paginate
+from app.serializers import (
+    FIELDS_DESCRIPTION,
+    SUBJECT_FIELDS,
+    parse_fields,
+    subject_row,
+)
 from app.schemas.subjects import SubjectCreate, SubjectResponse, SubjectUpdate
+from app.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/", response_model=SubjectResponse, status_code=status.HTTP_201_CREATED)
@@ -21,6 +36,7 @@ async def create_subject(
     """
     Create a new subject. Only chairpersons (and admins) can do this.
     """
+    # Not through subject_cache: it remembers misses for a while
     existing_subject = await Subject.find_one(
         Subject.subject_code == subject_in.subject_code
     )
@@ -31,24 +47,74 @@ async def create_subject(
         )
 
     subject = Subject(**subject_in.model_dump())
-    await subject.create()
+    try:
+        await subject.create()
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=400,
+            detail="Subject with this code already exists.",
+        )
+    subject_cache.invalidate(subject.subject_code)
+    await invalidate_subject_grids(subject.subject_code)
+    await bump_generation(Subject)
     return subject
 
 
-@router.get("/", response_model=List[SubjectResponse])
+@router.get(
+    "/",
+    response_model=List[SubjectResponse],
+    dependencies=[Depends(get_current_user), Depends(conditional(Subject))],
+)
 async def read_subjects(
+    response: Response,
+    cursor: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+    include_total: bool = False,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Retrieve all subjects. Pass the X-Next-Cursor header of a page as
+    ``cursor`` to get the next one.
+    """
+    return await paginate(
+        Subject.find_all(),
+        response,
+        cursor,
+        limit,
+        skip,
+        include_total,
+        fields=parse_fields(fields, SUBJECT_FIELDS, fast=settings.FAST_READS),
+        to_row=subject_row,
+    )
+
+
+@router.get("/export")
+async def export_subjects(
+    format: ExportFormat = ExportFormat.ndjson,
+    department: Optional[DepartmentType] = None,
     current_user: User = Depends(get_current_user),
 ):
     """
-    Retrieve all subjects.
+    Stream all subjects (optionally of one department) as NDJSON or CSV.
     """
-    subjects = await Subject.find_all().skip(skip).limit(limit).to_list()
-    return subjects
+    filter_query = {"department": department.value} if department else {}
+    return export_response(
+        "subjects",
+        Subject.get_motor_collection(),
+        filter_query,
+        SUBJECT_FIELDS,
+        subject_row,
+        format,
+    )
 
 
-@router.get("/{subject_code}", response_model=SubjectResponse)
+@router.get(
+    "/{subject_code}",
+    response_model=SubjectResponse,
+    dependencies=[Depends(get_current_user), Depends(conditional(Subject))],
+)
 async def read_subject(
     subject_code: str,
     current_user: User = Depends(get_current_user),
@@ -56,7 +122,7 @@ async def read_subject(
     """
     Get a specific subject by subject_code.
     """
-    subject = await Subject.find_one(Subject.subject_code == subject_code)
+    subject = await subject_cache.get(subject_code)
     if not subject:
         raise HTTPException(
             status_code=404,
@@ -93,7 +159,21 @@ async def update_subject(
                 detail="Subject with this code already exists.",
             )
 
-    await subject.update({"$set": update_data})
+    try:
+        # Straight to the collection: Document.update reports a duplicate key
+        # as RevisionIdWasChanged
+        await Subject.get_motor_collection().update_one(
+            {"_id": subject.id}, {"$set": update_data}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=400,
+            detail="Subject with this code already exists.",
+        )
+    subject_cache.invalidate(subject_code, update_data.get("subject_code"))
+    # Grids show the code and description of their subjects
+    await invalidate_subject_grids(subject_code)
+    await bump_generation(Subject)
 
     # Fetch updated document to ensure response reflects database state
     updated_subject = await Subject.find_one(
@@ -117,4 +197,7 @@ async def delete_subject(
             detail="Subject not found",
         )
     await subject.delete()
+    subject_cache.invalidate(subject_code)
+    await invalidate_subject_grids(subject_code)
+    await bump_generation(Subject)
     return None
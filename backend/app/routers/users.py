@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pymongo.errors import DuplicateKeyError
 
+from app.cache import principal_cache, user_cache
+from app.config import settings
 from app.deps import get_current_admin_user, get_current_user
+from app.etags import bump_generation, conditional
+from app.exports import ExportFormat, export_response
 from app.models import User
+from app.pagination import paginate
 from app.schemas.users import UserCreate, UserResponse, UserUpdate
-from app.security import get_password_hash
+from app.serializers import FIELDS_DESCRIPTION, USER_FIELDS, parse_fields, user_row
+from app.security import hash_password
+from app.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/users", response_model=UserResponse)
@@ -15,6 +23,8 @@ async def create_user(
         get_current_admin_user
     ),  # Only admins can create users
 ):
+    # Not through user_cache: it remembers misses, and a user created since
+    # on another worker would pass the check
     user = await User.find_one(User.user_id == user_in.user_id)
     if user:
         raise HTTPException(
@@ -27,11 +37,20 @@ async def create_user(
         firstname=user_in.firstname,
         lastname=user_in.lastname,
         middlename=user_in.middlename,
-        password=get_password_hash(user_in.password),
+        password=await hash_password(user_in.password),
         role=user_in.role,
         department=user_in.department,
     )
-    await user.create()
+    try:
+        await user.create()
+    except DuplicateKeyError:
+        # Created concurrently; the unique index on user_id caught it
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this user_id already exists in the system.",
+        )
+    user_cache.invalidate(user.user_id)
+    await bump_generation(User)
     return user
 
 
@@ -40,22 +59,53 @@ async def read_user_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 
-@router.get("/users", response_model=list[UserResponse])
+@router.get(
+    "/users",
+    response_model=list[UserResponse],
+    dependencies=[Depends(get_current_admin_user), Depends(conditional(User))],
+)
 async def read_users(
+    response: Response,
+    cursor: str | None = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=settings.PAGINATION_MAX_LIMIT),
+    include_total: bool = False,
+    fields: str | None = Query(None, description=FIELDS_DESCRIPTION),
     current_admin: User = Depends(get_current_admin_user),
 ):
-    users = await User.find_all().skip(skip).limit(limit).to_list()
-    return users
+    return await paginate(
+        User.find_all(),
+        response,
+        cursor,
+        limit,
+        skip,
+        include_total,
+        fields=parse_fields(fields, USER_FIELDS),
+        to_row=user_row,
+    )
 
 
-@router.get("/users/{user_id}", response_model=UserResponse)
+@router.get("/users/export")
+async def export_users(
+    format: ExportFormat = ExportFormat.ndjson,
+    current_admin: User = Depends(get_current_admin_user),
+):
+    # Password hashes are not part of USER_FIELDS and are never exported
+    return export_response(
+        "users", User.get_motor_collection(), {}, USER_FIELDS, user_row, format
+    )
+
+
+@router.get(
+    "/users/{user_id}",
+    response_model=UserResponse,
+    dependencies=[Depends(get_current_admin_user), Depends(conditional(User))],
+)
 async def read_user(
     user_id: str,
     current_admin: User = Depends(get_current_admin_user),
 ):
-    user = await User.find_one(User.user_id == user_id)
+    user = await user_cache.get(user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -88,9 +138,13 @@ async def update_user(
     if user_in.department is not None:
         user.department = user_in.department
     if user_in.password is not None:
-        user.password = get_password_hash(user_in.password)
+        user.password = await hash_password(user_in.password)
 
     await user.save()
+    user_cache.invalidate(user_id)
+    # Tokens already seen must not keep the old role or password
+    principal_cache.invalidate_user(user_id)
+    await bump_generation(User)
     return user
 
 
@@ -106,11 +160,18 @@ async def delete_user(
             detail="The user with this user_id does not exist in the system",
         )
     await user.delete()
+    user_cache.invalidate(user_id)
+    principal_cache.invalidate_user(user_id)
+    await bump_generation(User)
     return user
 
 
 # chairperson fetch teachers in their department
-@router.get("/users/department/{department}", response_model=list[UserResponse])
+@router.get(
+    "/users/department/{department}",
+    response_model=list[UserResponse],
+    dependencies=[Depends(get_current_user), Depends(conditional(User))],
+)
 async def read_users_by_department(
     department: str,
     current_user: User = Depends(get_current_user)
@@ -1,9 +1,26 @@
-from typing import Optional, Annotated
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional, Annotated
 from pydantic import BaseModel, Field, field_validator, BeforeValidator
 
 PyObjectId = Annotated[str, BeforeValidator(str)]
 
-from app.models.schedule import DayOfWeek
+from app.config import settings
+from app.models.schedule import DayOfWeek, to_minutes
+from app.models.grid import GridClass
+from app.models.user import DepartmentType
+
+
+def on_slot_boundary(value: Optional[str]) -> Optional[str]:
+    """Reject times that do not fall on a SCHEDULE_SLOT_MINUTES boundary.
+
+    Slot claims cover whole blocks, so a class ending or starting inside one
+    would hold a block its neighbour needs.
+    """
+    size = settings.SCHEDULE_SLOT_MINUTES
+    if value is not None and to_minutes(value) % size:
+        raise ValueError(f"time must be a multiple of {size} minutes")
+    return value
 
 
 class ScheduleBase(BaseModel):
@@ -21,13 +38,16 @@ class ScheduleBase(BaseModel):
 
     @field_validator("end_time")
     def end_time_must_be_after_start_time(cls, v, values):
-        if "start_time" in values.data and v <= values.data["start_time"]:
+        if "start_time" in values.data and to_minutes(v) <= to_minutes(
+            values.data["start_time"]
+        ):
             raise ValueError("end_time must be after start_time")
         return v
 
 
 class ScheduleCreate(ScheduleBase):
-    pass
+    # Only on input: stored legacy times inside a slot must still be readable
+    _on_slot_boundary = field_validator("start_time", "end_time")(on_slot_boundary)
 
 
 class ScheduleUpdate(BaseModel):
@@ -41,14 +61,17 @@ class ScheduleUpdate(BaseModel):
     end_time: Optional[str] = Field(None, pattern=r"^([0-1]?[0-9]|2[0-3]):[0-5][0-9]$")
     room: Optional[str] = None
 
+    _on_slot_boundary = field_validator("start_time", "end_time")(on_slot_boundary)
+
     @field_validator("end_time")
     def end_time_must_be_after_start_time(cls, v, values):
         # Only validate if both are present or if we have context of the existing object, but Pydantic validation on update is tricky without full context.
         # For now, simplistic validation if both are in update.
         if (
-            "start_time" in values.data
+            v
+            and "start_time" in values.data
             and values.data["start_time"]
-            and v <= values.data["start_time"]
+            and to_minutes(v) <= to_minutes(values.data["start_time"])
         ):
             raise ValueError("end_time must be after start_time")
         return v
@@ -58,4 +81,120 @@ class ScheduleOut(ScheduleBase):
     id: PyObjectId
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class BulkMode(str, Enum):
+    atomic = "atomic"  # all-or-nothing
+    best_effort = "best_effort"
+
+
+class BulkRowStatus(str, Enum):
+    created = "created"
+    invalid = "invalid"
+    conflict = "conflict"
+    skipped = "skipped"  # valid, but not written because the atomic batch failed
+    error = "error"
+
+
+class BulkRowResult(BaseModel):
+    row: int
+    status: BulkRowStatus
+    id: Optional[PyObjectId] = None
+    errors: List[str] = []
+
+
+class BulkImportResult(BaseModel):
+    mode: BulkMode
+    created: int
+    rejected: int
+    results: List[BulkRowResult]
+
+
+TIME_PATTERN = r"^([0-1]?[0-9]|2[0-3]):[0-5][0-9]$"
+
+
+class TimetableRequest(BaseModel):
+    department: DepartmentType
+    sections: List[str] = Field(..., min_length=1)
+    rooms: List[str] = Field(..., min_length=1)
+    # Restrict to these subjects of the department; all of them by default
+    subject_codes: Optional[List[str]] = None
+    days: List[DayOfWeek] = Field(
+        default=[
+            DayOfWeek.Monday,
+            DayOfWeek.Tuesday,
+            DayOfWeek.Wednesday,
+            DayOfWeek.Thursday,
+            DayOfWeek.Friday,
+        ],
+        min_length=1,
+    )
+    day_start: str = Field("07:00", pattern=TIME_PATTERN)
+    day_end: str = Field("19:00", pattern=TIME_PATTERN)
+    slot_minutes: int = Field(30, ge=5, le=120)
+    max_session_minutes: int = Field(90, ge=30, le=300)
+    time_budget_seconds: Optional[float] = Field(None, gt=0)
+    # Write the generated schedules instead of only previewing them
+    commit: bool = False
+
+    # Generated classes start at day_start plus whole slots
+    _on_slot_boundary = field_validator("day_start")(on_slot_boundary)
+
+    @field_validator("slot_minutes")
+    def slot_minutes_must_be_whole_slots(cls, v):
+        size = settings.SCHEDULE_SLOT_MINUTES
+        if v % size:
+            raise ValueError(f"slot_minutes must be a multiple of {size}")
+        return v
+
+    @field_validator("day_end")
+    def day_end_must_be_after_day_start(cls, v, values):
+        if "day_start" in values.data and to_minutes(v) <= to_minutes(
+            values.data["day_start"]
+        ):
+            raise ValueError("day_end must be after day_start")
+        return v
+
+
+class UnplacedCourse(BaseModel):
+    subject_code: str
+    section: str
+    reason: str
+
+
+class TimetableResult(BaseModel):
+    complete: bool
+    timed_out: bool
+    attempts: int
+    elapsed_seconds: float
+    schedules: List[ScheduleCreate]
+    unplaced: List[UnplacedCourse]
+    # Set when commit was requested
+    import_result: Optional[BulkImportResult] = None
+
+
+class FreeWindow(BaseModel):
+    start_time: str
+    end_time: str
+
+
+class DayFreeSlots(BaseModel):
+    day: DayOfWeek
+    windows: List[FreeWindow]
+
+
+class FreeSlotsResult(BaseModel):
+    duration_minutes: int
+    days: List[DayFreeSlots]
+
+
+class ScheduleGridOut(BaseModel):
+    kind: str
+    key: str
+    built_at: datetime
+    slot_minutes: int
+    days: List[DayOfWeek]
+    times: List[str]
+    cells: List[List[Optional[int]]]
+    classes: List[GridClass]
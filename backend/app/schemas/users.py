@@ -44,6 +44,16 @@ class UserResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    # Also revoke the refresh token of the session, if the client has one
+    refresh_token: Optional[str] = None
 
 
 class TokenData(BaseModel):
@@ -1,17 +1,117 @@
+import asyncio
+import hmac
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Dict, Optional, Tuple, Union
 
-from jose import jwt
+from jose import JWTError, jwt
+from passlib.context import CryptContext
 
 from app.config import settings
+from app.revocation import denylist
 
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
 
-def verify_password(plain_password: str, password: str) -> bool:
-    return plain_password == password
+
+def is_password_hash(password: Optional[str]) -> bool:
+    return bool(password) and pwd_context.identify(password) is not None
+
+
+def verify_password(plain_password: str, password: Optional[str]) -> bool:
+    if not password:
+        return False
+    if not is_password_hash(password):
+        # Rows written before hashing was introduced hold the plain password
+        return hmac.compare_digest(plain_password.encode(), password.encode())
+    return pwd_context.verify(plain_password, password)
 
 
 def get_password_hash(password: str) -> str:
-    return password
+    return pwd_context.hash(password)
+
+
+def password_needs_rehash(password: str) -> bool:
+    """True for plaintext rows and hashes made with an outdated cost factor."""
+    return not is_password_hash(password) or pwd_context.needs_update(password)
+
+
+def _check_password(plain_password: str, password: Optional[str]):
+    if not password:
+        # Spend the time of a real check, so unknown users cannot be told apart
+        pwd_context.dummy_verify()
+        return False, None
+    if not verify_password(plain_password, password):
+        return False, None
+    if password_needs_rehash(password):
+        return True, get_password_hash(plain_password)
+    return True, None
+
+
+# bcrypt releases the GIL, so a few threads hash in parallel while the event
+# loop keeps serving other requests. The pool size caps the CPU a login burst
+# can take.
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash",
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def hash_password(password: str) -> str:
+    """``get_password_hash`` run in the hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), get_password_hash, password)
+
+
+async def check_password(
+    plain_password: str, password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a login in the hashing pool.
+
+    Returns whether the password matches and, when the stored value is
+    plaintext or uses an outdated cost factor, the new hash to store.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), _check_password, plain_password, password
+    )
+
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+
+def _create_token(subject: Union[str, Any], token_type: str, expire: datetime) -> str:
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "type": token_type,
+        # Lets a single token be revoked
+        "jti": uuid.uuid4().hex,
+    }
+    encoded_jwt = jwt.encode(
+        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    )
+    return encoded_jwt
 
 
 def create_access_token(
@@ -23,9 +123,29 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
+    return _create_token(subject, ACCESS_TOKEN, expire)
 
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
-    return encoded_jwt
+
+def create_refresh_token(subject: Union[str, Any]) -> str:
+    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    return _create_token(subject, REFRESH_TOKEN, expire)
+
+
+class TokenRevoked(JWTError):
+    """The token is valid but was revoked (logged out or already refreshed)."""
+
+
+def decode_token(token: str, token_type: str = ACCESS_TOKEN) -> Dict[str, Any]:
+    """
+    Verify ``token`` and return its claims. Raises JWTError when the token is
+    invalid, expired, revoked or of another type. Access tokens issued before
+    token types existed have no ``type`` claim and are still accepted.
+    """
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if payload.get("type", ACCESS_TOKEN) != token_type:
+        raise JWTError("wrong token type")
+    if payload.get("sub") is None:
+        raise JWTError("sub claim missing")
+    if denylist.is_revoked(payload.get("jti")):
+        raise TokenRevoked("token revoked")
+    return payload
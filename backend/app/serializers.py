@@ -0,0 +1,120 @@
+"""
+Plain-dict rows built straight from raw Mongo documents.
+
+These skip model validation, for paths that handle many documents at once
+(exports, sparse ``?fields=`` lists). Each collection lists its public
+fields, which are also the projection sent to Mongo; secrets such as
+password hashes are never listed. Converters tolerate fields left out of
+the projection.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from app.models.schedule import from_minutes
+
+SCHEDULE_FIELDS = (
+    "id",
+    "subject_code",
+    "instructor_id",
+    "section",
+    "day",
+    "start_time",
+    "end_time",
+    "room",
+)
+# SubjectResponse serializes its id by alias, as "_id"
+SUBJECT_FIELDS = ("_id", "subject_code", "subject_description", "units", "department")
+USER_FIELDS = (
+    "id",
+    "user_id",
+    "firstname",
+    "lastname",
+    "middlename",
+    "role",
+    "department",
+    "is_active",
+)
+
+FIELDS_DESCRIPTION = (
+    "Comma-separated fields to return, e.g. subject_code,room. "
+    "Only these are read from the database; the id is always included."
+)
+
+
+def projection(fields) -> Dict[str, int]:
+    """Mongo projection for ``fields``, mapping API names to stored ones."""
+    stored = {"id": "_id", "start_time": "start_min", "end_time": "end_min"}
+    return {stored.get(field, field): 1 for field in fields}
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson, for rows that are already plain data."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+def parse_fields(
+    fields: Optional[str], allowed: Sequence[str], fast: bool = False
+) -> Optional[List[str]]:
+    """
+    Turn a ``?fields=a,b`` parameter into the list of fields to return.
+
+    The id field (the first allowed one) is always included so clients can
+    key and page the rows. Without ``fields`` this is None, meaning the
+    regular Document and response model path, or every field when ``fast``
+    is set so the whole list takes the raw row path.
+    """
+    if fields is None:
+        return list(allowed) if fast else None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. "
+            f"Allowed: {', '.join(allowed)}.",
+        )
+    id_field = allowed[0]
+    return [id_field] + [
+        field for field in dict.fromkeys(requested) if field != id_field
+    ]
+
+
+def sparse_row(row: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    return {field: row[field] for field in fields}
+
+
+def _time(doc: Mapping[str, Any], field: str) -> Optional[str]:
+    return from_minutes(doc[field]) if field in doc else None
+
+
+def schedule_row(doc: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": str(doc["_id"]),
+        "subject_code": doc.get("subject_code"),
+        "instructor_id": doc.get("instructor_id"),
+        "section": doc.get("section"),
+        "day": doc.get("day"),
+        "start_time": _time(doc, "start_min"),
+        "end_time": _time(doc, "end_min"),
+        "room": doc.get("room"),
+    }
+
+
+def subject_row(doc: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "_id": str(doc["_id"]),
+        **{field: doc.get(field) for field in SUBJECT_FIELDS[1:]},
+    }
+
+
+def user_row(doc: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": str(doc["_id"]),
+        **{field: doc.get(field) for field in USER_FIELDS[1:]},
+    }
@@ -0,0 +1,348 @@
+"""
+Slow-query log.
+
+A pymongo command listener times every query and write the driver sends.
+When one takes longer than ``SLOW_QUERY_THRESHOLD_MS``, the recorder stores
+its collection, duration and filter shape in the capped ``slow_queries``
+collection. The first time a shape is seen, and then at most once per
+``SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS``, it also runs ``explain`` (query
+planner only, so nothing is executed twice) and keeps the winning plan. A
+collection scan then shows up at /admin/slow-queries without anyone running
+the Mongo profiler.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid
+
+from app.config import settings
+from app.models import SlowQuery
+
+# Commands that take a filter, and where the filter is in each
+FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+    "aggregate": "pipeline",
+    "update": "updates",
+    "delete": "deletes",
+}
+# Driver and session fields that explain refuses or does not need
+_DRIVER_FIELDS = {
+    "lsid",
+    "txnNumber",
+    "autocommit",
+    "startTransaction",
+    "readConcern",
+    "writeConcern",
+    "apiVersion",
+    "apiStrict",
+    "apiDeprecationErrors",
+}
+# Recorder writes are never recorded, whatever they cost
+_IGNORED_COLLECTIONS = {SlowQuery.Settings.name}
+# Entries waiting to be written; beyond this, new ones are dropped
+_MAX_PENDING = 50
+
+
+def value_shape(value: Any) -> Any:
+    """``value`` with every leaf replaced by its type name."""
+    if isinstance(value, dict):
+        return {key: value_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in lists of any length have the same shape
+        shapes = []
+        for item in value:
+            shape = value_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    if value is None:
+        return "null"
+    return type(value).__name__
+
+
+def command_shape(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    """Filter shape of a command, plus its sort and projection for finds."""
+    field = FILTER_FIELDS[command_name]
+    target = command.get(field)
+    if command_name == "update":
+        filters = [update.get("q", {}) for update in target or []]
+        return {"filter": value_shape(filters[0] if len(filters) == 1 else filters)}
+    if command_name == "delete":
+        filters = [delete.get("q", {}) for delete in target or []]
+        return {"filter": value_shape(filters[0] if len(filters) == 1 else filters)}
+    if command_name == "aggregate":
+        return {"pipeline": value_shape(target or [])}
+    shape = {"filter": value_shape(target or {})}
+    for option in ("sort", "projection"):
+        if command.get(option):
+            # Sort direction and projected fields matter, not their types
+            shape[option] = dict(command[option])
+    return shape
+
+
+def shape_key(collection: str, command_name: str, shape: Dict[str, Any]) -> str:
+    encoded = json.dumps([collection, command_name, shape], sort_keys=True)
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+
+def explain_command(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    """The original command, stripped of the fields explain rejects."""
+    return {
+        key: value
+        for key, value in command.items()
+        if key not in _DRIVER_FIELDS and not key.startswith("$")
+    }
+
+
+def _find_key(doc: Any, key: str) -> Any:
+    """First value stored under ``key`` anywhere in ``doc``."""
+    if isinstance(doc, dict):
+        if key in doc:
+            return doc[key]
+        children = doc.values()
+    elif isinstance(doc, list):
+        children = doc
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """(stage, index key pattern) of every stage, leaves first."""
+    stages = []
+    for child in plan.get("inputStages", []) + [plan.get("inputStage")]:
+        if child:
+            stages.extend(_plan_stages(child))
+    stages.append((plan.get("stage", "?"), plan.get("keyPattern")))
+    return stages
+
+
+def summarize_plan(explain: Dict[str, Any]) -> Tuple[Optional[Dict], str, bool]:
+    """Winning plan, a one-line summary of its access path, and whether it scans."""
+    query_planner = _find_key(explain, "queryPlanner") or {}
+    winning = query_planner.get("winningPlan") or {}
+    # Servers using the slot-based engine nest the classic plan one level down
+    winning = winning.get("queryPlan", winning)
+    scans = [
+        (stage, key)
+        for stage, key in _plan_stages(winning)
+        if stage in ("COLLSCAN", "IXSCAN", "IDHACK", "EOF", "COUNT_SCAN")
+    ]
+    parts = []
+    for stage, key in scans:
+        if key:
+            fields = ", ".join(
+                f"{field}: {direction}" for field, direction in key.items()
+            )
+            parts.append(f"{stage} {{ {fields} }}")
+        else:
+            parts.append(stage)
+    summary = ", ".join(parts) or winning.get("stage", "unknown")
+    return winning or None, summary, any(stage == "COLLSCAN" for stage, _ in scans)
+
+
+def _json_safe(value: Any) -> Any:
+    """Plans hold only JSON types, apart from an occasional ObjectId bound."""
+    if isinstance(value, dict):
+        return {str(key): _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, (ObjectId, datetime)):
+        return str(value)
+    return value
+
+
+class SlowQueryRecorder:
+    """Turn slow commands reported by the listener into ``SlowQuery`` rows."""
+
+    def __init__(self):
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._explained_at: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.recorded = 0
+        self.explained = 0
+        self.dropped = 0
+
+    def start(self, client):
+        """Record with ``client`` from the running loop; until then nothing is."""
+        self._client = client
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        self._loop = None
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit(
+        self,
+        database: str,
+        collection: str,
+        command_name: str,
+        command: Dict[str, Any],
+        duration_ms: float,
+        failed: bool,
+    ):
+        """Called from the driver's threads; hands the command to the loop."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(
+            self._schedule,
+            database,
+            collection,
+            command_name,
+            command,
+            duration_ms,
+            failed,
+        )
+
+    def _schedule(self, *args):
+        if len(self._tasks) >= _MAX_PENDING:
+            self.dropped += 1
+            return
+        task = asyncio.create_task(self.record(*args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _should_explain(self, key: str) -> bool:
+        now = time.monotonic()
+        last = self._explained_at.get(key)
+        if (
+            last is not None
+            and now - last < settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+        ):
+            return False
+        self._explained_at[key] = now
+        return True
+
+    async def record(
+        self,
+        database: str,
+        collection: str,
+        command_name: str,
+        command: Dict[str, Any],
+        duration_ms: float,
+        failed: bool = False,
+    ):
+        shape = command_shape(command_name, command)
+        key = shape_key(collection, command_name, shape)
+        entry = SlowQuery(
+            recorded_at=datetime.utcnow(),
+            database=database,
+            collection=collection,
+            command=command_name,
+            duration_ms=round(duration_ms, 1),
+            shape=shape,
+            shape_key=key,
+            failed=failed,
+        )
+        if self._client is not None and self._should_explain(key):
+            try:
+                explain = await self._client[database].command(
+                    {
+                        "explain": explain_command(command_name, command),
+                        "verbosity": "queryPlanner",
+                    }
+                )
+                winning, entry.plan_summary, entry.collscan = summarize_plan(explain)
+                entry.winning_plan = _json_safe(winning)
+                self.explained += 1
+            except Exception as e:
+                entry.plan_summary = f"explain failed: {e}"
+        try:
+            await SlowQuery.get_motor_collection().insert_one(
+                entry.model_dump(exclude={"id"})
+            )
+            self.recorded += 1
+        except Exception as e:
+            print(f"Could not record slow query: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+            "recorded": self.recorded,
+            "explained": self.explained,
+            "dropped": self.dropped,
+            "pending": len(self._tasks),
+            "shapes_seen": len(self._explained_at),
+        }
+
+
+recorder = SlowQueryRecorder()
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """
+    Keep the commands that take a filter until they finish, and pass the ones
+    over the threshold to the recorder.
+    """
+
+    def __init__(self, recorder: SlowQueryRecorder):
+        self.recorder = recorder
+        self._pending: Dict[Tuple[Any, int], Tuple[str, str, Dict[str, Any]]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name not in FILTER_FIELDS:
+            return
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str) or collection in _IGNORED_COLLECTIONS:
+            return
+        self._pending[(event.connection_id, event.request_id)] = (
+            event.database_name,
+            collection,
+            event.command,
+        )
+
+    def _finish(self, event, failed: bool):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+            database, collection, command = pending
+            self.recorder.submit(
+                database, collection, event.command_name, command, duration_ms, failed
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finish(event, failed=True)
+
+
+slow_query_listener = SlowQueryListener(recorder)
+
+
+async def ensure_collection(database):
+    """Create the capped collection the log is written to, if it is missing."""
+    name = SlowQuery.Settings.name
+    if name in await database.list_collection_names(filter={"name": name}):
+        return
+    try:
+        await database.create_collection(
+            name,
+            capped=True,
+            size=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            max=settings.SLOW_QUERY_LOG_MAX_ENTRIES,
+        )
+    except CollectionInvalid:
+        # Created by another worker in the meantime
+        pass
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Set
+
+
+class StartupTimer:
+    """
+    Milliseconds spent in each startup phase, counted from ``started``.
+
+    Work moved off the critical path by FAST_STARTUP is timed separately under
+    ``background`` so the report shows both what delayed the first request
+    and what finished after it; background work that raised is listed under
+    ``background_failed``.
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self.phases: Dict[str, float] = {}
+        self.background: Dict[str, float] = {}
+        self.background_failed: Dict[str, str] = {}
+        self.ready_ms: float = 0.0
+        self._last = started
+        self._tasks: Set[asyncio.Task] = set()
+
+    def mark(self, phase: str):
+        """Close ``phase``: it ran from the previous mark until now."""
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self._last) * 1000, 1)
+        self._last = now
+
+    def ready(self):
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        phases = ", ".join(f"{name} {ms}ms" for name, ms in self.phases.items())
+        print(f"Startup ready in {self.ready_ms}ms ({phases})")
+
+    def run_in_background(self, name: str, work: Awaitable):
+        async def timed():
+            started = time.perf_counter()
+            try:
+                await work
+            except Exception as e:
+                print(f"Background startup task {name} failed: {e}")
+                self.background_failed[name] = f"{type(e).__name__}: {e}"
+                return
+            self.background[name] = round((time.perf_counter() - started) * 1000, 1)
+
+        # Keep a reference, or the task may be garbage collected mid-way
+        task = asyncio.create_task(timed())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready_ms": self.ready_ms,
+            "phases_ms": self.phases,
+            "background_ms": self.background,
+            "background_pending": len(self._tasks),
+            "background_failed": self.background_failed,
+        }
@@ -0,0 +1,317 @@
+"""
+Timetable generator.
+
+Every resource (instructor, room, section) keeps its week as one Python int
+used as a bitset: bit ``day * slots_per_day + slot`` is set while the
+resource is busy. A session is feasible when its own mask does not intersect
+the OR of the three resource masks, so every check is a couple of integer
+operations no matter how many classes are already placed.
+
+``solve`` is pure and CPU-bound; the API runs it through ``run_solver`` in a
+process pool so the event loop is never blocked.
+"""
+
+import asyncio
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Restarts without a better result before the search gives up early
+MAX_STALLED_PASSES = 200
+
+# (resource, value), e.g. ("room", "Room 101")
+ResourceKey = Tuple[str, str]
+
+
+@dataclass
+class Course:
+    """One subject taught to one section, ``minutes`` per week."""
+
+    subject_code: str
+    section: str
+    minutes: int
+    instructors: List[str]
+
+
+@dataclass
+class Problem:
+    courses: List[Course]
+    rooms: List[str]
+    days: List[str]
+    day_start: int  # minutes since midnight
+    day_end: int
+    slot_minutes: int
+    max_session_minutes: int
+    time_budget_seconds: float
+    # Slots already taken by stored schedules, as bitsets per resource
+    busy: Dict[ResourceKey, int] = field(default_factory=dict)
+    seed: int = 0
+
+    @property
+    def slots_per_day(self) -> int:
+        return (self.day_end - self.day_start) // self.slot_minutes
+
+
+@dataclass
+class Placement:
+    subject_code: str
+    section: str
+    instructor_id: str
+    room: str
+    day: str
+    start_min: int
+    end_min: int
+
+
+@dataclass
+class Unplaced:
+    subject_code: str
+    section: str
+    reason: str
+
+
+@dataclass
+class Solution:
+    placements: List[Placement]
+    unplaced: List[Unplaced]
+    attempts: int
+    timed_out: bool
+    elapsed_seconds: float
+
+    @property
+    def complete(self) -> bool:
+        return not self.unplaced
+
+
+def split_sessions(minutes: int, slot_minutes: int, max_session_minutes: int):
+    """Split weekly minutes into near-equal sessions, in slots, longest first."""
+    total = -(-minutes // slot_minutes)
+    longest = max(1, max_session_minutes // slot_minutes)
+    count = -(-total // longest)
+    base, extra = divmod(total, count)
+    return [base + 1] * extra + [base] * (count - extra)
+
+
+def busy_mask(
+    days: List[str],
+    day_start: int,
+    slot_minutes: int,
+    slots_per_day: int,
+    day: str,
+    start_min: int,
+    end_min: int,
+) -> int:
+    """Bits covered by an existing class, widened to whole slots and clipped."""
+    if day not in days:
+        return 0
+    first = max(0, (start_min - day_start) // slot_minutes)
+    last = min(slots_per_day, -(-(end_min - day_start) // slot_minutes))
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << (days.index(day) * slots_per_day + first)
+
+
+class _Attempt:
+    """Mutable state of one greedy pass over the courses."""
+
+    def __init__(self, problem: Problem):
+        self.problem = problem
+        self.busy: Dict[ResourceKey, int] = dict(problem.busy)
+        self.load: Dict[str, int] = {}  # instructor -> placed minutes
+        self.placements: List[Placement] = []
+        self.unplaced: List[Unplaced] = []
+
+    def _free(self, keys: List[ResourceKey], mask: int) -> bool:
+        taken = 0
+        for key in keys:
+            taken |= self.busy.get(key, 0)
+        return not taken & mask
+
+    def _take(self, keys: List[ResourceKey], mask: int):
+        for key in keys:
+            self.busy[key] = self.busy.get(key, 0) | mask
+
+    def _release(self, keys: List[ResourceKey], mask: int):
+        for key in keys:
+            self.busy[key] &= ~mask
+
+    def place(self, course: Course, rng: Optional[random.Random]) -> bool:
+        problem = self.problem
+        if not course.instructors:
+            self.unplaced.append(
+                Unplaced(
+                    course.subject_code,
+                    course.section,
+                    "No instructor of the department is available.",
+                )
+            )
+            return False
+
+        sessions = split_sessions(
+            course.minutes, problem.slot_minutes, problem.max_session_minutes
+        )
+        # Sessions of one course go on different days when the week allows it
+        distinct_days = len(sessions) <= len(problem.days)
+        instructors = sorted(course.instructors, key=lambda i: self.load.get(i, 0))
+        rooms = list(problem.rooms)
+        day_order = list(range(len(problem.days)))
+        if rng is not None:
+            rng.shuffle(rooms)
+            rng.shuffle(day_order)
+
+        for instructor in instructors:
+            taken: List[Tuple[List[ResourceKey], int, Placement]] = []
+            used_days = set()
+            for length in sessions:
+                found = self._find_slot(
+                    course, instructor, length, rooms, day_order, used_days
+                )
+                if found is None:
+                    break
+                keys, mask, placement = found
+                self._take(keys, mask)
+                taken.append(found)
+                if distinct_days:
+                    used_days.add(placement.day)
+            else:
+                self.placements.extend(placement for _, _, placement in taken)
+                self.load[instructor] = self.load.get(instructor, 0) + course.minutes
+                return True
+            # Roll back this instructor's sessions and try the next one
+            for keys, mask, _ in taken:
+                self._release(keys, mask)
+
+        self.unplaced.append(
+            Unplaced(
+                course.subject_code,
+                course.section,
+                "No conflict-free time was found for every session.",
+            )
+        )
+        return False
+
+    def _find_slot(self, course, instructor, length, rooms, day_order, used_days):
+        problem = self.problem
+        spd = problem.slots_per_day
+        block = (1 << length) - 1
+        people = [("instructor_id", instructor), ("section", course.section)]
+        for d in day_order:
+            day = problem.days[d]
+            if day in used_days:
+                continue
+            for slot in range(spd - length + 1):
+                mask = block << (d * spd + slot)
+                if not self._free(people, mask):
+                    continue
+                for room in rooms:
+                    keys = people + [("room", room)]
+                    if self._free(keys[2:], mask):
+                        start = problem.day_start + slot * problem.slot_minutes
+                        return (
+                            keys,
+                            mask,
+                            Placement(
+                                subject_code=course.subject_code,
+                                section=course.section,
+                                instructor_id=instructor,
+                                room=room,
+                                day=day,
+                                start_min=start,
+                                end_min=start + length * problem.slot_minutes,
+                            ),
+                        )
+        return None
+
+
+def solve(problem: Problem) -> Solution:
+    """
+    Place every course, or as many as the time budget allows.
+
+    The first pass is deterministic: longest courses with the fewest
+    instructors first. While courses stay unplaced and time remains, the
+    pass is repeated with shuffled rooms and days and the courses that
+    failed last time moved to the front, until ``MAX_STALLED_PASSES`` passes
+    in a row bring no improvement. The best pass (most minutes placed) is
+    returned, so a timeout still yields a usable partial timetable.
+    """
+    started = time.monotonic()
+    deadline = started + problem.time_budget_seconds
+    rng = random.Random(problem.seed)
+    order = sorted(
+        problem.courses, key=lambda c: (-c.minutes, len(c.instructors), c.section)
+    )
+
+    best: Optional[_Attempt] = None
+    best_minutes = -1
+    attempts = 0
+    stalled = 0
+    timed_out = False
+    while True:
+        attempt = _Attempt(problem)
+        failed = []
+        for course in order:
+            if time.monotonic() >= deadline:
+                timed_out = True
+                break
+            if not attempt.place(course, rng if attempts else None):
+                failed.append(course)
+        attempts += 1
+        if timed_out:
+            # Courses the pass never reached count as unplaced
+            done = {(p.subject_code, p.section) for p in attempt.placements} | {
+                (u.subject_code, u.section) for u in attempt.unplaced
+            }
+            attempt.unplaced.extend(
+                Unplaced(c.subject_code, c.section, "The time budget ran out.")
+                for c in order
+                if (c.subject_code, c.section) not in done
+            )
+
+        placed_minutes = sum(p.end_min - p.start_min for p in attempt.placements)
+        if placed_minutes > best_minutes:
+            best, best_minutes, stalled = attempt, placed_minutes, 0
+        else:
+            stalled += 1
+        if not best.unplaced or timed_out or time.monotonic() >= deadline:
+            break
+        if stalled >= MAX_STALLED_PASSES or all(not c.instructors for c in failed):
+            break  # more reordering is unlikely to help
+        order = failed + [c for c in order if c not in failed]
+
+    return Solution(
+        placements=best.placements,
+        unplaced=best.unplaced,
+        attempts=attempts,
+        timed_out=timed_out or bool(best.unplaced and time.monotonic() >= deadline),
+        elapsed_seconds=round(time.monotonic() - started, 3),
+    )
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor(max_workers: int) -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs the event loop and Motor's
+        # threads is not safe
+        _executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_solver(problem: Problem, max_workers: int) -> Solution:
+    """Run ``solve`` in the worker pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(max_workers), solve, problem)
@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+
+from beanie import init_beanie
+
+from app.config import settings
+from app.db import create_client
+from app.models import Schedule, ScheduleSlot
+from app.reservations import claim_many, slot_keys
+
+
+async def backfill_schedule_slots(batch_size: int):
+    """
+    Claim slot reservations for schedules created before reservations existed.
+
+    Run once after deploying, and after migrate_schedule_times.py. Schedules
+    that already hold their slots are skipped; any that collide with another
+    schedule (overlaps created before conflict checks covered every resource)
+    are reported so they can be fixed by hand.
+    """
+    client = create_client()
+    await init_beanie(
+        database=client[settings.MONGODB_DB_NAME],
+        document_models=[Schedule, ScheduleSlot],
+    )
+
+    claimed = set(await ScheduleSlot.get_motor_collection().distinct("schedule_id"))
+    processed = 0
+    batch = []
+    async for schedule in Schedule.find_all():
+        if schedule.id in claimed:
+            continue
+        batch.append(schedule)
+        if len(batch) >= batch_size:
+            processed += await _claim_batch(batch)
+            batch = []
+    if batch:
+        processed += await _claim_batch(batch)
+
+    client.close()
+    print(f"Done. Claimed slots for {processed} schedules.")
+
+
+async def _claim_batch(batch) -> int:
+    lost = await claim_many({schedule.id: slot_keys(schedule) for schedule in batch})
+    for schedule in batch:
+        if schedule.id in lost:
+            print(
+                f"Overlap: schedule {schedule.id} ({schedule.subject_code}, "
+                f"{schedule.day.value} {schedule.start_time}-{schedule.end_time}) "
+                "collides with another schedule; it holds no slots."
+            )
+    return len(batch) - len(lost)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=backfill_schedule_slots.__doc__)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(backfill_schedule_slots(args.batch_size))
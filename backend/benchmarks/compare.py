@@ -0,0 +1,69 @@
+"""
+Compare two result files of benchmarks.hot_paths, case by case.
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Prints the p50 and p95 of both runs and the change in p50. With
+``--threshold``, exits with status 1 when any case's p50 got slower by more
+than that many percent, so it can gate a CI job.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, Tuple
+
+Key = Tuple[str, int, str]
+
+
+def load(path: str) -> Tuple[Dict[str, Any], Dict[Key, Dict[str, Any]]]:
+    with open(path) as f:
+        report = json.load(f)
+    results = {}
+    for result in report["results"]:
+        params = " ".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+        results[(result["case"], result["size"], params)] = result
+    return report["meta"], results
+
+
+def main(before_path: str, after_path: str, threshold: float) -> int:
+    before_meta, before = load(before_path)
+    after_meta, after = load(after_path)
+    print(f"before: {before_meta.get('commit')}  after: {after_meta.get('commit')}")
+    print(
+        f"{'case':<18} {'size':>8} {'params':<32} "
+        f"{'p50 before':>11} {'p50 after':>10} {'change':>8} "
+        f"{'p95 before':>11} {'p95 after':>10}"
+    )
+    regressions = 0
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        change = (new["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+        flag = ""
+        if threshold is not None and change > threshold:
+            regressions += 1
+            flag = "  <- slower"
+        case, size, params = key
+        print(
+            f"{case:<18} {size:>8} {params:<32} "
+            f"{old['p50_ms']:>9.3f}ms {new['p50_ms']:>8.3f}ms {change:>+7.1f}% "
+            f"{old['p95_ms']:>9.3f}ms {new['p95_ms']:>8.3f}ms{flag}"
+        )
+    for key in sorted(before.keys() ^ after.keys()):
+        print(
+            f"only in {'before' if key in before else 'after'}: {' '.join(map(str, key))}"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        help="fail when a p50 got slower by more than this many percent",
+    )
+    args = parser.parse_args()
+    sys.exit(main(args.before, args.after, args.threshold))
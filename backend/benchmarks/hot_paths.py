@@ -0,0 +1,394 @@
+"""
+Latency of the API's hot paths at several dataset sizes.
+
+    python -m benchmarks.hot_paths --sizes 100,10000 --out results.json
+    python -m benchmarks.hot_paths --backend mongod --sizes 1000000
+
+For every size the benchmark database is emptied and filled with that many
+generated schedules (the same ones on every run, from a fixed seed). It then
+times:
+
+- check_conflict: a clear and a conflicting candidate, with the in-memory
+  schedule index and with plain Mongo queries
+- create_schedule: the endpoint, slot claims and grid invalidation included
+- read_schedules: GET /schedules/ through the whole app, per page size, on
+  the model and the FAST_READS path
+- get_current_user: with a cold and a warm principal cache
+- token: POST /token, dominated by bcrypt
+- serialization: the model and fast paths of benchmarks.serialization on
+  documents read from the database
+
+``--backend mongomock`` runs in-process with mongomock-motor; it has no query
+planner, so only use it for small sizes and relative comparisons.
+``--backend mongod`` uses a local server (``--mongodb-url``) and is what the
+larger sizes are meant for. Either way the database is ``--db``, never the
+application's own.
+
+Results are written as JSON (to ``--out`` or stdout) with the commit they
+were measured on; compare two runs with ``python -m benchmarks.compare``.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from beanie import init_beanie
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from app.cache import principal_cache, subject_cache, user_cache
+from app.config import settings
+from app.conflicts import ScheduleConflictError, schedule_index
+from app.db import DOCUMENT_MODELS, command_listeners, create_indexes
+from app.deps import get_current_user
+from app.models import Schedule, ScheduleGrid, ScheduleSlot, User, UserRole
+from app.routers.schedules import check_conflict, create_schedule
+from app.schemas.schedule import ScheduleCreate, ScheduleOut
+from app.security import create_access_token, get_password_hash
+from benchmarks.serialization import fast_path, model_path
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:
+    AsyncMongoMockClient = None
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+# Classes per instructor, room and section in the generated data
+PER_INSTRUCTOR = 20
+PER_ROOM = 40
+PER_SECTION = 25
+INSERT_BATCH = 10000
+BENCH_USER = "bench-user"
+BENCH_PASSWORD = "bench-password"
+
+
+def make_schedule(i: int, size: int) -> Dict[str, Any]:
+    """
+    Schedule ``i`` of a dataset of ``size``. An instructor's classes never
+    overlap; rooms and sections are shared at random, so some of theirs do,
+    as in real data.
+    """
+    rng = random.Random(i)
+    slot = i % PER_INSTRUCTOR
+    start = 7 * 60 + (slot // len(DAYS)) * 90
+    return {
+        "_id": ObjectId(f"{i:024x}"),
+        "subject_code": f"CS{i % 300:03d}",
+        "instructor_id": f"inst{i // PER_INSTRUCTOR:06d}",
+        "section": f"S{rng.randrange(max(size // PER_SECTION, 1)):05d}",
+        "day": DAYS[slot % len(DAYS)],
+        "start_min": start,
+        "end_min": start + 80,
+        "room": f"R{rng.randrange(max(size // PER_ROOM, 1)):05d}",
+    }
+
+
+def stats(timings: List[float]) -> Dict[str, float]:
+    ms = sorted(t * 1000 for t in timings)
+    return {
+        "iterations": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p50_ms": round(ms[len(ms) // 2], 4),
+        "p95_ms": round(ms[min(int(len(ms) * 0.95), len(ms) - 1)], 4),
+        "min_ms": round(ms[0], 4),
+        "max_ms": round(ms[-1], 4),
+        "ops_per_sec": round(1000 / statistics.fmean(ms), 1),
+    }
+
+
+async def measure(
+    func: Callable[[int], Awaitable[Any]], iterations: int, warmup: int = 3
+) -> Dict[str, float]:
+    for i in range(warmup):
+        await func(-1 - i)
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await func(i)
+        timings.append(time.perf_counter() - started)
+    return stats(timings)
+
+
+class Suite:
+    def __init__(self, iterations: int, token_iterations: int):
+        self.iterations = iterations
+        self.token_iterations = token_iterations
+        self.results: List[Dict[str, Any]] = []
+
+    def add(self, case: str, size: int, result: Dict[str, Any], **params):
+        entry = {"case": case, "size": size, "params": params, **result}
+        self.results.append(entry)
+        label = " ".join(f"{k}={v}" for k, v in params.items())
+        print(
+            f"{case:<18} size={size:<8} {label:<30} "
+            f"p50={entry['p50_ms']:.3f}ms p95={entry['p95_ms']:.3f}ms",
+            file=sys.stderr,
+        )
+
+    async def seed(self, size: int):
+        for model in DOCUMENT_MODELS:
+            await model.get_motor_collection().delete_many({})
+        collection = Schedule.get_motor_collection()
+        for first in range(0, size, INSERT_BATCH):
+            batch = range(first, min(first + INSERT_BATCH, size))
+            await collection.insert_many(
+                [make_schedule(i, size) for i in batch], ordered=False
+            )
+        await User(
+            user_id=BENCH_USER,
+            firstname="Bench",
+            lastname="User",
+            password=get_password_hash(BENCH_PASSWORD),
+            role=UserRole.admin,
+        ).insert()
+        await create_indexes()
+        for cache in (principal_cache, subject_cache, user_cache):
+            cache.clear()
+
+    async def check_conflict(self, size: int):
+        existing = [make_schedule(i, size) for i in range(0, size, max(size // 97, 1))]
+
+        def candidate(i: int, conflicting: bool) -> Schedule:
+            doc = dict(existing[i % len(existing)])
+            doc.pop("_id")
+            if not conflicting:
+                doc.update(
+                    instructor_id=f"new-inst{i}", room=f"new-R{i}", section=f"new-S{i}"
+                )
+            return Schedule(**doc)
+
+        for indexed in (True, False):
+            settings.SCHEDULE_INDEX_ENABLED = indexed
+            if indexed:
+                await schedule_index.load()
+            for conflicting in (False, True):
+
+                async def run(i: int, conflicting: bool = conflicting):
+                    try:
+                        await check_conflict(candidate(i, conflicting))
+                    except ScheduleConflictError:
+                        pass
+
+                self.add(
+                    "check_conflict",
+                    size,
+                    await measure(run, self.iterations),
+                    index=indexed,
+                    conflicting=conflicting,
+                )
+        settings.SCHEDULE_INDEX_ENABLED = True
+
+    async def create_schedule(self, size: int):
+        async def run(i: int):
+            await create_schedule(
+                ScheduleCreate(
+                    subject_code="CS001",
+                    instructor_id=f"bench-inst{i}",
+                    section=f"bench-S{i}",
+                    day="Wed",
+                    start_time="09:00",
+                    end_time="10:30",
+                    room=f"bench-R{i}",
+                )
+            )
+
+        self.add("create_schedule", size, await measure(run, self.iterations))
+        # Put the dataset back to its size for the cases that follow
+        created = {"instructor_id": {"$regex": "^bench-inst"}}
+        ids = [
+            doc["_id"]
+            async for doc in Schedule.get_motor_collection().find(created, {"_id": 1})
+        ]
+        await Schedule.get_motor_collection().delete_many({"_id": {"$in": ids}})
+        await ScheduleSlot.get_motor_collection().delete_many(
+            {"schedule_id": {"$in": ids}}
+        )
+        await ScheduleGrid.get_motor_collection().delete_many({})
+        for schedule_id in ids:
+            schedule_index.remove(str(schedule_id))
+
+    async def read_schedules(self, size: int, page_sizes: List[int]):
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://b") as c:
+            for fast in (False, True):
+                settings.FAST_READS = fast
+                for limit in page_sizes:
+
+                    async def run(i: int, limit: int = limit):
+                        response = await c.get("/schedules/", params={"limit": limit})
+                        response.raise_for_status()
+
+                    self.add(
+                        "read_schedules",
+                        size,
+                        await measure(run, self.iterations),
+                        limit=limit,
+                        fast_reads=fast,
+                    )
+        settings.FAST_READS = False
+
+    async def get_current_user(self, size: int):
+        token = create_access_token(BENCH_USER)
+
+        async def cold(i: int):
+            principal_cache.clear()
+            user_cache.clear()
+            await get_current_user(token)
+
+        async def warm(i: int):
+            await get_current_user(token)
+
+        self.add(
+            "get_current_user", size, await measure(cold, self.iterations), cache="cold"
+        )
+        self.add(
+            "get_current_user", size, await measure(warm, self.iterations), cache="warm"
+        )
+
+    async def token(self, size: int):
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        form = {"username": BENCH_USER, "password": BENCH_PASSWORD}
+        async with httpx.AsyncClient(transport=transport, base_url="http://b") as c:
+
+            async def run(i: int):
+                response = await c.post("/token", data=form)
+                response.raise_for_status()
+
+            result = await measure(run, self.token_iterations, warmup=1)
+        self.add("token", size, result, bcrypt_rounds=settings.PASSWORD_BCRYPT_ROUNDS)
+
+    async def serialization(self, size: int, page_sizes: List[int]):
+        adapter = TypeAdapter(List[ScheduleOut])
+        measured = set()
+        for limit in page_sizes:
+            docs = (
+                await Schedule.get_motor_collection()
+                .find({})
+                .limit(limit)
+                .to_list(None)
+            )
+            if not docs or len(docs) in measured:
+                # The dataset is smaller than the page
+                continue
+            measured.add(len(docs))
+            for name, func, args in (
+                ("model", model_path, (docs, adapter)),
+                ("fast", fast_path, (docs,)),
+            ):
+
+                async def run(i: int, func=func, args=args):
+                    func(*args)
+
+                self.add(
+                    "serialization",
+                    size,
+                    await measure(run, self.iterations),
+                    rows=len(docs),
+                    path=name,
+                )
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+CASES = [
+    "check_conflict",
+    "create_schedule",
+    "read_schedules",
+    "get_current_user",
+    "token",
+    "serialization",
+]
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.backend == "mongomock":
+        if AsyncMongoMockClient is None:
+            sys.exit("mongomock-motor is not installed; use --backend mongod")
+        client = AsyncMongoMockClient()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        # Plain connection to a local server, with the app's command listeners
+        client = AsyncIOMotorClient(
+            args.mongodb_url, event_listeners=command_listeners()
+        )
+    if args.db == settings.MONGODB_DB_NAME:
+        sys.exit("--db must not be the application's database")
+    await init_beanie(
+        database=client[args.db], document_models=DOCUMENT_MODELS, skip_indexes=True
+    )
+
+    suite = Suite(args.iterations, args.token_iterations)
+    page_sizes = [int(n) for n in args.page_sizes.split(",")]
+    for size in (int(n) for n in args.sizes.split(",")):
+        print(f"Seeding {size} schedules", file=sys.stderr)
+        await suite.seed(size)
+        for case in args.cases.split(","):
+            method = getattr(suite, case)
+            if case in ("read_schedules", "serialization"):
+                await method(size, page_sizes)
+            else:
+                await method(size)
+    if args.backend == "mongod":
+        await client.drop_database(args.db)
+    client.close()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+        },
+        "results": suite.results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--backend",
+        choices=["mongomock", "mongod"],
+        default="mongomock" if AsyncMongoMockClient is not None else "mongod",
+    )
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="classgrid_benchmarks")
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--page-sizes", default="10,100,500")
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--token-iterations", type=int, default=10)
+    parser.add_argument("--out", help="write the JSON results here, not stdout")
+    args = parser.parse_args()
+    for case in args.cases.split(","):
+        if case not in CASES:
+            parser.error(f"unknown case {case!r}; choose from {', '.join(CASES)}")
+
+    report = asyncio.run(main(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,112 @@
+"""
+Per-row cost of building a schedule list response, model path vs fast path.
+
+    python -m benchmarks.serialization --rows 1000 --repeat 20
+
+The model path is what a list endpoint does by default: raw Mongo documents
+are validated into Schedule documents, validated again against
+List[ScheduleOut] and dumped to JSON. The fast path (FAST_READS) turns the
+raw documents into rows with app.serializers and encodes them with orjson.
+Documents are generated in memory. Initializing the model needs a database
+handshake: mongomock-motor is used when installed, otherwise MONGODB_URL
+must be reachable.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List
+
+import orjson
+from beanie import init_beanie
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from app.config import settings
+from app.db import create_client
+from app.models import Schedule
+from app.schemas.schedule import ScheduleOut
+from app.serializers import schedule_row
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:
+    AsyncMongoMockClient = None
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+
+
+def make_docs(rows: int) -> List[dict]:
+    rng = random.Random(0)
+    docs = []
+    for i in range(rows):
+        start = rng.randrange(7 * 60, 18 * 60, 30)
+        docs.append(
+            {
+                "_id": ObjectId(),
+                "subject_code": f"CS{i % 50:03d}",
+                "instructor_id": f"inst{i % 40:03d}",
+                "section": f"S{i % 30}",
+                "day": rng.choice(DAYS),
+                "start_min": start,
+                "end_min": start + 90,
+                "room": f"Room {i % 25}",
+            }
+        )
+    return docs
+
+
+def model_path(docs: List[dict], adapter: TypeAdapter) -> bytes:
+    documents = [Schedule.model_validate(doc) for doc in docs]
+    return adapter.dump_json(adapter.validate_python(documents, from_attributes=True))
+
+
+def fast_path(docs: List[dict]) -> bytes:
+    return orjson.dumps([schedule_row(doc) for doc in docs])
+
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def main(rows: int, repeat: int):
+    if AsyncMongoMockClient is not None:
+        client = AsyncMongoMockClient()
+    else:
+        client = create_client()
+    await init_beanie(
+        database=client[settings.MONGODB_DB_NAME],
+        document_models=[Schedule],
+        skip_indexes=True,
+    )
+    docs = make_docs(rows)
+    adapter = TypeAdapter(List[ScheduleOut])
+    # Both paths must produce the same payload
+    assert json.loads(model_path(docs, adapter)) == json.loads(fast_path(docs))
+
+    results = {
+        "rows": rows,
+        "model_path_us_per_row": best_of(repeat, model_path, docs, adapter)
+        / rows
+        * 1e6,
+        "fast_path_us_per_row": best_of(repeat, fast_path, docs) / rows * 1e6,
+    }
+    results["speedup"] = (
+        results["model_path_us_per_row"] / results["fast_path_us_per_row"]
+    )
+    print(json.dumps({k: round(v, 2) for k, v in results.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
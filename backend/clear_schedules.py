@@ -1,20 +1,26 @@
 import asyncio
-import certifi
-from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from app.config import settings
-from app.models.schedule import Schedule
+from app.db import create_client
+from app.etags import bump_generation
+from app.models import Generation, Schedule, ScheduleGrid, ScheduleSlot
 
 async def clear_schedules():
-    client = AsyncIOMotorClient(settings.MONGODB_URL, tlsCAFile=certifi.where())
+    client = create_client()
     await init_beanie(
         database=client[settings.MONGODB_DB_NAME],
-        document_models=[Schedule],
+        document_models=[Schedule, ScheduleSlot, ScheduleGrid, Generation],
     )
     
     print("Deleting all schedules...")
     await Schedule.delete_all()
+    # Slot claims and grids only describe existing schedules
+    await ScheduleSlot.delete_all()
+    await ScheduleGrid.delete_all()
+    # Cached schedule lists held by clients are now out of date
+    await bump_generation(Schedule)
     print("All schedules deleted.")
+    client.close()
 
 if __name__ == "__main__":
     asyncio.run(clear_schedules())
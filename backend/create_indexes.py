@@ -0,0 +1,28 @@
+import asyncio
+
+from beanie import init_beanie
+
+from app.config import settings
+from app.db import DOCUMENT_MODELS, create_client, create_indexes
+
+
+async def main():
+    """
+    Create every collection index declared by the models.
+
+    Run after deploying with FAST_STARTUP, which skips this at startup (the
+    API then creates them in the background instead). Safe to re-run.
+    """
+    client = create_client()
+    await init_beanie(
+        database=client[settings.MONGODB_DB_NAME],
+        document_models=DOCUMENT_MODELS,
+        skip_indexes=True,
+    )
+    await create_indexes()
+    client.close()
+    print("Indexes created.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.db import create_client
+from app.security import hash_password, is_password_hash, shutdown_executor
+
+
+async def migrate_password_hashes(batch_size: int):
+    """
+    Replace plaintext passwords left from before hashing with bcrypt hashes.
+
+    Logins already upgrade these rows one by one; this script does all of
+    them at once. Safe to re-run: rows that already hold a hash are skipped.
+    Hashing runs in the PASSWORD_HASH_WORKERS thread pool.
+    """
+    client = create_client()
+    collection = client[settings.MONGODB_DB_NAME]["users"]
+
+    cursor = collection.find(
+        {"password": {"$nin": [None, ""]}}, {"password": 1}, batch_size=batch_size
+    )
+    migrated = 0
+    batch = []
+    async for doc in cursor:
+        if not is_password_hash(doc["password"]):
+            batch.append(doc)
+        if len(batch) >= batch_size:
+            migrated += await _write_batch(collection, batch)
+            print(f"Hashed {migrated} passwords...")
+            batch = []
+
+    if batch:
+        migrated += await _write_batch(collection, batch)
+
+    shutdown_executor()
+    client.close()
+    print(f"Done. {migrated} plaintext passwords hashed.")
+
+
+async def _write_batch(collection, docs) -> int:
+    hashes = await asyncio.gather(*(hash_password(doc["password"]) for doc in docs))
+    # Matching on the old value skips rows changed since they were read
+    await collection.bulk_write(
+        [
+            UpdateOne(
+                {"_id": doc["_id"], "password": doc["password"]},
+                {"$set": {"password": hashed}},
+            )
+            for doc, hashed in zip(docs, hashes)
+        ],
+        ordered=False,
+    )
+    return len(docs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=migrate_password_hashes.__doc__)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(migrate_password_hashes(args.batch_size))
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.db import create_client
+from app.models.schedule import to_minutes
+
+
+async def migrate_schedule_times(batch_size: int):
+    """
+    Convert legacy HH:MM start_time/end_time strings to integer start_min/end_min.
+
+    Safe to re-run: only documents that still lack start_min are touched, and
+    every batch is written with a single unordered bulk_write.
+    """
+    client = create_client()
+    collection = client[settings.MONGODB_DB_NAME]["schedules"]
+
+    cursor = collection.find(
+        {"start_min": {"$exists": False}},
+        {"start_time": 1, "end_time": 1},
+        batch_size=batch_size,
+    )
+    migrated = 0
+    batch = []
+    async for doc in cursor:
+        batch.append(
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "start_min": to_minutes(doc["start_time"]),
+                        "end_min": to_minutes(doc["end_time"]),
+                    },
+                    "$unset": {"start_time": "", "end_time": ""},
+                },
+            )
+        )
+        if len(batch) >= batch_size:
+            await collection.bulk_write(batch, ordered=False)
+            migrated += len(batch)
+            print(f"Migrated {migrated} schedules...")
+            batch = []
+
+    if batch:
+        await collection.bulk_write(batch, ordered=False)
+        migrated += len(batch)
+
+    client.close()
+    print(f"Done. {migrated} schedules migrated to integer minutes.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=migrate_schedule_times.__doc__)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(migrate_schedule_times(args.batch_size))
@@ -0,0 +1,49 @@
+import asyncio
+
+from pymongo import IndexModel
+
+from app.config import settings
+from app.db import create_client
+
+# collection -> field that must be unique
+UNIQUE_FIELDS = {"users": "user_id", "subjects": "subject_code"}
+
+
+async def migrate_unique_indexes():
+    """
+    Replace the plain user_id and subject_code indexes with unique ones.
+
+    Run before deploying: index creation at startup fails while the old
+    index of the same key exists. A collection that still holds duplicates
+    is left unchanged and its duplicates are listed so they can be merged by
+    hand first. Safe to re-run.
+    """
+    client = create_client()
+    database = client[settings.MONGODB_DB_NAME]
+
+    for name, field in UNIQUE_FIELDS.items():
+        collection = database[name]
+        duplicates = await collection.aggregate(
+            [
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+                {"$match": {"count": {"$gt": 1}}},
+            ]
+        ).to_list(None)
+        if duplicates:
+            for duplicate in duplicates:
+                print(f"Duplicate {field} {duplicate['_id']!r} in {name}.")
+            print(f"Skipped {name}: merge the duplicates above and re-run.")
+            continue
+
+        indexes = await collection.index_information()
+        for index_name, details in indexes.items():
+            if details["key"] == [(field, 1)] and not details.get("unique"):
+                await collection.drop_index(index_name)
+        await collection.create_indexes([IndexModel(field, unique=True)])
+        print(f"{name}.{field} is unique.")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_unique_indexes())
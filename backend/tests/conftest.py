@@ -0,0 +1,41 @@
+import pytest_asyncio
+from beanie import init_beanie
+from httpx import ASGITransport, AsyncClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.cache import principal_cache, subject_cache, user_cache
+from app.config import settings
+from app.conflicts import IntervalIndex, schedule_index
+from app.db import DOCUMENT_MODELS
+from app.main import app
+from app.models import User, UserRole
+from app.security import create_access_token
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    """An API client over a fresh in-memory database; the lifespan is not run."""
+    mongo = AsyncMongoMockClient()
+    await init_beanie(
+        database=mongo[settings.MONGODB_DB_NAME], document_models=DOCUMENT_MODELS
+    )
+    # Process-wide state would otherwise carry over from the previous test
+    monkeypatch.setattr(schedule_index, "loaded_at", None)
+    monkeypatch.setattr(schedule_index, "_index", IntervalIndex())
+    for cache in (principal_cache, subject_cache, user_cache):
+        cache.clear()
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as c:
+        yield c
+
+
+@pytest_asyncio.fixture
+async def token_headers(client):
+    """Bearer headers of an admin, who passes every role check."""
+    user = User(
+        user_id="test_admin", firstname="Test", lastname="Admin", role=UserRole.admin
+    )
+    await user.create()
+    return {"Authorization": f"Bearer {create_access_token(user.user_id)}"}
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from app.admission import Gate, route_group
+
+
+def test_route_group():
+    assert route_group("POST", "/token") == "auth"
+    assert route_group("POST", "/schedules/bulk") == "bulk"
+    assert route_group("GET", "/schedules/export") == "bulk"
+    assert route_group("GET", "/schedules/") == "reads"
+    assert route_group("DELETE", "/subjects/CS101") == "writes"
+    # Health checks, preflights and admin diagnostics are never shed
+    assert route_group("GET", "/") is None
+    assert route_group("OPTIONS", "/schedules/") is None
+    assert route_group("GET", "/admin/admission") is None
+
+
+@pytest.mark.asyncio
+async def test_gate_queues_then_sheds():
+    gate = Gate("reads", limit=1, queue_size=1, max_wait=0.05)
+    assert await gate.acquire()
+
+    # The second request waits for a turn; the third finds the queue full
+    waiter = asyncio.create_task(gate.acquire())
+    await asyncio.sleep(0)
+    assert not await gate.acquire()
+    assert not await waiter
+
+    gate.release()
+    assert await gate.acquire()
+
+    stats = gate.stats()
+    assert stats["admitted"] == 2
+    assert stats["shed_queue_full"] == 1
+    assert stats["shed_timeout"] == 1
+    assert stats["active"] == 1
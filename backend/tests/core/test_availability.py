@@ -0,0 +1,46 @@
+import numpy as np
+
+from app.availability import busy_bitmap, common_free, find_free_slots, free_windows
+
+
+def doc(day, start, end):
+    return {"day": day, "start_min": start, "end_min": end}
+
+
+def test_busy_bitmap_marks_partial_slots():
+    busy = busy_bitmap([doc("Tue", 542, 600)], 5)
+
+    assert busy.shape == (7, 288)
+    # 09:02 starts inside the 09:00 slot; 10:00 is free again
+    assert busy[1, 108] and busy[1, 119]
+    assert not busy[1, 107] and not busy[1, 120]
+    assert not busy[0].any()
+
+
+def test_common_free_and_windows():
+    free = common_free(
+        [
+            busy_bitmap([doc("Mon", 540, 600)], 5),
+            busy_bitmap([doc("Mon", 660, 720)], 5),
+        ]
+    )
+    # Between 08:00 and 13:00: 08:00-09:00, 10:00-11:00, 12:00-13:00
+    assert free_windows(free[0], 96, 156, 12) == [(96, 108), (120, 132), (144, 156)]
+    assert free_windows(free[0], 96, 156, 13) == []
+    assert free_windows(np.ones(10, dtype=bool), 0, 10, 10) == [(0, 10)]
+
+
+def test_find_free_slots():
+    windows = find_free_slots(
+        {
+            ("instructor_id", "inst001"): [doc("Mon", 540, 630)],
+            ("room", "Room 101"): [doc("Mon", 600, 660), doc("Wed", 420, 1260)],
+        },
+        ["Mon", "Wed"],
+        420,
+        720,
+        60,
+        5,
+    )
+
+    assert windows == {"Mon": [(420, 540), (660, 720)], "Wed": []}
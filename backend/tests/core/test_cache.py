@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from app.cache import MISSING, PrincipalCache, TTLCache, principal_cache
+from app.models import User
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_expires_and_counts():
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", None)
+    # Cached misses are hits too
+    assert cache.get("a") is None
+    time.sleep(0.02)
+    assert cache.get("a") is MISSING
+    assert len(cache) == 0
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_ttl_cache_invalidate():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is MISSING
+
+
+def test_principal_cache_invalidate_user_and_expiry():
+    cache = PrincipalCache(TTLCache(maxsize=10, ttl=60))
+    user = User.model_construct(user_id="u1", firstname="A", lastname="B")
+
+    cache.set("token", time.time() + 60, cache.epoch("u1"), user)
+    assert cache.get("token").user_id == "u1"
+
+    # A lookup that started before the change stored an outdated epoch
+    epoch = cache.epoch("u1")
+    cache.invalidate_user("u1")
+    cache.set("other", time.time() + 60, epoch, user)
+    assert cache.get("token") is None
+    assert cache.get("other") is None
+
+    cache.set("expired", time.time() - 1, cache.epoch("u1"), user)
+    assert cache.get("expired") is None
+
+
+@pytest.mark.asyncio
+async def test_principal_miss_loads_the_user_from_mongo(client, token_headers):
+    me = await client.get("/users/me", headers=token_headers)
+    assert me.json()["role"] == "admin"
+
+    # Demoted by another worker, whose epoch bump this worker never sees
+    await User.get_motor_collection().update_one(
+        {"user_id": me.json()["user_id"]}, {"$set": {"role": "instructor"}}
+    )
+    principal_cache.clear()  # the principal entry ran out
+
+    me = await client.get("/users/me", headers=token_headers)
+    assert me.json()["role"] == "instructor"
@@ -0,0 +1,222 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from app.conflicts import (
+    Interval,
+    IntervalIndex,
+    ScheduleIndex,
+    conflicts_with,
+    find_batch_conflicts,
+    schedule_intervals,
+)
+from app.models.schedule import (
+    Schedule,
+    from_minutes,
+    time_fields_to_minutes,
+    to_minutes,
+)
+from app.etags import bump_generation
+from app.reservations import slot_keys
+from app.schemas.schedule import ScheduleCreate, ScheduleOut, ScheduleUpdate
+
+SCHEDULE = {
+    "instructor_id": "inst001",
+    "room": "Room 101",
+    "section": "A",
+    "day": "Mon",
+    "start_time": "09:00",
+    "end_time": "10:30",
+}
+
+
+def make_schedule(**fields):
+    return time_fields_to_minutes({**SCHEDULE, **fields})
+
+
+def test_time_conversion():
+    assert to_minutes("09:00") == 540
+    assert to_minutes("9:00") == 540
+    assert to_minutes("23:59") == 1439
+    assert from_minutes(540) == "09:00"
+    # "9:00" sorts after "10:00" as a string but not as minutes
+    assert to_minutes("9:00") < to_minutes("10:00")
+    assert time_fields_to_minutes({"start_time": "9:00", "end_time": "10:00"}) == {
+        "start_min": 540,
+        "end_min": 600,
+    }
+
+
+def test_interval_index_overlap():
+    index = IntervalIndex()
+    key = ("inst001", "Mon")
+    index.add(key, Interval(540, 600, "a"))
+    index.add(key, Interval(660, 750, "b"))
+
+    assert index.overlap(key, 570, 630).schedule_id == "a"
+    assert index.overlap(key, 700, 800).schedule_id == "b"
+    # Touching intervals do not overlap
+    assert index.overlap(key, 600, 660) is None
+    assert index.overlap(("inst001", "Tue"), 540, 600) is None
+
+
+def test_interval_index_exclude_and_remove():
+    index = IntervalIndex()
+    key = ("inst001", "Mon")
+    index.add(key, Interval(540, 600, "a"))
+
+    assert index.overlap(key, 540, 600, exclude_id="a") is None
+
+    index.remove("a")
+    assert index.overlap(key, 540, 600) is None
+    assert len(index) == 0
+
+
+def test_interval_index_long_interval_before_short_ones():
+    # A long legacy interval must still be found behind shorter ones
+    index = IntervalIndex()
+    key = ("inst001", "Mon")
+    index.add(key, Interval(480, 900, "long"))
+    index.add(key, Interval(500, 520, "short"))
+
+    assert index.overlap(key, 800, 850).schedule_id == "long"
+
+
+def test_interval_index_multiple_keys():
+    index = IntervalIndex()
+    index.add(("instructor_id", "inst001", "Mon"), Interval(540, 600, "a"))
+    index.add(("room", "Room 101", "Mon"), Interval(540, 600, "a"))
+
+    assert index.overlap(("room", "Room 101", "Mon"), 570, 630).schedule_id == "a"
+
+    index.remove("a")
+    assert index.overlap(("instructor_id", "inst001", "Mon"), 540, 600) is None
+    assert index.overlap(("room", "Room 101", "Mon"), 540, 600) is None
+
+
+def test_find_batch_conflicts():
+    existing = [
+        schedule_intervals(make_schedule(start_time="09:00", end_time="10:00"), "db")
+    ]
+    candidates = [
+        # Same room as the stored schedule
+        schedule_intervals(
+            make_schedule(instructor_id="x", section="x", start_time="09:30"),
+            "row0",
+        ),
+        schedule_intervals(make_schedule(start_time="11:00", end_time="12:00"), "row1"),
+        # Same instructor as row1
+        schedule_intervals(
+            make_schedule(room="y", section="y", start_time="11:30", end_time="12:30"),
+            "row2",
+        ),
+        schedule_intervals(
+            make_schedule(instructor_id="z", room="z", section="z"), "row3"
+        ),
+    ]
+
+    rejected = find_batch_conflicts(existing, candidates)
+
+    assert [hit.schedule_id for hit in rejected["row0"]] == ["db"]
+    assert [hit.schedule_id for hit in rejected["row2"]] == ["row1"]
+    assert set(rejected) == {"row0", "row2"}
+
+
+def test_conflicts_with_lists_every_shared_resource():
+    doc = make_schedule(subject_code="CS101", section="B")
+    doc["_id"] = "db"
+    conflicts = conflicts_with(make_schedule(start_time="10:00"), doc)
+
+    assert [conflict.resource for conflict in conflicts] == ["instructor_id", "room"]
+    assert (
+        conflicts_with(make_schedule(start_time="10:30", end_time="11:00"), doc) == []
+    )
+    assert conflicts_with(make_schedule(day="Tue"), doc) == []
+
+
+def test_schedule_times_must_be_on_slot_boundaries():
+    ScheduleCreate(**{**SCHEDULE, "subject_code": "CS101", "start_time": "09:05"})
+    with pytest.raises(ValidationError):
+        ScheduleCreate(**{**SCHEDULE, "subject_code": "CS101", "end_time": "10:07"})
+    with pytest.raises(ValidationError):
+        ScheduleUpdate(start_time="09:02")
+    # Stored legacy times are still returned
+    legacy = ScheduleOut(
+        **{**SCHEDULE, "subject_code": "CS101", "id": "x", "start_time": "09:03"}
+    )
+    assert legacy.start_time == "09:03"
+
+
+def test_slot_keys_cover_partial_blocks():
+    # Legacy times inside a block claim the whole block
+    keys = slot_keys(make_schedule(start_time="09:02", end_time="09:11"))
+
+    # 09:00-09:15 in 5-minute blocks, once per resource
+    assert {slot for _, _, _, slot in keys} == {108, 109, 110}
+    assert len(keys) == 9
+    assert ("room", "Room 101", "Mon", 108) in keys
+
+
+class PausingCollection:
+    """Serves ``docs`` to a scan, stopping after the first until resumed."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.paused = asyncio.Event()
+        self.resume = asyncio.Event()
+
+    def find(self, *args):
+        return self._scan()
+
+    async def _scan(self):
+        for position, doc in enumerate(self.docs):
+            yield doc
+            if position == 0:
+                self.paused.set()
+                await self.resume.wait()
+
+
+@pytest.mark.asyncio
+async def test_schedule_index_load_keeps_changes_made_during_the_scan(monkeypatch):
+    stored = make_schedule(_id="kept")
+    deleted = make_schedule(_id="deleted", start_time="11:00", end_time="12:00")
+    collection = PausingCollection([stored, deleted])
+    monkeypatch.setattr(Schedule, "get_motor_collection", lambda: collection)
+
+    index = ScheduleIndex(max_age_seconds=60)
+    load = asyncio.create_task(index.load())
+    await collection.paused.wait()
+    # Written and deleted by this worker while the scan is half way
+    index.add(
+        SimpleNamespace(
+            id="added", **make_schedule(start_time="13:00", end_time="14:00")
+        )
+    )
+    index.remove("deleted")
+    collection.resume.set()
+    await load
+
+    assert index.is_fresh
+    day = make_schedule(start_time="08:00", end_time="15:00")
+    assert index.find_overlapping_ids(day) == {"kept", "added"}
+
+
+@pytest.mark.asyncio
+async def test_schedule_index_refresh_only_rescans_after_a_write(client):
+    collection = Schedule.get_motor_collection()
+    await collection.insert_one(make_schedule())
+    index = ScheduleIndex(max_age_seconds=60)
+    assert await index.refresh()
+    assert len(index) == 1
+
+    # Another worker's write whose bump has not landed yet is not rescanned
+    await collection.insert_one(make_schedule(start_time="11:00", end_time="12:00"))
+    assert not await index.refresh()
+    assert index.is_fresh
+    assert len(index) == 1
+
+    await bump_generation(Schedule)
+    assert await index.refresh()
+    assert len(index) == 2
@@ -0,0 +1,16 @@
+from app.etags import _matches
+
+ETAG = 'W/"abc"'
+
+
+def test_matches_weak_and_strong_forms():
+    assert _matches('W/"abc"', ETAG)
+    # Weak comparison ignores the W/ prefix
+    assert _matches('"abc"', ETAG)
+    assert not _matches('W/"abd"', ETAG)
+
+
+def test_matches_lists_and_wildcard():
+    assert _matches('"x", W/"abc"', ETAG)
+    assert _matches("*", ETAG)
+    assert not _matches('"x", "y"', ETAG)
@@ -0,0 +1,106 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.exports import ExportFormat, _encode
+from app.schemas.schedule import ScheduleOut
+from app.schemas.subjects import SubjectResponse
+from app.serializers import (
+    SCHEDULE_FIELDS,
+    SUBJECT_FIELDS,
+    USER_FIELDS,
+    parse_fields,
+    projection,
+    schedule_row,
+    sparse_row,
+    subject_row,
+    user_row,
+)
+
+
+def test_schedule_row_and_projection():
+    doc = {
+        "_id": ObjectId(),
+        "subject_code": "CS101",
+        "instructor_id": "inst001",
+        "section": "A",
+        "day": "Mon",
+        "start_min": 540,
+        "end_min": 630,
+        "room": "Room 101",
+    }
+    row = schedule_row(doc)
+
+    assert list(row) == list(SCHEDULE_FIELDS)
+    assert (row["start_time"], row["end_time"]) == ("09:00", "10:30")
+    assert projection(SCHEDULE_FIELDS) == {
+        "_id": 1,
+        "subject_code": 1,
+        "instructor_id": 1,
+        "section": 1,
+        "day": 1,
+        "start_min": 1,
+        "end_min": 1,
+        "room": 1,
+    }
+
+
+def test_user_row_never_has_password():
+    row = user_row({"_id": ObjectId(), "user_id": "u1", "password": "hash"})
+
+    assert "password" not in row
+    assert "password" not in projection(USER_FIELDS)
+
+
+def test_encode_formats():
+    rows = [{"a": 1, "b": 'x, "y"'}, {"a": 2, "b": None}]
+
+    assert _encode(rows, ["a", "b"], ExportFormat.ndjson) == (
+        b'{"a": 1, "b": "x, \\"y\\""}\n{"a": 2, "b": null}\n'
+    )
+    assert _encode(rows, ["a", "b"], ExportFormat.csv) == b'1,"x, ""y"""\n2,\n'
+
+
+def test_parse_fields():
+    assert parse_fields(None, SCHEDULE_FIELDS) is None
+    assert parse_fields("room, day,room,id", SCHEDULE_FIELDS) == ["id", "room", "day"]
+    with pytest.raises(HTTPException) as exc:
+        parse_fields("user_id,password", USER_FIELDS)
+    assert exc.value.status_code == 400
+
+
+def test_sparse_schedule_row():
+    row = schedule_row({"_id": ObjectId(), "room": "Room 101"})
+
+    assert sparse_row(row, ["id", "room", "start_time"])["start_time"] is None
+
+
+def test_rows_match_response_models():
+    # The fast read path must produce exactly what the response models do
+    doc = {
+        "_id": ObjectId(),
+        "subject_code": "CS101",
+        "subject_description": "Intro",
+        "units": 3,
+        "department": "BSCS",
+    }
+    row = subject_row(doc)
+    assert list(row) == list(SUBJECT_FIELDS)
+    assert (
+        SubjectResponse.model_validate(row).model_dump(mode="json", by_alias=True)
+        == row
+    )
+
+    row = schedule_row(
+        {
+            "_id": ObjectId(),
+            "subject_code": "CS101",
+            "instructor_id": "inst001",
+            "section": "A",
+            "day": "Mon",
+            "start_min": 540,
+            "end_min": 630,
+            "room": "Room 101",
+        }
+    )
+    assert ScheduleOut.model_validate(row).model_dump(mode="json") == row
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from app.jobs import Scheduler
+
+
+@pytest.mark.asyncio
+async def test_run_records_results_and_failures():
+    async def ok():
+        return 3
+
+    async def broken():
+        raise ValueError("boom")
+
+    scheduler = Scheduler()
+    scheduler.add("ok", ok, 60)
+    scheduler.add("broken", broken, 60)
+    scheduler.add("disabled", ok, 0)
+    await scheduler.run("ok")
+    await scheduler.run("broken")
+
+    stats = scheduler.stats()
+    assert "disabled" not in stats
+    assert stats["ok"]["runs"] == 1
+    assert stats["ok"]["last_result"] == 3
+    assert stats["ok"]["failures"] == 0
+    assert stats["broken"]["failures"] == 1
+    assert stats["broken"]["last_error"] == "ValueError: boom"
+
+
+@pytest.mark.asyncio
+async def test_overlapping_run_is_skipped():
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+
+    scheduler = Scheduler()
+    scheduler.add("slow", slow, 60)
+    first = asyncio.create_task(scheduler.run("slow"))
+    await asyncio.sleep(0)
+    second = await scheduler.run("slow")
+    release.set()
+
+    assert await first is True
+    assert second is False
+    stats = scheduler.jobs["slow"].stats()
+    assert stats["runs"] == 1
+    assert stats["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_times_out():
+    async def hang():
+        await asyncio.sleep(10)
+
+    scheduler = Scheduler()
+    scheduler.add("hang", hang, 60, timeout=0.01)
+    await scheduler.run("hang")
+
+    stats = scheduler.jobs["hang"].stats()
+    assert stats["timeouts"] == 1
+    assert stats["failures"] == 1
+    assert stats["running"] is False
+
+
+@pytest.mark.asyncio
+async def test_loop_runs_on_interval_until_stopped():
+    calls = []
+    cleaned = []
+
+    async def tick():
+        calls.append(1)
+
+    async def cleanup():
+        cleaned.append(1)
+
+    scheduler = Scheduler()
+    scheduler.add("tick", tick, 0.02, jitter=0)
+    scheduler.add_cleanup(cleanup)
+    scheduler.start()
+    await asyncio.sleep(0.07)
+    await scheduler.stop()
+    runs = len(calls)
+    await asyncio.sleep(0.05)
+
+    assert runs >= 3
+    assert len(calls) == runs
+    assert cleaned == [1]
+    assert scheduler.jobs["tick"]._task is None
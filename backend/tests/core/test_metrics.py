@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+
+from app.metrics import (
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    MongoCommandListener,
+    command_collection,
+    mongo_command_duration,
+    mongo_command_failures,
+    request_duration,
+    requests_in_flight,
+    requests_total,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency", ["route"], buckets=[0.1, 1])
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    lines = histogram.render()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("events_total", "Events", ["name"])
+    counter.inc('say "hi"')
+    counter.inc('say "hi"', amount=2)
+    assert counter.render()[-1] == 'events_total{name="say \\"hi\\""} 3'
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_requests_by_route_template():
+    router = APIRouter()
+
+    @router.get("/{thing_id}")
+    async def read_thing(thing_id: str):
+        return {"id": thing_id}
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router, prefix="/things")
+
+    before = request_duration.count("GET", "/things/{thing_id}")
+    ok = requests_total.value("GET", "/things/{thing_id}", "200")
+    missing = requests_total.value("GET", "unmatched", "404")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+        await c.get("/things/1")
+        await c.get("/things/2")
+        await c.get("/nowhere")
+
+    assert request_duration.count("GET", "/things/{thing_id}") == before + 2
+    assert requests_total.value("GET", "/things/{thing_id}", "200") == ok + 2
+    assert requests_total.value("GET", "unmatched", "404") == missing + 1
+    assert requests_in_flight.value("GET") == 0
+
+
+def test_command_collection():
+    assert command_collection("find", {"find": "schedules"}) == "schedules"
+    assert command_collection("getMore", {"getMore": 1, "collection": "users"}) == (
+        "users"
+    )
+    assert command_collection("aggregate", {"aggregate": 1}) == ""
+    assert command_collection("ping", {"ping": 1}) == ""
+
+
+def test_mongo_listener_times_commands_by_collection():
+    listener = MongoCommandListener()
+
+    def event(request_id, name, command=None, duration=0):
+        return SimpleNamespace(
+            connection_id=("localhost", 27017),
+            request_id=request_id,
+            command_name=name,
+            command=command,
+            duration_micros=duration,
+        )
+
+    found = mongo_command_duration.count("schedules", "find")
+    failed = mongo_command_failures.value("schedules", "insert")
+
+    listener.started(event(1, "find", {"find": "schedules"}))
+    listener.started(event(2, "insert", {"insert": "schedules"}))
+    listener.succeeded(event(1, "find", duration=1500))
+    listener.failed(event(2, "insert", duration=800))
+
+    assert mongo_command_duration.count("schedules", "find") == found + 1
+    assert mongo_command_failures.value("schedules", "insert") == failed + 1
+    assert listener._pending == {}
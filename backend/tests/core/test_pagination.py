@@ -0,0 +1,22 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    last_id = ObjectId()
+    cursor = encode_cursor(last_id)
+
+    assert decode_cursor(cursor) == last_id
+    # Opaque and URL-safe
+    assert str(last_id) not in cursor
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["", "!!bad", "YWJj"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
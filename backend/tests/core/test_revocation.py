@@ -0,0 +1,64 @@
+import time
+from datetime import timezone
+
+import pytest
+from beanie import init_beanie
+from jose import JWTError
+from mongomock_motor import AsyncMongoMockClient
+
+from app.models import RevokedToken
+from app.revocation import Denylist, denylist
+from app.security import (
+    REFRESH_TOKEN,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+)
+
+
+def test_denylist_forgets_expired_entries():
+    revoked = Denylist()
+    revoked.add("live", time.time() + 60)
+    revoked.add("expired", time.time() - 1)
+    revoked.add("expiring", time.time() + 0.01)
+
+    assert revoked.is_revoked("live")
+    assert not revoked.is_revoked("expired")
+    assert not revoked.is_revoked(None)
+    time.sleep(0.02)
+    revoked.prune()
+    assert len(revoked) == 1
+
+
+@pytest.mark.asyncio
+async def test_revoke_reports_whether_the_token_was_live():
+    await init_beanie(
+        database=AsyncMongoMockClient()["test"], document_models=[RevokedToken]
+    )
+    expires_at = time.time() + 60
+
+    assert await Denylist().revoke("jti1", expires_at)
+    # Another worker, which has not synced the first revocation yet
+    assert not await Denylist().revoke("jti1", expires_at)
+
+    doc = await RevokedToken.get_motor_collection().find_one({"jti": "jti1"})
+    # Stored as UTC; Mongo hands it back naive
+    stored = doc["expires_at"].replace(tzinfo=timezone.utc)
+    assert abs(stored.timestamp() - expires_at) < 1
+
+
+def test_decode_token_checks_type_and_revocation():
+    access = decode_token(create_access_token("u1"))
+    refresh = decode_token(create_refresh_token("u1"), REFRESH_TOKEN)
+    assert access["sub"] == refresh["sub"] == "u1"
+    assert access["jti"] != refresh["jti"]
+
+    with pytest.raises(JWTError):
+        decode_token(create_refresh_token("u1"))
+    with pytest.raises(JWTError):
+        decode_token(create_access_token("u1"), REFRESH_TOKEN)
+
+    token = create_access_token("u1")
+    denylist.add(decode_token(token)["jti"], time.time() + 60)
+    with pytest.raises(JWTError):
+        decode_token(token)
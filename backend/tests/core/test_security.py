@@ -0,0 +1,32 @@
+import pytest
+
+from app.security import (
+    check_password,
+    get_password_hash,
+    is_password_hash,
+    password_needs_rehash,
+    verify_password,
+)
+
+
+def test_hash_and_verify():
+    hashed = get_password_hash("secret")
+
+    assert is_password_hash(hashed)
+    assert verify_password("secret", hashed)
+    assert not verify_password("wrong", hashed)
+    assert not password_needs_rehash(hashed)
+
+
+@pytest.mark.asyncio
+async def test_legacy_plaintext_is_accepted_and_rehashed():
+    assert verify_password("secret", "secret")
+    assert not verify_password("wrong", "secret")
+    assert not verify_password("secret", None)
+
+    valid, new_hash = await check_password("secret", "secret")
+    assert valid
+    assert verify_password("secret", new_hash)
+
+    assert await check_password("wrong", "secret") == (False, None)
+    assert await check_password("secret", None) == (False, None)
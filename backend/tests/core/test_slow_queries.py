@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from app.config import settings
+from app.slow_queries import (
+    SlowQueryListener,
+    command_shape,
+    explain_command,
+    shape_key,
+    summarize_plan,
+)
+
+
+def test_command_shape_replaces_values_with_types():
+    find = {
+        "find": "schedules",
+        "filter": {"room": "R101", "_id": {"$gt": ObjectId()}},
+        "sort": {"_id": 1},
+        "limit": 101,
+    }
+    assert command_shape("find", find) == {
+        "filter": {"room": "str", "_id": {"$gt": "ObjectId"}},
+        "sort": {"_id": 1},
+    }
+
+    update = {"update": "users", "updates": [{"q": {"user_id": "u1"}, "u": {}}]}
+    assert command_shape("update", update) == {"filter": {"user_id": "str"}}
+
+
+def test_shape_key_ignores_values_and_in_list_length():
+    first = {"find": "schedules", "filter": {"day": {"$in": ["Monday"]}}}
+    second = {"find": "schedules", "filter": {"day": {"$in": ["Friday", "Monday"]}}}
+    assert shape_key("schedules", "find", command_shape("find", first)) == shape_key(
+        "schedules", "find", command_shape("find", second)
+    )
+
+
+def test_explain_command_drops_driver_fields():
+    command = {
+        "find": "users",
+        "filter": {"department": "BSCS"},
+        "lsid": {"id": "x"},
+        "$db": "classgrid",
+        "$readPreference": {"mode": "primary"},
+    }
+    assert explain_command("find", command) == {
+        "find": "users",
+        "filter": {"department": "BSCS"},
+    }
+
+
+def test_summarize_plan_flags_collection_scans():
+    collscan = {
+        "queryPlanner": {
+            "winningPlan": {
+                "stage": "SORT",
+                "inputStage": {"stage": "COLLSCAN", "direction": "forward"},
+            }
+        }
+    }
+    _, summary, scans = summarize_plan(collscan)
+    assert summary == "COLLSCAN"
+    assert scans is True
+
+    # Aggregations nest the planner output; newer servers nest the plan too
+    ixscan = {
+        "stages": [
+            {
+                "$cursor": {
+                    "queryPlanner": {
+                        "winningPlan": {
+                            "queryPlan": {
+                                "stage": "FETCH",
+                                "inputStage": {
+                                    "stage": "IXSCAN",
+                                    "keyPattern": {"room": 1, "day": 1},
+                                },
+                            }
+                        }
+                    }
+                }
+            }
+        ]
+    }
+    winning, summary, scans = summarize_plan(ixscan)
+    assert winning["stage"] == "FETCH"
+    assert summary == "IXSCAN { room: 1, day: 1 }"
+    assert scans is False
+
+
+def test_listener_submits_only_slow_filtered_commands(monkeypatch):
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 50)
+    submitted = []
+    recorder = SimpleNamespace(submit=lambda *args: submitted.append(args))
+    listener = SlowQueryListener(recorder)
+
+    def event(request_id, name, command=None, duration_ms=0):
+        return SimpleNamespace(
+            connection_id=("localhost", 27017),
+            request_id=request_id,
+            database_name="classgrid",
+            command_name=name,
+            command=command,
+            duration_micros=duration_ms * 1000,
+        )
+
+    find = {"find": "schedules", "filter": {"room": "R101"}}
+    listener.started(event(1, "find", find))
+    listener.started(event(2, "find", {"find": "users", "filter": {}}))
+    listener.started(event(3, "find", {"find": "slow_queries", "filter": {}}))
+    listener.started(event(4, "insert", {"insert": "schedules"}))
+    listener.succeeded(event(1, "find", duration_ms=80))
+    listener.succeeded(event(2, "find", duration_ms=10))
+    listener.succeeded(event(3, "find", duration_ms=80))
+    listener.succeeded(event(4, "insert", duration_ms=80))
+
+    assert submitted == [("classgrid", "schedules", "find", find, 80, False)]
+    assert listener._pending == {}
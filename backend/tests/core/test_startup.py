@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+import pytest
+
+from app.startup import StartupTimer
+
+
+@pytest.mark.asyncio
+async def test_startup_timer_reports_phases_and_background_work():
+    async def broken():
+        raise RuntimeError("index build failed")
+
+    timer = StartupTimer(time.perf_counter())
+    await asyncio.sleep(0.01)
+    timer.mark("init_db")
+    timer.run_in_background("warm_up", asyncio.sleep(0.01))
+    timer.run_in_background("create_indexes", broken())
+    timer.ready()
+    assert timer.report()["background_pending"] == 2
+
+    await asyncio.sleep(0.05)
+    report = timer.report()
+    assert report["phases_ms"]["init_db"] >= 10
+    assert report["ready_ms"] >= report["phases_ms"]["init_db"]
+    assert report["background_ms"]["warm_up"] >= 10
+    assert report["background_pending"] == 0
+    assert report["background_failed"] == {
+        "create_indexes": "RuntimeError: index build failed"
+    }
+    assert "create_indexes" not in report["background_ms"]
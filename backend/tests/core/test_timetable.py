@@ -0,0 +1,79 @@
+from app.timetable import Course, Problem, busy_mask, solve, split_sessions
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+
+
+def make_problem(courses, rooms=("Room 101",), **fields):
+    return Problem(
+        courses=courses,
+        rooms=list(rooms),
+        days=fields.pop("days", DAYS),
+        day_start=fields.pop("day_start", 7 * 60),
+        day_end=fields.pop("day_end", 19 * 60),
+        slot_minutes=30,
+        max_session_minutes=90,
+        time_budget_seconds=fields.pop("time_budget_seconds", 5),
+        **fields,
+    )
+
+
+def overlapping(a, b):
+    return a.day == b.day and a.start_min < b.end_min and b.start_min < a.end_min
+
+
+def test_split_sessions():
+    # 3 units -> two 90-minute sessions
+    assert split_sessions(180, 30, 90) == [3, 3]
+    assert split_sessions(300, 30, 90) == [3, 3, 2, 2]
+    assert split_sessions(60, 30, 90) == [2]
+
+
+def test_busy_mask_widens_and_clips():
+    # 08:10-08:40 on Tue covers the 08:00 and 08:30 slots
+    mask = busy_mask(DAYS, 420, 30, 24, "Tue", 490, 520)
+    assert mask == 0b11 << (24 + 2)
+    assert busy_mask(DAYS, 420, 30, 24, "Sat", 490, 520) == 0
+    assert busy_mask(DAYS, 420, 30, 24, "Mon", 1200, 1260) == 0
+
+
+def test_solve_places_conflict_free():
+    courses = [
+        Course(code, section, 180, ["inst001", "inst002"])
+        for code in ("CS101", "CS102", "CS103")
+        for section in ("A", "B")
+    ]
+    solution = solve(make_problem(courses, rooms=("Room 101", "Room 102")))
+
+    assert solution.complete
+    assert len(solution.placements) == 12
+    for i, a in enumerate(solution.placements):
+        for b in solution.placements[i + 1 :]:
+            if overlapping(a, b):
+                assert a.instructor_id != b.instructor_id
+                assert a.room != b.room
+                assert a.section != b.section
+    # The two sessions of a course fall on different days
+    days = {}
+    for p in solution.placements:
+        days.setdefault((p.subject_code, p.section), set()).add(p.day)
+    assert all(len(d) == 2 for d in days.values())
+
+
+def test_solve_respects_busy_slots_and_reports_partial():
+    # One day with room for a single 90-minute session, already half taken
+    problem = make_problem(
+        [
+            Course("CS101", "A", 90, ["inst001"]),
+            Course("CS102", "A", 90, ["inst001"]),
+            Course("CS103", "A", 90, []),
+        ],
+        days=["Mon"],
+        day_start=9 * 60,
+        day_end=12 * 60,
+        busy={("room", "Room 101"): busy_mask(["Mon"], 540, 30, 6, "Mon", 540, 630)},
+    )
+    solution = solve(problem)
+
+    assert not solution.complete
+    assert [p.start_min for p in solution.placements] == [630]
+    assert {u.subject_code for u in solution.unplaced} == {"CS102", "CS103"}
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+
+from app.timing import (
+    RequestTiming,
+    ServerTimingMiddleware,
+    TimedRoute,
+    _current,
+    db_timing_listener,
+    span,
+)
+
+
+def test_span_without_a_request_is_a_no_op():
+    with span("auth"):
+        pass
+    assert _current.get() is None
+
+
+def test_header_lists_spans_db_round_trips_and_total():
+    timing = RequestTiming()
+    timing.add("auth", 1.25)
+    timing.add("auth", 1.0)
+    token = _current.set(timing)
+    try:
+        db_timing_listener.succeeded(SimpleNamespace(duration_micros=1500))
+        db_timing_listener.failed(SimpleNamespace(duration_micros=500))
+    finally:
+        _current.reset(token)
+
+    header = timing.header()
+    assert header.startswith('auth;dur=2.2, db;dur=2.0;desc="2 round trips", ')
+    assert header.split(", ")[-1].startswith("total;dur=")
+    assert timing.as_dict()["db_round_trips"] == 2
+
+
+@pytest.mark.asyncio
+async def test_middleware_splits_route_time_into_phases():
+    async def user():
+        with span("auth"):
+            await asyncio.sleep(0.01)
+        return "someone"
+
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/things/{thing_id}")
+    async def read_thing(thing_id: int, current_user: str = Depends(user)):
+        await asyncio.sleep(0.02)
+        return {"id": thing_id, "user": current_user}
+
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+    app.include_router(router)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+        response = await c.get("/things/1")
+
+    assert response.json() == {"id": 1, "user": "someone"}
+    phases = {
+        part.split(";")[0]: float(part.split("dur=")[1])
+        for part in response.headers["server-timing"].split(", ")
+    }
+    assert list(phases) == ["auth", "validate", "handler", "serialize", "total"]
+    assert phases["auth"] >= 10
+    # Auth ran before the endpoint, but is not counted as validation again
+    assert phases["validate"] < 10
+    assert phases["handler"] >= 20
+    assert phases["total"] >= phases["auth"] + phases["handler"]
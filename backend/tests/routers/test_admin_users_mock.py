@@ -9,7 +9,13 @@ from app.models import UserRole
 # Re-use the mock_user_db fixture pattern or create a new one
 @pytest.fixture
 def mock_user_db_admin():
-    with patch("app.routers.users.User") as mock_user_model:
+    with (
+        patch("app.routers.users.User") as mock_user_model,
+        patch("app.routers.users.user_cache") as mock_user_cache,
+    ):
+        # Lookups by user_id go through the reference cache; serve them from
+        # the mocked model so the tests below can keep setting find_one
+        mock_user_cache.get.side_effect = lambda user_id: mock_user_model.find_one()
         # User not found by default
         f = asyncio.Future()
         f.set_result(None)
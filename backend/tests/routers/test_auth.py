@@ -34,3 +34,41 @@ async def test_login():
     assert response.status_code == 200
     assert "access_token" in response.json()
     assert response.json()["token_type"] == "bearer"
+
+
+@pytest.mark.asyncio
+async def test_refresh_and_logout():
+    user_id = "testrefresh_user"
+    password = "password123"
+
+    existing_user = await User.find_one(User.user_id == user_id)
+    if not existing_user:
+        await User(
+            user_id=user_id,
+            firstname="Test",
+            lastname="Refresh",
+            password=get_password_hash(password),
+        ).create()
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        login = await ac.post(
+            "/token", data={"username": user_id, "password": password}
+        )
+        refresh_token = login.json()["refresh_token"]
+
+        refreshed = await ac.post(
+            "/token/refresh", json={"refresh_token": refresh_token}
+        )
+        # Refresh tokens are single use
+        reused = await ac.post("/token/refresh", json={"refresh_token": refresh_token})
+
+        headers = {"Authorization": f"Bearer {refreshed.json()['access_token']}"}
+        logout = await ac.post("/logout", headers=headers)
+        after_logout = await ac.get("/users/me", headers=headers)
+
+    assert refreshed.status_code == 200
+    assert reused.status_code == 401
+    assert logout.status_code == 204
+    assert after_logout.status_code == 403
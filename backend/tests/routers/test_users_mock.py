@@ -12,7 +12,13 @@ from app.models import User, UserRole
 # Mock the database dependencies
 @pytest.fixture
 def mock_user_db():
-    with patch("app.routers.users.User") as mock_user_model:
+    with (
+        patch("app.routers.users.User") as mock_user_model,
+        patch("app.routers.users.user_cache") as mock_user_cache,
+    ):
+        # Lookups by user_id go through the reference cache; serve them from
+        # the mocked model so the tests below can keep setting find_one
+        mock_user_cache.get.side_effect = lambda user_id: mock_user_model.find_one()
         # User not found by default (for creation)
         # find_one returns a future (awaitable) that returns None (not found) or user
         f = asyncio.Future()
@@ -9,7 +9,7 @@ sys.path.append(
 
 from app.db import init_db
 from app.models import User
-from app.security import verify_password
+from app.security import check_password, is_password_hash, verify_password
 
 # Mock settings if needed, but we can rely on defaults or .env
 # Set env var for testing if not present
@@ -25,7 +25,7 @@ async def verify_changes():
         print("Database initialized.")
 
         # 1. Create a test user
-        test_user_id = "test_plain_text_user"
+        test_user_id = "test_password_hash_user"
         test_password = "supersecretpassword123"
 
         # Cleanup if exists
@@ -42,22 +42,27 @@ async def verify_changes():
             user_id=test_user_id,
             firstname="Test",
             lastname="User",
-            password=test_password,  # Note: passing plain text direct to password field
+            password=test_password,  # Note: a legacy row holding the plain password
             role="instructor",
         )
         await new_user.create()
         print(f"User {test_user_id} created.")
 
-        # 2. Verify storage
+        # 2. Verify the legacy row still logs in and gets upgraded
         fetched_user = await User.find_one(User.user_id == test_user_id)
-        if fetched_user.password == test_password:
-            print("SUCCESS: Password stored in plain text.")
+        valid, new_hash = await check_password(test_password, fetched_user.password)
+        if valid and new_hash and is_password_hash(new_hash):
+            print("SUCCESS: plaintext password accepted and rehashed.")
+            await fetched_user.set({User.password: new_hash})
         else:
-            print(f"FAILURE: Password mismatch. Stored: {fetched_user.password}")
+            print(f"FAILURE: legacy check returned {valid}, {new_hash}")
 
-        # 3. Verify security utility
-        if verify_password(test_password, fetched_user.password):
-            print("SUCCESS: verify_password works with plain text.")
+        # 3. Verify the stored hash
+        fetched_user = await User.find_one(User.user_id == test_user_id)
+        if fetched_user.password == test_password:
+            print("FAILURE: Password still stored in plain text.")
+        elif verify_password(test_password, fetched_user.password):
+            print("SUCCESS: verify_password works with the stored hash.")
         else:
             print("FAILURE: verify_password failed.")
 
@@ -1,6 +1,8 @@
 import pytest
 from httpx import AsyncClient
 
+from app.models import ScheduleGrid
+
 # We need to setup fixtures for db, but usually existing tests have them.
 # Let's check conftext.py or similar if it exists
 # For now, I'll write standard pytest async functions assuming 'client' fixture is available
@@ -125,3 +127,194 @@ async def test_delete_schedule(client: AsyncClient, token_headers):
     # Verify it's gone
     get_res = await client.get(f"/schedules/{schedule_id}", headers=token_headers)
     assert get_res.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_schedules(client: AsyncClient, token_headers):
+    rows = [
+        {
+            "subject_code": "CS201",
+            "instructor_id": "inst005",
+            "section": "F",
+            "day": "Thu",
+            "start_time": "08:00",
+            "end_time": "09:00",
+            "room": "Room 106",
+        },
+        {
+            "subject_code": "CS202",
+            "instructor_id": "inst005",
+            "section": "G",
+            "day": "Thu",
+            "start_time": "08:30",
+            "end_time": "09:30",
+            "room": "Room 107",
+        },
+    ]
+
+    # Atomic mode writes nothing when one row conflicts
+    response = await client.post("/schedules/bulk", headers=token_headers, json=rows)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["mode"] == "atomic"
+    assert data["created"] == 0
+    assert [r["status"] for r in data["results"]] == ["skipped", "conflict"]
+
+    response = await client.post(
+        "/schedules/bulk?mode=best_effort", headers=token_headers, json=rows
+    )
+    data = response.json()
+    assert data["created"] == 1
+    assert data["results"][0]["status"] == "created"
+    assert data["results"][0]["id"]
+
+
+@pytest.mark.asyncio
+async def test_single_digit_hour_times(client: AsyncClient, token_headers):
+    # "9:00" sorts after "10:00" as a string; times are compared as minutes
+    response = await client.post(
+        "/schedules/",
+        headers=token_headers,
+        json={
+            "subject_code": "CS301",
+            "instructor_id": "inst006",
+            "section": "H",
+            "day": "Sat",
+            "start_time": "9:00",
+            "end_time": "10:00",
+            "room": "Room 108",
+        },
+    )
+    assert response.status_code == 201
+    assert response.json()["start_time"] == "09:00"
+
+    response = await client.post(
+        "/schedules/",
+        headers=token_headers,
+        json={
+            "subject_code": "CS302",
+            "instructor_id": "inst006",
+            "section": "I",
+            "day": "Sat",
+            "start_time": "9:30",
+            "end_time": "11:00",
+            "room": "Room 109",
+        },
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_times_must_be_on_slot_boundaries(client: AsyncClient, token_headers):
+    schedule = {
+        "subject_code": "CS303",
+        "instructor_id": "inst007",
+        "section": "J",
+        "day": "Sat",
+        "start_time": "13:00",
+        "end_time": "13:07",
+        "room": "Room 110",
+    }
+    response = await client.post("/schedules/", headers=token_headers, json=schedule)
+    assert response.status_code == 422
+
+    # Back-to-back classes do not share a slot
+    schedule["end_time"] = "13:05"
+    response = await client.post("/schedules/", headers=token_headers, json=schedule)
+    assert response.status_code == 201
+    schedule.update(subject_code="CS304", start_time="13:05", end_time="14:00")
+    response = await client.post("/schedules/", headers=token_headers, json=schedule)
+    assert response.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_generate_timetable_preview(client: AsyncClient, token_headers):
+    await client.post(
+        "/subjects/",
+        headers=token_headers,
+        json={
+            "subject_code": "GEN101",
+            "subject_description": "Generated",
+            "units": 3,
+            "department": "BSCS",
+        },
+    )
+    await client.post(
+        "/users",
+        headers=token_headers,
+        json={
+            "user_id": "gen_inst",
+            "firstname": "Gen",
+            "lastname": "Instructor",
+            "role": "instructor",
+            "department": "BSCS",
+            "password": "password",
+        },
+    )
+    before = await client.get("/schedules/", headers=token_headers)
+
+    response = await client.post(
+        "/schedules/generate",
+        headers=token_headers,
+        json={
+            "department": "BSCS",
+            "sections": ["GEN-A"],
+            "rooms": ["Room 201"],
+            "days": ["Mon", "Wed"],
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["import_result"] is None
+    assert data["schedules"]
+    placed = {(s["day"], s["start_time"], s["room"]) for s in data["schedules"]}
+    assert len(placed) == len(data["schedules"])
+
+    # Nothing is written without commit
+    after = await client.get("/schedules/", headers=token_headers)
+    assert after.json() == before.json()
+
+
+@pytest.mark.asyncio
+async def test_schedule_grid(client: AsyncClient, token_headers):
+    response = await client.post(
+        "/schedules/",
+        headers=token_headers,
+        json={
+            "subject_code": "CS401",
+            "instructor_id": "inst007",
+            "section": "J",
+            "day": "Wed",
+            "start_time": "09:00",
+            "end_time": "10:30",
+            "room": "Room 110",
+        },
+    )
+    schedule_id = response.json()["id"]
+
+    response = await client.get("/schedules/grid/instructor/inst007")
+    assert response.status_code == 200
+    grid = response.json()
+    (entry,) = grid["classes"]
+    assert entry["schedule_id"] == schedule_id
+    column = grid["days"].index("Wed")
+    assert grid["times"][entry["row"]] == "09:00"
+    assert all(
+        grid["cells"][row][column] == 0
+        for row in range(entry["row"], entry["row"] + entry["row_span"])
+    )
+
+    # Changing the class rebuilds the grid
+    await client.put(
+        f"/schedules/{schedule_id}", headers=token_headers, json={"start_time": "08:00"}
+    )
+    response = await client.get("/schedules/grid/instructor/inst007")
+    assert response.json()["classes"][0]["start_time"] == "08:00"
+
+
+@pytest.mark.asyncio
+async def test_grid_of_unknown_key_is_not_stored(client: AsyncClient):
+    response = await client.get("/schedules/grid/room/Nowhere")
+    assert response.status_code == 200
+    assert response.json()["classes"] == []
+    assert await ScheduleGrid.count() == 0